@@ -1,14 +1,27 @@
+from typing import List
 from fastapi import FastAPI, Query, HTTPException
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
-import re
 import ast
+import importlib.util
+import os
+import threading
+from pathlib import Path
 from rapidfuzz import fuzz, process
 from sklearn.metrics import confusion_matrix
 
 app = FastAPI(title="Unified Fraud & Abuse Detector API", version="1.2")
 
+# Shared with the firewall service (recurring_firewall/app/core/normalize.py) so
+# offline and online rename scores normalize names identically
+_spec = importlib.util.spec_from_file_location(
+    "firewall_normalize", Path(__file__).resolve().parents[2] / "recurring_firewall" / "app" / "core" / "normalize.py"
+)
+_normalize = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_normalize)
+normalize_name, normalize_many = _normalize.normalize_name, _normalize.normalize_many
+
 # --- DATA PATHS ---
 DF_SCORING_PATH = r"C:\Users\thapa\Desktop\project\df_scoring.csv"  
 SUB_PATH        = r"C:\Users\thapa\Desktop\project\sub.csv"         
@@ -16,15 +29,65 @@ MASTER_CSV_PATH = r"C:\Users\thapa\Desktop\project\Online retial II\MERGED MASTE
 COMPANY_CSV_PATH = r"C:\Users\thapa\Desktop\project\Online retial II\company names\Company Names.csv"
 
 # --- LOAD DATA ---
+# (mtime of df_scoring.csv, mtime of sub.csv) of the loaded evaluation data;
+# keys the threshold-curve cache
+DATA_VERSION = None
+SUB_EVAL = None
+_curve_cache: dict = {}
+_eval_lock = threading.Lock()
+_curve_lock = threading.Lock()
+MAX_CURVE_POINTS = 10_001 # Finer grids than this are requested with points=0 (every distinct score)
+CURVE_CACHE_SIZE = 8 # Curves kept per data version (one per requested resolution)
+
+def _eval_mtimes():
+    return (os.path.getmtime(DF_SCORING_PATH), os.path.getmtime(SUB_PATH))
+
+def load_subscription_eval():
+    """
+    Joins per-subscription ground truth (max fraud over its transactions)
+    onto sub.csv once and keeps only the arrays the evaluation needs.
+    """
+    global SUB_EVAL, DATA_VERSION
+    version = _eval_mtimes()
+    df_scoring = pd.read_csv(DF_SCORING_PATH, usecols=["subscription_id", "fraud"])
+    sub = pd.read_csv(SUB_PATH, usecols=["subscription_id", "decision", "max_fraud_prob"])
+
+    # Enforce types for Banksim Data
+    df_scoring["fraud"] = df_scoring["fraud"].fillna(0).astype(np.int8)
+    sub_true = df_scoring.groupby("subscription_id")["fraud"].max().reset_index()
+    sub_eval = sub.merge(sub_true, on="subscription_id", how="left").fillna(0)
+
+    SUB_EVAL = {
+        "version": version,
+        "fraud": sub_eval["fraud"].to_numpy(dtype=np.int8),
+        "flagged": sub_eval["decision"].isin(["REVIEW", "BLOCK"]).to_numpy(dtype=np.int8),
+        "max_fraud_prob": sub_eval["max_fraud_prob"].to_numpy(dtype=np.float64),
+    }
+    DATA_VERSION = version
+    print(f"Loaded {len(sub_eval)} subscriptions for evaluation.")
+
+def get_subscription_eval() -> dict:
+    """
+    The materialized evaluation arrays, rebuilt if either CSV changed on disk.
+    A CSV that can't be read right now (being replaced, share offline) keeps
+    the last loaded version serving.
+    """
+    try:
+        if DATA_VERSION != _eval_mtimes():
+            with _eval_lock:
+                if DATA_VERSION != _eval_mtimes():
+                    load_subscription_eval()
+    except OSError as e:
+        if SUB_EVAL is None:
+            raise HTTPException(status_code=503, detail=f"Evaluation data unavailable: {e}")
+        print(f"Keeping evaluation data version {DATA_VERSION}: {e}")
+    return SUB_EVAL
+
 try:
-    df_scoring = pd.read_csv(DF_SCORING_PATH)
-    sub = pd.read_csv(SUB_PATH)
+    load_subscription_eval()
     master_df = pd.read_csv(MASTER_CSV_PATH)
     companies_df = pd.read_csv(COMPANY_CSV_PATH)
     
-    # Enforce types for Banksim Data
-    df_scoring["fraud"] = df_scoring["fraud"].fillna(0).astype(int)
-    
     # Normalize Retail II Data
     master_df["merchant_id"] = master_df["merchant_id"].astype(str).str.strip()
     
@@ -32,7 +95,7 @@ try:
     companies_df.columns = [c.strip().lower() for c in companies_df.columns]
     name_col = next((c for c in ["name", "company", "company_name", "business_name"] if c in companies_df.columns), companies_df.columns[0])
     companies_df = companies_df.dropna(subset=[name_col])
-    company_list = companies_df[name_col].astype(str).apply(lambda x: re.sub(r"[^a-z0-9\s]", " ", x.lower()).strip()).unique().tolist()
+    company_list = normalize_many(companies_df[name_col].astype(str)).unique().tolist()
     
     # Fast lookup for Retail II
     merchant_lookup = master_df.set_index("merchant_id").to_dict(orient="index")
@@ -50,13 +113,6 @@ class TransactionRequest(BaseModel):
     timestamp: str | None = None
 
 # --- HELPERS ---
-def normalize_name(x: str) -> str:
-    x = str(x).lower()
-    x = re.sub(r"[^a-z0-9\s]", " ", x)
-    x = re.sub(r"\s+", " ", x).strip()
-    stop = {"pvt", "private", "ltd", "limited", "inc", "co", "official", "store", "online", "services"}
-    return " ".join([t for t in x.split() if t not in stop]).strip()
-
 def safe_parse_patterns(x):
     if x is None or (isinstance(x, float) and pd.isna(x)): return []
     if isinstance(x, list): return x
@@ -66,14 +122,69 @@ def safe_parse_patterns(x):
     except: pass
     return [p.strip() for p in str(x).split(",") if p.strip()]
 
-def compute_metrics(sub_eval: pd.DataFrame):
-    y_true, y_pred = sub_eval["fraud"].values, sub_eval["pred"].values
+def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray):
     tn, fp, fn, tp = confusion_matrix(y_true, y_pred, labels=[0, 1]).ravel()
     fpr = fp / (fp + tn + 1e-9)
     recall = tp / (tp + fn + 1e-9)
     precision = tp / (tp + fp + 1e-9)
     return {"precision": float(precision), "recall": float(recall), "fpr": float(fpr), "confusion": {"tn": int(tn), "fp": int(fp), "fn": int(fn), "tp": int(tp)}}
 
+def threshold_curve(scores: np.ndarray, y_true: np.ndarray, points: int = 0) -> dict:
+    """
+    Confusion counts for "score >= t" at every threshold in one sort + cumsum.
+    points=0 evaluates every distinct score (the exact curve); otherwise
+    `points` evenly spaced thresholds in [0, 1].
+    """
+    order = np.argsort(-scores, kind="mergesort")
+    s, y = scores[order], y_true[order].astype(bool)
+    tp_cum = np.concatenate(([0], np.cumsum(y)))
+    fp_cum = np.concatenate(([0], np.cumsum(~y)))
+
+    if points:
+        thresholds = np.linspace(0.0, 1.0, points)
+        # Number of scores >= t, read off the descending sort
+        k = np.searchsorted(-s, -thresholds, side="right")
+    else:
+        # Last index of each run of equal scores
+        last = np.flatnonzero(np.diff(s, append=-np.inf))
+        thresholds = s[last][::-1]
+        k = (last + 1)[::-1]
+
+    tp, fp = tp_cum[k], fp_cum[k]
+    pos, neg = tp_cum[-1], fp_cum[-1]
+    fn, tn = pos - tp, neg - fp
+    return {
+        "threshold": thresholds,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "fpr": fp / (fp + tn + 1e-9),
+        "recall": tp / (tp + fn + 1e-9),
+        "precision": tp / (tp + fp + 1e-9),
+    }
+
+def best_for_fpr(curve: dict, fpr_target: float):
+    """Highest-recall (lowest) threshold whose FPR stays within the target."""
+    ok = np.flatnonzero(curve["fpr"] <= fpr_target)
+    if not len(ok):
+        return None
+    # Thresholds ascend, so the first admissible one has the highest recall
+    i = ok[0]
+    return {"threshold": float(curve["threshold"][i]), "recall": float(curve["recall"][i]), "fpr": float(curve["fpr"][i])}
+
+def get_subscription_curve(sub_eval: dict, points: int) -> dict:
+    key = (sub_eval["version"], points)
+    # Endpoints run in a thread pool: one lock keeps the purge and eviction consistent
+    with _curve_lock:
+        if key not in _curve_cache:
+            # Curves of an older data version are stale
+            for stale in [k for k in _curve_cache if k[0] != key[0]]:
+                _curve_cache.pop(stale, None)
+            while len(_curve_cache) >= CURVE_CACHE_SIZE:
+                _curve_cache.pop(next(iter(_curve_cache)))
+            _curve_cache[key] = threshold_curve(
+                sub_eval["max_fraud_prob"], sub_eval["fraud"], points
+            )
+        return _curve_cache[key]
+
 def guidance_from_decision(decision: str):
     if decision == "ALLOW": return "Payment looks safe."
     if decision == "REVIEW": return "Suspicious. Recommended: step-up authentication (OTP)."
@@ -88,27 +199,24 @@ def home():
     }
 
 @app.get("/evaluate-subscriptions")
-def evaluate_subscriptions(tune_fpr: bool = False, fpr_target: float = 0.01):
-    sub_true = df_scoring.groupby("subscription_id")["fraud"].max().reset_index()
-    sub_eval = sub.merge(sub_true, on="subscription_id", how="left").fillna(0)
+def evaluate_subscriptions(
+    tune_fpr: bool = False,
+    fpr_target: List[float] = Query([0.01]),
+    points: int = Query(101, ge=0, le=MAX_CURVE_POINTS, description="Threshold resolution; 0 = every distinct score"),
+    include_curve: bool = False
+):
+    sub_eval = get_subscription_eval()
     
     if not tune_fpr:
-        sub_eval["pred"] = sub_eval["decision"].isin(["REVIEW", "BLOCK"]).astype(int)
-        return {"mode": "decision_based", "metrics": compute_metrics(sub_eval)}
-    
-    # Simple tuning logic here (shortened for brevity but fully functional)
-    thresholds = np.linspace(0.0, 1.0, 101)
-    best = None
-    for t in thresholds:
-        y_pred = (sub_eval["max_fraud_prob"] >= t).astype(int)
-        tn, fp, fn, tp = confusion_matrix(sub_eval["fraud"], y_pred, labels=[0, 1]).ravel()
-        fpr = fp / (fp + tn + 1e-9)
-        if fpr <= fpr_target:
-            recall = tp / (tp + fn + 1e-9)
-            if best is None or recall > best["recall"]:
-                best = {"threshold": t, "recall": recall, "fpr": fpr}
+        return {"mode": "decision_based", "metrics": compute_metrics(sub_eval["fraud"], sub_eval["flagged"])}
     
-    return {"mode": "tuned_threshold", "best": best}
+    # Whole curve in one pass, cached until the data is reloaded
+    curve = get_subscription_curve(sub_eval, points)
+    targets = [{"fpr_target": t, "best": best_for_fpr(curve, t)} for t in fpr_target]
+    result = {"mode": "tuned_threshold", "best": targets[0]["best"], "targets": targets}
+    if include_curve:
+        result["curve"] = {k: v.tolist() for k, v in curve.items()}
+    return result
 
 @app.post("/score-transaction")
 def score_transaction(req: TransactionRequest):
@@ -4,25 +4,22 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 import pandas as pd
-import re
 import ast
+import importlib.util
+from pathlib import Path
 from rapidfuzz import fuzz, process
 
 app = FastAPI(title="Recurring Payment Firewall API", version="1.1")
 
 
-def normalize_name(x: str) -> str:
-    x = str(x).lower()
-    x = re.sub(r"[^a-z0-9\s]", " ", x)
-    x = re.sub(r"\s+", " ", x).strip()
-
-    stop = {
-        "pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp",
-        "official", "store", "shop", "online", "services", "service", "solutions",
-        "technology", "technologies", "international", "group", "payments", "pay"
-    }
-    tokens = [t for t in x.split() if t not in stop]
-    return " ".join(tokens).strip()
+# Shared with the firewall service (recurring_firewall/app/core/normalize.py) so
+# offline and online rename scores normalize names identically
+_spec = importlib.util.spec_from_file_location(
+    "firewall_normalize", Path(__file__).resolve().parents[3] / "recurring_firewall" / "app" / "core" / "normalize.py"
+)
+_normalize = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_normalize)
+normalize_name, normalize_many = _normalize.normalize_name, _normalize.normalize_many
 
 
 def safe_parse_patterns(x):
@@ -93,7 +90,7 @@ if name_col is None:
 companies_df = companies_df.dropna(subset=[name_col])
 companies_df[name_col] = companies_df[name_col].astype(str)
 
-companies_df["clean_name"] = companies_df[name_col].apply(normalize_name)
+companies_df["clean_name"] = normalize_many(companies_df[name_col])
 company_list = companies_df["clean_name"].dropna().unique().tolist()
 
 print(f"[INIT] Loaded master merchants: {len(master_df)}")
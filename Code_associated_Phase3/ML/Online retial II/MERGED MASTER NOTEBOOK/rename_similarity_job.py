@@ -0,0 +1,155 @@
+"""
+Batch job: recompute rename_similarity_score / closest_company_match for the
+whole merchant master against the company registry.
+
+Same match as the notebook (best token_sort_ratio over the normalized
+company names, first best on ties, queries shorter than 3 characters score
+0), but every distinct merchant name is scored once, in row blocks of one
+multi-threaded rapidfuzz cdist each. The registry is kept whole, like the
+service loads it: the notebook's drop of names under 3 characters made
+offline and online scores disagree. Finished blocks are appended to a
+checkpoint next to the output, so an interrupted run resumes where it
+stopped. MERCHANT_REBRAND_PATTERN and final_decision are refreshed from the
+new scores with the notebook's rules.
+
+    python rename_similarity_job.py merged_master_firewall_output.csv "Company Names.csv" \\
+        -o merged_master_firewall_output.parquet
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# Shared with the firewall service (recurring_firewall/app/core/normalize.py) so
+# offline and online rename scores normalize names identically
+_spec = importlib.util.spec_from_file_location(
+    "firewall_normalize", Path(__file__).resolve().parents[3] / "recurring_firewall" / "app" / "core" / "normalize.py"
+)
+_normalize = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_normalize)
+normalize_many = _normalize.normalize_many
+parse_patterns = _normalize.parse_patterns
+
+NAME_COLS = ["name", "company", "company_name", "business_name", "organization", "organisation"]
+REBRAND = "MERCHANT_REBRAND_PATTERN"
+
+
+def read_table(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def write_table(df: pd.DataFrame, path: str):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def load_companies(path: str) -> list:
+    companies = read_table(path)
+    companies.columns = [c.strip().lower() for c in companies.columns]
+    name_col = next((c for c in NAME_COLS if c in companies.columns), companies.columns[0])
+    names = companies[name_col].dropna().astype(str)
+    return normalize_many(names).dropna().unique().tolist()
+
+
+def checkpoint_path(output: str, companies: list) -> str:
+    # Keyed by the registry, so a checkpoint is never resumed against a different list
+    digest = hashlib.blake2b("\n".join(companies).encode(), digest_size=6).hexdigest()
+    return f"{output}.{digest}.ckpt.csv"
+
+
+def match_names(queries: list, companies: list, ckpt: str, max_cells: int, workers: int) -> dict:
+    """{clean name: (closest company, score)} for every query, resuming from `ckpt`."""
+    done = {}
+    if os.path.exists(ckpt):
+        prev = pd.read_csv(ckpt, keep_default_na=False)
+        done = dict(zip(prev["merchant_clean"], zip(prev["closest_company_match"], prev["rename_similarity_score"])))
+        print(f"Resuming: {len(done)} names already matched")
+
+    todo = [q for q in queries if q not in done]
+    short = [q for q in todo if len(q) < 3]
+    done.update((q, ("", 0.0)) for q in short)
+    todo = [q for q in todo if len(q) >= 3]
+    if not companies:
+        done.update((q, ("", 0.0)) for q in todo)
+        return done
+
+    rows = max(1, max_cells // max(len(companies), 1))
+    started = time.perf_counter()
+    for start in range(0, len(todo), rows):
+        block = todo[start:start + rows]
+        # Deliberately the full registry: n-gram blocking can miss the true best
+        # match, and these scores must equal the notebook's extractOne
+        scores = process.cdist(block, companies, scorer=fuzz.token_sort_ratio, dtype=np.float32, workers=workers)
+        # argmax keeps the first best, like extractOne
+        best = scores.argmax(axis=1)
+        result = pd.DataFrame({
+            "merchant_clean": block,
+            "closest_company_match": [companies[j] for j in best],
+            "rename_similarity_score": scores[np.arange(len(block)), best].astype(np.float64),
+        })
+        del scores
+        result.to_csv(ckpt, mode="a", header=not os.path.exists(ckpt), index=False)
+        done.update(zip(block, zip(result["closest_company_match"], result["rename_similarity_score"])))
+        finished = start + len(block)
+        rate = finished / (time.perf_counter() - started)
+        print(f"{finished}/{len(todo)} names ({rate:.0f}/s)")
+    return done
+
+
+def refresh_decisions(master: pd.DataFrame) -> pd.DataFrame:
+    """Re-applies the notebook's rename pattern and decision rules to the new scores."""
+    rename = master["rename_similarity_score"]
+    if "patterns_detected" in master.columns:
+        # Same parser as the service's CSV loader, so comma-separated and single patterns survive
+        patterns = [[p for p in parse_patterns(x) if p != REBRAND] for x in master["patterns_detected"]]
+        master["patterns_detected"] = [str(p + [REBRAND] if r >= 90 else p) for p, r in zip(patterns, rename)]
+
+    needed = {"merchant_trust_score", "microcharge_rate", "spike_ratio", "anomaly_score"}
+    if needed.issubset(master.columns):
+        trust = master["merchant_trust_score"]
+        risky = (master["microcharge_rate"] > 0.50) | (master["spike_ratio"] > 5) | (master["anomaly_score"] > 0.75)
+        master["final_decision"] = np.select(
+            [(rename >= 90) & (trust < 40), (trust < 25) & risky, (trust < 55) | (rename >= 80)],
+            ["BLOCK", "BLOCK", "REVIEW"], default="ALLOW"
+        )
+    return master
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("master", help="Merchant master CSV/Parquet with merchant_name")
+    parser.add_argument("companies", help="Company registry CSV/Parquet")
+    parser.add_argument("-o", "--output", default="merged_master_firewall_output.csv", help=".csv or .parquet")
+    parser.add_argument("--max-cells", type=int, default=20_000_000, help="Score matrix cells per cdist block")
+    parser.add_argument("--workers", type=int, default=-1, help="cdist threads; -1 = all cores")
+    args = parser.parse_args()
+
+    companies = load_companies(args.companies)
+    master = read_table(args.master)
+    master["merchant_clean"] = normalize_many(master["merchant_name"].fillna("").astype(str))
+    queries = master["merchant_clean"].unique().tolist()
+    print(f"{len(master)} merchants, {len(queries)} distinct names, {len(companies)} companies")
+
+    ckpt = checkpoint_path(args.output, companies)
+    matches = match_names(queries, companies, ckpt, args.max_cells, args.workers)
+
+    matched = master["merchant_clean"].map(matches)
+    master["closest_company_match"] = [m[0] for m in matched]
+    master["rename_similarity_score"] = [m[1] for m in matched]
+    master = refresh_decisions(master.drop(columns="merchant_clean"))
+
+    write_table(master, args.output)
+    if os.path.exists(ckpt):
+        os.remove(ckpt)
+    print(f"Wrote {len(master)} merchants to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
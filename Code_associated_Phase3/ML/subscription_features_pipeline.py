@@ -0,0 +1,281 @@
+"""
+Out-of-core builder for banksim_subscription_abuse_features.csv.
+
+Streams a transaction CSV or Parquet file (subscription_id, step, amount)
+in chunks, reduces every chunk to one partial aggregate per subscription in
+a process pool, and folds the partials together in file order. Memory
+grows with the number of subscriptions, not with the number of
+transactions, so the input can be far larger than RAM.
+
+The input is expected in step order, as BankSim is: gaps, micro-charge
+streaks and tx_in_window_max are stitched across chunk boundaries on that
+assumption. median_amount is exact up to --median-sample transactions per
+subscription and estimated from a uniform sample beyond that.
+
+    python subscription_features_pipeline.py df_scoring.csv \\
+        -o banksim_subscription_abuse_features.csv --workers 8
+"""
+import argparse
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Feature rules, as in the offline notebook and the firewall's
+# SubscriptionFeatureStore (recurring_firewall/app/domain/subscription_features.py)
+MICRO_THRESHOLD = 5.0
+WINDOW_STEPS = 7
+VELOCITY_WINDOW_MIN = 5
+IRREGULAR_MIN_TX = 6
+IRREGULAR_MIN_GAP_STD = 5.0
+RULE_WEIGHT = 0.35
+ANOMALY_WEIGHT = 0.4
+
+COLUMNS = [
+    "subscription_id", "tx_count", "mean_amount", "std_amount", "min_amount", "median_amount",
+    "max_amount", "mean_gap_steps", "std_gap_steps", "max_gap_steps", "tx_in_window_max",
+    "micro_ratio", "micro_count", "micro_streak_max", "first_step", "last_step", "active_steps",
+    "anomaly_raw", "subscription_anomaly_score", "patterns_detected", "rule_abuse_score",
+    "final_abuse_score", "decision",
+]
+ANOMALY_FEATURES = [
+    "tx_count", "mean_amount", "std_amount", "median_amount", "max_amount", "mean_gap_steps",
+    "std_gap_steps", "max_gap_steps", "tx_in_window_max", "micro_ratio", "micro_streak_max",
+]
+
+
+def _combine(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Chan et al.'s merge of two (count, mean, M2) moments."""
+    n = n_a + n_b
+    if not n_b:
+        return n_a, mean_a, m2_a
+    if not n_a:
+        return n_b, mean_b, m2_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def _window_max(steps: np.ndarray, window: int) -> int:
+    """Most transactions at most `window` steps before one of them, itself included."""
+    if not len(steps):
+        return 0
+    start = np.searchsorted(steps, steps - window, side="left")
+    return int((np.arange(len(steps)) - start + 1).max())
+
+
+class Partial:
+    """
+    Mergeable aggregate of one subscription over a contiguous run of its
+    transactions. `head` / `tail` keep the steps within the window of the
+    first / last transaction, which is all a window spanning two runs can see.
+    """
+    __slots__ = (
+        "n", "mean", "m2", "min", "max", "sample", "gap_n", "gap_mean", "gap_m2", "gap_max",
+        "first", "last", "micro", "micro_prefix", "micro_suffix", "micro_max", "window_max",
+        "head", "tail",
+    )
+
+    @classmethod
+    def from_run(cls, amounts: np.ndarray, steps: np.ndarray, window: int, micro_threshold: float, sample_size: int):
+        p = cls()
+        p.n = len(amounts)
+        p.mean = float(amounts.mean())
+        p.m2 = float(((amounts - p.mean) ** 2).sum())
+        p.min, p.max = float(amounts.min()), float(amounts.max())
+        p.sample = amounts if p.n <= sample_size else np.random.default_rng(42).choice(amounts, sample_size, replace=False)
+
+        # Out-of-order rows count as a zero gap, like the online store
+        gaps = np.maximum(np.diff(steps), 0)
+        p.gap_n = len(gaps)
+        p.gap_mean = float(gaps.mean()) if p.gap_n else 0.0
+        p.gap_m2 = float(((gaps - p.gap_mean) ** 2).sum()) if p.gap_n else 0.0
+        p.gap_max = int(gaps.max()) if p.gap_n else 0
+        p.first, p.last = int(steps[0]), int(steps[-1])
+
+        micro = amounts <= micro_threshold
+        p.micro = int(micro.sum())
+        breaks = np.flatnonzero(~micro)
+        if not len(breaks):
+            p.micro_prefix = p.micro_suffix = p.micro_max = p.n
+        else:
+            p.micro_prefix = int(breaks[0])
+            p.micro_suffix = int(p.n - 1 - breaks[-1])
+            # Longest run of micro-charges between two non-micro ones
+            bounds = np.concatenate(([-1], breaks, [p.n]))
+            p.micro_max = int((np.diff(bounds) - 1).max())
+
+        p.window_max = _window_max(steps, window)
+        p.head = steps[steps <= p.first + window]
+        p.tail = steps[steps >= p.last - window]
+        return p
+
+    def merge(self, b: "Partial", window: int, sample_size: int, rng: np.random.Generator) -> "Partial":
+        """Appends run `b`, which follows this one in step order."""
+        a, p = self, Partial()
+        p.n, p.mean, p.m2 = _combine(a.n, a.mean, a.m2, b.n, b.mean, b.m2)
+        p.min, p.max = min(a.min, b.min), max(a.max, b.max)
+        if len(a.sample) + len(b.sample) <= sample_size and p.n == len(a.sample) + len(b.sample):
+            p.sample = np.concatenate((a.sample, b.sample))
+        else:
+            # Each sampled amount stands for n / len(sample) transactions of its run
+            pool = np.concatenate((a.sample, b.sample))
+            weights = np.concatenate((
+                np.full(len(a.sample), a.n / len(a.sample)), np.full(len(b.sample), b.n / len(b.sample))
+            ))
+            p.sample = rng.choice(pool, min(sample_size, len(pool)), replace=False, p=weights / weights.sum())
+
+        # The gap between the runs joins the gaps inside them
+        gap = max(b.first - a.last, 0)
+        n, mean, m2 = _combine(a.gap_n, a.gap_mean, a.gap_m2, 1, float(gap), 0.0)
+        p.gap_n, p.gap_mean, p.gap_m2 = _combine(n, mean, m2, b.gap_n, b.gap_mean, b.gap_m2)
+        p.gap_max = max(a.gap_max, b.gap_max, gap)
+        p.first, p.last = a.first, max(a.last, b.last)
+
+        p.micro = a.micro + b.micro
+        p.micro_prefix = a.n + b.micro_prefix if a.micro_prefix == a.n else a.micro_prefix
+        p.micro_suffix = b.n + a.micro_suffix if b.micro_suffix == b.n else b.micro_suffix
+        p.micro_max = max(a.micro_max, b.micro_max, a.micro_suffix + b.micro_prefix)
+
+        p.window_max = max(a.window_max, b.window_max, _window_max(np.concatenate((a.tail, b.head)), window))
+        p.head = np.concatenate((a.head, b.head[b.head <= p.first + window]))
+        p.tail = np.concatenate((a.tail[a.tail >= p.last - window], b.tail))
+        return p
+
+    def features(self) -> dict:
+        return {
+            "tx_count": self.n,
+            "mean_amount": self.mean,
+            # Sample std for amounts, population std for gaps, as the notebook computed them
+            "std_amount": math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0,
+            "min_amount": self.min,
+            "median_amount": float(np.median(self.sample)),
+            "max_amount": self.max,
+            "mean_gap_steps": self.gap_mean,
+            "std_gap_steps": math.sqrt(self.gap_m2 / self.gap_n) if self.gap_n else 0.0,
+            "max_gap_steps": self.gap_max,
+            "tx_in_window_max": self.window_max,
+            "micro_ratio": self.micro / self.n,
+            "micro_count": self.micro,
+            "micro_streak_max": self.micro_max,
+            "first_step": self.first,
+            "last_step": self.last,
+            "active_steps": self.last - self.first,
+        }
+
+
+def reduce_chunk(chunk: pd.DataFrame, window: int, micro_threshold: float, sample_size: int) -> dict:
+    """One Partial per subscription in the chunk, keyed by subscription_id."""
+    chunk = chunk.dropna(subset=["subscription_id", "step", "amount"])
+    if chunk.empty:
+        return {}
+    codes, keys = pd.factorize(chunk["subscription_id"], sort=False)
+    # Stable, so each subscription keeps the file (step) order of its rows
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    amounts = chunk["amount"].to_numpy(dtype=np.float64)[order]
+    steps = chunk["step"].to_numpy(dtype=np.int64)[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(codes)]))
+    return {
+        keys[codes[s]]: Partial.from_run(amounts[s:e], steps[s:e], window, micro_threshold, sample_size)
+        for s, e in zip(starts, ends)
+    }
+
+
+def read_chunks(path: str, chunk_rows: int):
+    columns = ["subscription_id", "step", "amount"]
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def aggregate(path: str, chunk_rows: int, workers: int, window: int, micro_threshold: float, sample_size: int) -> dict:
+    rng = np.random.default_rng(42)
+    state: dict = {}
+
+    def fold(partials: dict):
+        for key, p in partials.items():
+            prev = state.get(key)
+            state[key] = p if prev is None else prev.merge(p, window, sample_size, rng)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bounded read-ahead; results are folded strictly in chunk order
+        pending: deque = deque()
+        for chunk in read_chunks(path, chunk_rows):
+            pending.append(pool.submit(reduce_chunk, chunk, window, micro_threshold, sample_size))
+            if len(pending) >= 2 * workers:
+                fold(pending.popleft().result())
+        while pending:
+            fold(pending.popleft().result())
+    return state
+
+
+def score(features: pd.DataFrame, block: float, review: float, anomaly: bool) -> pd.DataFrame:
+    """Rule patterns, IsolationForest anomaly score and the final decision, per subscription."""
+    velocity = features["tx_in_window_max"] >= VELOCITY_WINDOW_MIN
+    irregular = (features["tx_count"] >= IRREGULAR_MIN_TX) & (features["std_gap_steps"] >= IRREGULAR_MIN_GAP_STD)
+    features["patterns_detected"] = [
+        str([name for name, hit in (("VELOCITY_SPIKE", v), ("IRREGULAR_RECURRING", i)) if hit])
+        for v, i in zip(velocity, irregular)
+    ]
+
+    if anomaly and len(features) > 1:
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+        X = StandardScaler().fit_transform(features[ANOMALY_FEATURES])
+        iso = IsolationForest(n_estimators=250, random_state=42, contamination=0.02).fit(X)
+        features["anomaly_raw"] = -iso.score_samples(X)  # higher = more anomalous
+        mn, mx = features["anomaly_raw"].min(), features["anomaly_raw"].max()
+        features["subscription_anomaly_score"] = (features["anomaly_raw"] - mn) / (mx - mn + 1e-9)
+    else:
+        features["anomaly_raw"] = 0.0
+        features["subscription_anomaly_score"] = 0.0
+
+    features["rule_abuse_score"] = RULE_WEIGHT * (velocity.astype(int) + irregular.astype(int))
+    features["final_abuse_score"] = (
+        ANOMALY_WEIGHT * features["subscription_anomaly_score"]
+        + (1 - ANOMALY_WEIGHT) * features["rule_abuse_score"]
+    )
+    features["decision"] = np.select(
+        [features["final_abuse_score"] >= block, features["final_abuse_score"] >= review],
+        ["BLOCK", "REVIEW"], default="ALLOW"
+    )
+    return features[COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Transaction CSV or .parquet with subscription_id, step, amount")
+    parser.add_argument("-o", "--output", default="banksim_subscription_abuse_features.csv")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window-steps", type=int, default=WINDOW_STEPS)
+    parser.add_argument("--micro-threshold", type=float, default=MICRO_THRESHOLD)
+    parser.add_argument("--median-sample", type=int, default=10_001, help="Exact median up to this many tx per subscription")
+    parser.add_argument("--block-score", type=float, default=0.75)
+    parser.add_argument("--review-score", type=float, default=0.5)
+    parser.add_argument("--no-anomaly", action="store_true", help="Skip the IsolationForest (scores 0)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = aggregate(
+        args.input, args.chunk_rows, args.workers, args.window_steps, args.micro_threshold, args.median_sample
+    )
+    features = pd.DataFrame.from_dict({k: p.features() for k, p in state.items()}, orient="index")
+    features = features.rename_axis("subscription_id").reset_index().sort_values("subscription_id", ignore_index=True)
+    del state
+
+    out = score(features, args.block_score, args.review_score, not args.no_anomaly)
+    out.to_csv(args.output, index=False)
+    print(f"Wrote {len(out)} subscriptions to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
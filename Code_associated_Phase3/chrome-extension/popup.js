@@ -532,24 +532,20 @@ async function investigateTransaction() {
     };
 
     try {
-        const url = `${firewallBaseUrl.replace(/\/$/, '')}/investigate-transaction`;
-        const response = await fetch(url, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(invPayload)
-        });
-
-        if (!response.ok) throw new Error(`RAG Error: ${response.status}`);
-        const data = await response.json();
-        const info = data.investigation;
-
-        // Format the output
-        let html = `<strong>Risk Summary:</strong> ${info.risk_summary || 'N/A'}\n\n`;
-        if (info.key_reasons) html += `<strong>Reasons:</strong>\n- ${info.key_reasons.join('\n- ')}\n\n`;
-        if (info.cancellation_instructions) html += `<strong>How to Cancel:</strong>\n${info.cancellation_instructions.join('\n')}`;
-
-        content.innerHTML = html.replace(/\n/g, '<br>');
+        const base = firewallBaseUrl.replace(/\/$/, '');
+        // Stream fields in as Gemini writes them; fall back to the blocking endpoint on older servers
+        const streamed = await streamInvestigation(`${base}/investigate-transaction/stream`, invPayload, content);
+        if (!streamed) {
+            const response = await fetch(`${base}/investigate-transaction`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(invPayload)
+            });
 
+            if (!response.ok) throw new Error(`RAG Error: ${response.status}`);
+            const data = await response.json();
+            renderInvestigation(content, data.investigation);
+        }
     } catch (e) {
         content.textContent = "Error: " + e.message;
     } finally {
@@ -558,6 +554,61 @@ async function investigateTransaction() {
     }
 }
 
+function renderInvestigation(content, info) {
+    // Format the output
+    let html = `<strong>Risk Summary:</strong> ${info.risk_summary || 'N/A'}\n\n`;
+    if (info.key_reasons) html += `<strong>Reasons:</strong>\n- ${info.key_reasons.join('\n- ')}\n\n`;
+    if (info.cancellation_instructions) html += `<strong>How to Cancel:</strong>\n${info.cancellation_instructions.join('\n')}`;
+
+    content.innerHTML = html.replace(/\n/g, '<br>');
+}
+
+// Reads the SSE stream, re-rendering as each investigation field arrives.
+// Returns false if the server has no streaming endpoint.
+async function streamInvestigation(url, payload, content) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify(payload)
+    });
+    if (response.status === 404 || response.status === 405) return false;
+    if (!response.ok || !response.body) throw new Error(`RAG Error: ${response.status}`);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const info = {};
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+
+            let event = 'message', data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            const msg = data ? JSON.parse(data) : {};
+
+            if (event === 'field') {
+                info[msg.name] = msg.value;
+                renderInvestigation(content, info);
+            } else if (event === 'done') {
+                renderInvestigation(content, msg.investigation);
+            } else if (event === 'error') {
+                throw new Error(msg.detail);
+            }
+        }
+    }
+    return true;
+}
+
 // Universal Helper for Domain Parsing
 function extractRootDomain(hostname) {
     let domain = hostname.toLowerCase();
@@ -0,0 +1,60 @@
+import importlib.util
+import random
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent
+
+# Lets the tests import the firewall as `app.*`, like the service does
+sys.path.insert(0, str(ROOT / "recurring_firewall"))
+
+# Smoke script against a running server, not a pytest module
+collect_ignore = ["test_full_parity.py"]
+
+
+def load_module(name: str, relative_path: str):
+    """Imports a standalone script (the ML apps aren't packages) by path."""
+    spec = importlib.util.spec_from_file_location(name, ROOT / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def mutate(rng: random.Random, name: str, alphabet: str = "abcdefghijklmnopqrstuvwxyz0123456789 ") -> str:
+    """One to three random character edits."""
+    chars = list(name)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 1 / 3 and chars:
+            chars.pop(min(i, len(chars) - 1))
+        elif op < 2 / 3:
+            chars.insert(i, rng.choice(alphabet))
+        elif chars:
+            chars[min(i, len(chars) - 1)] = rng.choice(alphabet)
+    return "".join(chars).strip()
+
+
+@pytest.fixture(scope="session")
+def company_list():
+    """The shipped company registry, normalized the way the service loads it (no snapshot)."""
+    pytest.importorskip("pandas")
+    from app.core.config import settings
+    from app.core.csv_loader import CSVLoader
+    enabled, settings.SNAPSHOT_ENABLED = settings.SNAPSHOT_ENABLED, False
+    try:
+        companies = CSVLoader()._load_company_csv()
+    finally:
+        settings.SNAPSHOT_ENABLED = enabled
+    if not companies:
+        pytest.skip("Company Names.csv not available")
+    return companies
+
+
+@pytest.fixture
+def company_loader(company_list):
+    from app.core.csv_loader import CSVLoader
+    loader = CSVLoader()
+    loader.publish(loader.data.replace(company_list=company_list))
+    return loader
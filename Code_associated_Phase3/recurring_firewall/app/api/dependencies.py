@@ -11,3 +11,33 @@ def get_rag_service():
 
 def get_tx_repo():
     return container.tx_repo
+
+def get_rename_service():
+    return container.rename_service
+
+def get_audit_writer():
+    return container.audit_writer
+
+def get_reload_service():
+    return container.reload_service
+
+def get_tx_stats_service():
+    return container.tx_stats_service
+
+def get_subscription_store():
+    return container.subscription_store
+
+def get_velocity_tracker():
+    return container.velocity_tracker
+
+def get_model_service():
+    return container.model_service
+
+def get_investigation_cache():
+    return container.investigation_cache
+
+def get_llm_gateway():
+    return container.llm_gateway
+
+def get_case_index():
+    return container.case_index
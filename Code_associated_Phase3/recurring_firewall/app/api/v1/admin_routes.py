@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from ...services.reload_service import DataReloadService
+from ..dependencies import get_reload_service
+
+router = APIRouter(prefix="/admin")
+
+@router.post("/reload-data")
+async def reload_data(reload_service: DataReloadService = Depends(get_reload_service)):
+    """
+    Rebuilds merchant/company data from the CSVs in the background and swaps
+    it in without a restart. Returns timing and row-count diffs.
+    """
+    try:
+        return await reload_service.reload(reason="admin")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reload-status")
+async def reload_status(reload_service: DataReloadService = Depends(get_reload_service)):
+    return {
+        "ok": True,
+        "version": reload_service.csv_loader.version,
+        "last_reload": reload_service.last_report
+    }
@@ -1,39 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from ...models.dtos import InvestigateRequestDTO, InvestigateResponseDTO
 from ...services.rag_service import RAGService
-from ...services.gemini_service import GeminiService
-from ..dependencies import get_rag_service, get_gemini_service
+from ...services.llm_gateway import LLMGateway
+from ...services.investigation_cache import InvestigationCache
+from ...services.prompt_builder import build_investigation_prompt
+from ...services.case_index import CaseIndex
+from ...domain.entities import CaseLog
+from ...core.json_stream import JSONFieldStream
+from ...core.logger import logger
+from ..dependencies import get_rag_service, get_llm_gateway, get_investigation_cache, get_case_index
 import json
 import re
+import time
 
 router = APIRouter()
 
-def build_gemini_prompt(payload: dict, rag: dict):
-    return f"""
-You are an expert Fraud Analyst Assistant in a bank for "Recurring Payment Firewall".
-
-STRICT:
-- Only use payload + RAG evidence.
-- If unknown say "insufficient evidence".
-- Output must be VALID JSON only (no markdown).
-
-PAYLOAD:
-{payload}
-
-RAG:
-{rag}
-
-OUTPUT JSON:
-{{
-  "risk_summary": "2 lines max",
-  "key_reasons": ["...", "..."],
-  "recommended_bank_action": ["..."],
-  "customer_guidance": ["..."],
-  "cancellation_instructions": ["Step 1...", "Step 2..."],
-  "confidence": "LOW/MEDIUM/HIGH"
-}}
-""".strip()
-
 def safe_parse_gemini_json(text: str):
     t = text.strip()
     if t.startswith("```"):
@@ -45,31 +27,151 @@ def safe_parse_gemini_json(text: str):
     except Exception:
         return {"raw_text": text, "error": "LLM output not valid JSON"}
 
-@router.post("/investigate-transaction", response_model=InvestigateResponseDTO)
-async def investigate_transaction(
-    req: InvestigateRequestDTO,
-    rag_service: RAGService = Depends(get_rag_service),
-    gemini_service: GeminiService = Depends(get_gemini_service)
-):
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _prepare(req: InvestigateRequestDTO, rag_service: RAGService):
     merchant_id = (req.merchant_id or "UNKNOWN").strip()
     merchant_name = (req.merchant_name or "UNKNOWN").strip()
 
     # 1. Build Context
-    rag = await rag_service.build_context(merchant_id, merchant_name)
+    payload = req.model_dump()
+    rag = await rag_service.build_context(merchant_id, merchant_name, payload)
+    # Retrieval timings stay out of the prompt (and so out of the cache key)
+    sources = rag.pop("sources", {})
+    complete = all(s["status"] == "ok" for s in sources.values())
     
-    # 2. Construct Prompt
-    prompt = build_gemini_prompt(req.model_dump(), rag)
+    # 2. Construct Prompt (compact, within the token budget)
+    prompt, prompt_stats = build_investigation_prompt(payload, rag)
+    if prompt_stats["over_budget"]:
+        logger.warning(f"Investigation prompt for '{merchant_id}' exceeds the token budget: {prompt_stats}")
+    # Similar cases shift every time another merchant is investigated, so the cache is keyed on
+    # the same prompt without them; otherwise each logged case would invalidate every entry
+    basis = build_investigation_prompt(payload, {**rag, "similar_cases": []})[0] if rag.get("similar_cases") else prompt
+    return merchant_id, merchant_name, sources, complete, prompt, basis, prompt_stats, rag
 
-    # 3. Call LLM
-    try:
-        output_text = await gemini_service.generate(prompt)
-        parsed = safe_parse_gemini_json(output_text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"LLM Error: {str(e)}")
+async def _log_case(case_index: CaseIndex, req: InvestigateRequestDTO, merchant_id: str, merchant_name: str, rag: dict, parsed: dict):
+    # Only fresh, parseable answers: cache hits are repeats of a case already logged
+    if case_index and "error" not in parsed:
+        await case_index.log_case(CaseLog(
+            merchant_id=merchant_id,
+            merchant_name=merchant_name,
+            payload=req.model_dump(),
+            rag_context=rag,
+            llm_output=parsed
+        ))
+
+@router.post("/investigate-transaction", response_model=InvestigateResponseDTO)
+async def investigate_transaction(
+    req: InvestigateRequestDTO,
+    rag_service: RAGService = Depends(get_rag_service),
+    llm: LLMGateway = Depends(get_llm_gateway),
+    cache: InvestigationCache = Depends(get_investigation_cache),
+    case_index: CaseIndex = Depends(get_case_index)
+):
+    merchant_id, merchant_name, sources, complete, prompt, basis, prompt_stats, rag = await _prepare(req, rag_service)
+
+    # 3. Same payload + evidence as before -> reuse the earlier answer
+    key = cache.fingerprint(basis) if cache else None
+    hit = await cache.get(key) if cache else None
+    if hit:
+        parsed = hit.investigation
+    else:
+        # 4. Call LLM
+        try:
+            start = time.perf_counter()
+            output_text = await llm.generate(prompt)
+            parsed = safe_parse_gemini_json(output_text)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"LLM Error: {str(e)}")
+        # Unparseable output, or an answer built on partial evidence, is not worth keeping
+        if cache and complete and "error" not in parsed:
+            await cache.put(key, parsed, prompt, output_text, (time.perf_counter() - start) * 1000)
+        await _log_case(case_index, req, merchant_id, merchant_name, rag, parsed)
 
     return {
         "ok": True, 
         "merchant_id": merchant_id, 
         "merchant_name": merchant_name, 
-        "investigation": parsed
+        "investigation": parsed,
+        "cached": hit is not None,
+        "sources": sources,
+        "prompt": prompt_stats
+    }
+
+@router.post("/investigate-transaction/stream")
+async def investigate_transaction_stream(
+    req: InvestigateRequestDTO,
+    rag_service: RAGService = Depends(get_rag_service),
+    llm: LLMGateway = Depends(get_llm_gateway),
+    cache: InvestigationCache = Depends(get_investigation_cache),
+    case_index: CaseIndex = Depends(get_case_index)
+):
+    """
+    Server-Sent Events variant of /investigate-transaction:
+      context - merchant, RAG source statuses and prompt size, before the LLM is called
+      chunk   - raw LLM text as it arrives
+      field   - a top-level investigation field, as soon as its value parses
+      done    - the full parsed investigation (same as the JSON endpoint)
+      error   - the LLM failed mid-stream
+    """
+    merchant_id, merchant_name, sources, complete, prompt, basis, prompt_stats, rag = await _prepare(req, rag_service)
+    key = cache.fingerprint(basis) if cache else None
+    hit = await cache.get(key) if cache else None
+
+    async def events():
+        yield _sse("context", {"merchant_id": merchant_id, "merchant_name": merchant_name, "sources": sources, "prompt": prompt_stats})
+        if hit:
+            for name, value in hit.investigation.items():
+                yield _sse("field", {"name": name, "value": value})
+            yield _sse("done", {"investigation": hit.investigation, "cached": True})
+            return
+
+        start = time.perf_counter()
+        fields = JSONFieldStream()
+        parts = []
+        try:
+            async for chunk in llm.generate_stream(prompt):
+                parts.append(chunk)
+                yield _sse("chunk", {"text": chunk})
+                for name, value in fields.feed(chunk):
+                    yield _sse("field", {"name": name, "value": value})
+        except Exception as e:
+            logger.error("Streaming investigation failed", exc_info=e)
+            yield _sse("error", {"detail": f"LLM Error: {str(e)}"})
+            return
+
+        output_text = "".join(parts)
+        parsed = safe_parse_gemini_json(output_text)
+        if cache and complete and "error" not in parsed:
+            await cache.put(key, parsed, prompt, output_text, (time.perf_counter() - start) * 1000)
+        yield _sse("done", {"investigation": parsed, "cached": False})
+        await _log_case(case_index, req, merchant_id, merchant_name, rag, parsed)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/similar-cases")
+async def similar_cases(req: InvestigateRequestDTO, case_index: CaseIndex = Depends(get_case_index)):
+    """
+    Past investigations and the policy that best match a transaction, without
+    calling the LLM. closest_policy is the nearest by name and may belong to
+    another merchant (the one a look-alike imitates); investigations only use
+    the merchant's own policy.
+    """
+    if not case_index:
+        raise HTTPException(status_code=503, detail="Case index is disabled")
+    start = time.perf_counter()
+    payload = req.model_dump()
+    cases = case_index.similar_cases(payload, (req.merchant_id or "").strip() or None)
+    policy = case_index.match_policy(payload)
+    return {
+        "ok": True,
+        "cases": cases,
+        "closest_policy": policy.model_dump() if policy else None,
+        "ms": round((time.perf_counter() - start) * 1000, 3)
     }
@@ -3,7 +3,8 @@ from typing import List
 from ...models.dtos import MerchantHistoryResponseDTO
 from ...db.repos.concrete import TransactionRepo
 from ...domain.entities import TransactionScore
-from ..dependencies import get_tx_repo
+from ...services.tx_stats_service import TransactionStatsService
+from ..dependencies import get_tx_repo, get_tx_stats_service
 
 router = APIRouter()
 
@@ -25,3 +26,20 @@ async def get_recent_transactions(
         "count": len(txs),
         "history": [t.model_dump() for t in txs]
     }
+
+@router.get("/merchant-history/{merchant_id}", response_model=MerchantHistoryResponseDTO)
+async def get_merchant_history(
+    merchant_id: str,
+    hours: int = Query(24, ge=1, le=24 * 90),
+    stats_service: TransactionStatsService = Depends(get_tx_stats_service)
+):
+    # Hourly rollups (newest first) rather than raw transactions
+    history = await stats_service.merchant_history(merchant_id.strip(), hours)
+    return {"ok": True, "merchant_id": merchant_id, "count": len(history), "history": history}
+
+@router.get("/transaction-summary")
+async def get_transaction_summary(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    stats_service: TransactionStatsService = Depends(get_tx_stats_service)
+):
+    return {"ok": True, **await stats_service.summary(hours)}
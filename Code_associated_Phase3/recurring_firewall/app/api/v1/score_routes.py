@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from ...models.dtos import ScoreRequestDTO, ScoreResponseDTO
+from ...models.dtos import ScoreRequestDTO, ScoreResponseDTO, ScoreBatchRequestDTO, ScoreBatchResponseDTO
 from ...services.scoring_service import ScoringService
-from ..dependencies import get_scoring_service
+from ...domain.subscription_features import SubscriptionFeatureStore
+from ..dependencies import get_scoring_service, get_subscription_store
 
 router = APIRouter()
 
@@ -14,8 +15,33 @@ async def score_transaction(
         result = await scoring_service.score_transaction(
             merchant_id=req.merchant_id,
             merchant_name=req.merchant_name or "",
-            amount=req.amount
+            amount=req.amount,
+            subscription_id=req.subscription_key,
+            model_features=req.model_features
         )
         return result # Pydantic will map Domain Entity -> DTO if fields match
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/score-transactions", response_model=ScoreBatchResponseDTO)
+async def score_transactions(
+    req: ScoreBatchRequestDTO,
+    scoring_service: ScoringService = Depends(get_scoring_service)
+):
+    try:
+        results = await scoring_service.score_batch(
+            [(t.merchant_id, t.merchant_name or "", t.amount, t.subscription_key, t.model_features) for t in req.transactions]
+        )
+        return {"ok": True, "count": len(results), "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/subscription-features/{subscription_id}")
+async def subscription_features(
+    subscription_id: str,
+    store: SubscriptionFeatureStore = Depends(get_subscription_store)
+):
+    features = store.get(subscription_id) if store else None
+    if features is None:
+        raise HTTPException(status_code=404, detail="No live features for this subscription")
+    return {"ok": True, "subscription_id": subscription_id, "features": features}
@@ -1,7 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from ...db.mongo import mongo_manager
 from ...models.dtos import SystemStatusResponseDTO
 from ...core.config import settings
+from ...services.rename_service import RenameService
+from ...services.audit_writer import AuditWriter
+from ...domain.velocity import VelocityTracker
+from ...services.model_service import ModelService
+from ...services.investigation_cache import InvestigationCache
+from ...services.llm_gateway import LLMGateway
+from ...services.case_index import CaseIndex
+from ..dependencies import (
+    get_rename_service, get_audit_writer, get_velocity_tracker, get_model_service, get_investigation_cache,
+    get_llm_gateway, get_case_index
+)
 
 router = APIRouter()
 
@@ -14,3 +25,58 @@ async def mongo_status():
         return {"mongo": "CONNECTED", "ok": True, "db": settings.DB_NAME}
     except Exception as e:
         return {"mongo": "ERROR", "ok": False}
+
+@router.get("/mongo-pool-stats")
+async def mongo_pool_stats():
+    return {"ok": True, "pool": mongo_manager.stats()}
+
+@router.get("/cache-stats")
+async def cache_stats(rename_service: RenameService = Depends(get_rename_service)):
+    return {
+        "ok": True,
+        "match_cache": rename_service.cache.stats() if rename_service else None
+    }
+
+@router.get("/audit-stats")
+async def audit_stats(audit_writer: AuditWriter = Depends(get_audit_writer)):
+    return {
+        "ok": True,
+        "audit_writer": audit_writer.stats() if audit_writer else None
+    }
+
+@router.get("/investigation-cache-stats")
+async def investigation_cache_stats(cache: InvestigationCache = Depends(get_investigation_cache)):
+    return {
+        "ok": True,
+        "investigation_cache": cache.stats() if cache else None
+    }
+
+@router.get("/llm-stats")
+async def llm_stats(llm: LLMGateway = Depends(get_llm_gateway)):
+    return {
+        "ok": True,
+        "llm": llm.stats() if llm else None
+    }
+
+@router.get("/case-index-stats")
+async def case_index_stats(case_index: CaseIndex = Depends(get_case_index)):
+    return {
+        "ok": True,
+        "case_index": case_index.stats() if case_index else None
+    }
+
+@router.get("/model-stats")
+async def model_stats(model_service: ModelService = Depends(get_model_service)):
+    return {
+        "ok": True,
+        "model": model_service.stats() if model_service else None
+    }
+
+@router.get("/velocity/{merchant_id}")
+async def merchant_velocity(merchant_id: str, tracker: VelocityTracker = Depends(get_velocity_tracker)):
+    return {
+        "ok": True,
+        "merchant_id": merchant_id,
+        "velocity": tracker.get(merchant_id) if tracker else None,
+        "tracker": tracker.stats() if tracker else None
+    }
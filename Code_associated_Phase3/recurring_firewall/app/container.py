@@ -1,25 +1,56 @@
+import asyncio
 from .core.csv_loader import CSVLoader
 from .db.mongo import mongo_manager, get_database
 from .services.rename_service import RenameService
 from .services.gemini_service import GeminiService
+from .services.fake_llm_service import FakeLLMService
+from .services.llm_gateway import LLMGateway
 from .services.scoring_service import ScoringService
-from .db.repos.concrete import MerchantRepo, TransactionRepo, PolicyRepo
-from .domain.entities import MerchantProfile, TransactionScore, MerchantPolicy
+from .services.audit_writer import AuditWriter
+from .services.model_service import ModelService
+from .services.investigation_cache import InvestigationCache
+from .services.case_index import CaseIndex
+from .services.reload_service import DataReloadService
+from .core.config import settings
+from .db.repos.concrete import MerchantRepo, TransactionRepo, PolicyRepo, RollupRepo, InvestigationCacheRepo, CaseLogRepo
+from .domain.entities import MerchantProfile, TransactionScore, MerchantPolicy, TransactionRollup, CachedInvestigation, CaseLog
+from .services.tx_stats_service import TransactionStatsService
+from .core.exceptions import ConfigurationError
 from .domain.similarity_engine import SimilarityEngine
+from .domain.subscription_features import SubscriptionFeatureStore
+from .domain.velocity import VelocityTracker
 from .core.logger import logger
 
+LLM_BACKENDS = {
+    "gemini": GeminiService,
+    "fake": FakeLLMService,
+}
+
 class Container:
     def __init__(self):
         self.csv_loader = CSVLoader()
-        self.gemini_service = GeminiService()
+        self.gemini_service = None
+        self.llm_gateway = None
         self.similarity_engine = None
         self.rename_service = None
         self.scoring_service = None
+        self.audit_writer = None
+        self.reload_service = None
+        self.tx_stats_service = None
+        self.subscription_store = None
+        self.velocity_tracker = None
+        self.model_service = None
+        self.investigation_cache = None
+        self.case_writer = None
+        self.case_index = None
         
         # Repos
         self.merchant_repo = None
         self.tx_repo = None
         self.policy_repo = None
+        self.rollup_repo = None
+        self.investigation_cache_repo = None
+        self.case_log_repo = None
 
     async def startup(self):
         logger.info("Container Startup: Initializing components...")
@@ -30,8 +61,25 @@ class Container:
         
         # 2. Init Repos
         self.merchant_repo = MerchantRepo(db, "merchant_profiles", MerchantProfile)
-        self.tx_repo = TransactionRepo(db, "transactions", TransactionScore)
+        if settings.TX_STORAGE_MODE not in ("raw", "bucketed"):
+            raise ConfigurationError(f"Unknown TX_STORAGE_MODE: {settings.TX_STORAGE_MODE}")
+        if settings.TX_STORAGE_MODE == "bucketed":
+            self.rollup_repo = RollupRepo(db, "transaction_rollups", TransactionRollup)
+        self.tx_repo = TransactionRepo(db, "transactions", TransactionScore, rollups=self.rollup_repo)
         self.policy_repo = PolicyRepo(db, "merchant_policies", MerchantPolicy)
+        if settings.INVESTIGATION_CACHE_ENABLED and settings.INVESTIGATION_CACHE_PERSIST:
+            self.investigation_cache_repo = InvestigationCacheRepo(db, "investigation_cache", CachedInvestigation)
+        if settings.CASE_INDEX_ENABLED:
+            self.case_log_repo = CaseLogRepo(db, "case_logs", CaseLog)
+        if settings.MONGO_ENSURE_INDEXES:
+            await self.ensure_indexes()
+
+        # LLM backend behind the gateway (limits, coalescing, deadlines, circuit breaker)
+        backend = LLM_BACKENDS.get(settings.LLM_BACKEND)
+        if backend is None:
+            raise ConfigurationError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND}")
+        self.gemini_service = backend()
+        self.llm_gateway = LLMGateway(self.gemini_service)
 
         # 3. Load Data
         self.csv_loader.load_data()
@@ -39,24 +87,93 @@ class Container:
         # 4. Init Services
         self.similarity_engine = SimilarityEngine(self.csv_loader)
         self.rename_service = RenameService(self.similarity_engine)
+        self.audit_writer = AuditWriter(self.tx_repo)
+        self.audit_writer.start()
+        self.tx_stats_service = TransactionStatsService(self.tx_repo, self.rollup_repo)
+        self.reload_service = DataReloadService(self.csv_loader, self.similarity_engine)
+        self.reload_service.start_watching(settings.DATA_WATCH_INTERVAL_SECONDS)
         
+        if settings.SUBSCRIPTION_FEATURES_ENABLED:
+            self.subscription_store = SubscriptionFeatureStore(
+                max_subscriptions=settings.SUBSCRIPTION_STORE_SIZE,
+                ttl_seconds=settings.SUBSCRIPTION_IDLE_TTL_SECONDS,
+                step_seconds=settings.SUBSCRIPTION_STEP_SECONDS,
+                window_steps=settings.SUBSCRIPTION_WINDOW_STEPS,
+                micro_threshold=settings.SUBSCRIPTION_MICRO_THRESHOLD
+            )
+
+        if settings.VELOCITY_ENABLED:
+            self.velocity_tracker = VelocityTracker(
+                max_merchants=settings.VELOCITY_MAX_MERCHANTS,
+                window_minutes=settings.VELOCITY_WINDOW_MINUTES,
+                short_minutes=settings.VELOCITY_SHORT_MINUTES,
+                micro_threshold=settings.VELOCITY_MICRO_THRESHOLD,
+                min_transactions=settings.VELOCITY_MIN_TX
+            )
+
+        self.model_service = ModelService()
+        self.model_service.start()
+
         self.scoring_service = ScoringService(
             csv_loader=self.csv_loader,
             rename_service=self.rename_service,
             tx_repo=self.tx_repo,
-            merchant_repo=self.merchant_repo
+            merchant_repo=self.merchant_repo,
+            audit_writer=self.audit_writer,
+            subscription_store=self.subscription_store,
+            velocity=self.velocity_tracker,
+            model_service=self.model_service
         )
         
+        if settings.CASE_INDEX_ENABLED:
+            # Case logs are nice-to-have: drop them rather than slow investigations down
+            self.case_writer = AuditWriter(self.case_log_repo, overflow_policy="drop")
+            self.case_writer.start()
+            self.case_index = CaseIndex(self.policy_repo, self.case_log_repo, self.case_writer)
+            try:
+                await self.case_index.load()
+            except Exception as e:
+                # Start with an empty index; new cases still get indexed as they are logged
+                logger.error("Loading the case index failed", exc_info=e)
+
         from .services.rag_service import RAGService
         self.rag_service = RAGService(
             merchant_repo=self.merchant_repo,
             tx_repo=self.tx_repo,
             policy_repo=self.policy_repo,
-            csv_loader=self.csv_loader
+            csv_loader=self.csv_loader,
+            case_index=self.case_index
         )
+        if settings.INVESTIGATION_CACHE_ENABLED:
+            self.investigation_cache = InvestigationCache(self.investigation_cache_repo)
         logger.info("Container Startup Complete.")
 
+    async def ensure_indexes(self):
+        repos = tuple(
+            r for r in (self.merchant_repo, self.tx_repo, self.policy_repo, self.rollup_repo, self.investigation_cache_repo,
+                      self.case_log_repo)
+            if r
+        )
+        results = await asyncio.gather(*(r.ensure_indexes() for r in repos), return_exceptions=True)
+        for repo, result in zip(repos, results):
+            # Missing indexes only cost speed, so don't refuse to start over them
+            if isinstance(result, Exception):
+                logger.error(f"Index creation on '{repo.collection.name}' failed", exc_info=result)
+            else:
+                logger.info(f"Indexes ready on '{repo.collection.name}': {result}")
+
     async def shutdown(self):
+        if self.reload_service:
+            await self.reload_service.stop_watching()
+        if self.model_service:
+            await self.model_service.close()
+        if self.llm_gateway:
+            self.llm_gateway.close()
+        # Drain pending audit writes before the DB connection goes away
+        if self.audit_writer:
+            await self.audit_writer.close()
+        if self.case_writer:
+            await self.case_writer.close()
         await mongo_manager.close()
 
 # Singleton
@@ -0,0 +1,91 @@
+"""
+Flat, memory-mappable building blocks for the CSV-backed stores: strings as
+one UTF-8 blob plus offsets, and a sorted 64-bit hash index for exact lookups.
+Neither needs a per-process Python dict, so loading one from a snapshot is
+just an mmap.
+"""
+
+import hashlib
+from collections.abc import Sequence
+from typing import Iterable, List, Optional
+import numpy as np
+
+
+def narrow_int_dtype(lo: int, hi: int) -> np.dtype:
+    """Smallest signed integer dtype holding [lo, hi]."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def stable_hash(key: str) -> int:
+    # Python's hash() is salted per process, snapshots need a stable one
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StringColumn(Sequence):
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, values: Iterable[str]) -> "StringColumn":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def tolist(self) -> List[str]:
+        return [self[i] for i in range(len(self))]
+
+    @property
+    def nbytes(self) -> int:
+        return self.blob.nbytes + self.offsets.nbytes
+
+
+class HashIndex:
+    """
+    Exact key -> row lookup over a StringColumn via sorted 64-bit hashes.
+    Collisions are resolved by comparing the stored strings; for duplicate
+    keys the last row wins, like assigning into a dict row by row.
+    """
+    def __init__(self, keys: StringColumn, hashes: np.ndarray, rows: np.ndarray, size: int):
+        self.keys = keys
+        self.hashes = hashes
+        self.rows = rows
+        self.size = size
+
+    @classmethod
+    def build(cls, keys: StringColumn, values: List[str], mask: Optional[np.ndarray] = None) -> "HashIndex":
+        rows = np.arange(len(values), dtype=narrow_int_dtype(0, max(len(values) - 1, 0)))
+        if mask is not None:
+            rows = rows[mask]
+        hashes = np.fromiter((stable_hash(values[r]) for r in rows), dtype=np.uint64, count=len(rows))
+        order = np.lexsort((rows, hashes))
+        size = len({values[r] for r in rows})
+        return cls(keys, hashes[order], rows[order], size)
+
+    def get(self, key: str) -> Optional[int]:
+        h = np.uint64(stable_hash(key))
+        lo, hi = np.searchsorted(self.hashes, h, "left"), np.searchsorted(self.hashes, h, "right")
+        found = None
+        for j in range(lo, hi):
+            row = int(self.rows[j])
+            if self.keys[row] == key:
+                found = row
+        return found
+
+    @property
+    def nbytes(self) -> int:
+        return self.hashes.nbytes + self.rows.nbytes
+
+    def __len__(self) -> int:
+        return self.size
@@ -10,10 +10,60 @@ class Settings(BaseSettings):
     # Database
     MONGO_URI: str = "mongodb://localhost:27017"
     DB_NAME: str = "recurring_firewall"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300_000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5_000 # Max wait for a free pooled connection; 0 = forever
+    MONGO_CONNECT_TIMEOUT_MS: int = 5_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+    MONGO_SOCKET_TIMEOUT_MS: int = 0 # 0 = no timeout
+    MONGO_COMPRESSORS: str = "" # e.g. "zstd,snappy,zlib"; empty = no wire compression
+    MONGO_ENSURE_INDEXES: bool = True # Create the repositories' indexes on startup
+
+    # Transaction storage
+    TX_STORAGE_MODE: str = "raw" # raw | bucketed (TTL on raw transactions + hourly per-merchant rollups)
+    TX_RETENTION_DAYS: float = 30 # Raw transaction TTL in bucketed mode
+    TX_ROLLUP_RETENTION_DAYS: float = 400 # Rollup TTL in bucketed mode; 0 = keep forever
     
     # AI / LLM
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "models/gemini-2.5-flash" # Default, can be overridden
+    LLM_BACKEND: str = "gemini" # gemini | fake (canned, streamed locally; for offline testing)
+    FAKE_LLM_FIRST_CHUNK_MS: float = 300
+    FAKE_LLM_CHUNK_CHARS: int = 24
+    FAKE_LLM_CHUNK_DELAY_MS: float = 30
+    LLM_MAX_CONCURRENCY: int = 8 # Backend calls in flight at once (also the Gemini thread pool size)
+    LLM_MAX_QUEUE: int = 100 # Calls waiting for a slot before new ones are rejected; 0 = unbounded
+    LLM_TIMEOUT_SECONDS: float = 60 # Deadline per call, queueing included
+    LLM_BREAKER_FAILURES: int = 5 # Consecutive failures that open the circuit; 0 = never open
+    LLM_BREAKER_RESET_SECONDS: float = 30 # Open time before a single probe call is let through
+
+    # RAG retrieval: sources are fetched concurrently, each under its own timeout
+    RAG_PROFILE_TIMEOUT_SECONDS: float = 1.0
+    RAG_TRANSACTIONS_TIMEOUT_SECONDS: float = 1.5
+    RAG_POLICY_TIMEOUT_SECONDS: float = 1.0
+
+    # Investigation prompt assembly (compact JSON, recent transactions summarized)
+    PROMPT_TOKEN_BUDGET: int = 1200 # Estimated tokens; evidence is trimmed to fit, 0 = no budget
+    PROMPT_TX_EXAMPLES: int = 3 # Latest transactions listed individually next to the aggregates
+    PROMPT_TOP_ITEMS: int = 5 # Most frequent reasons / patterns kept
+
+    # Case log and semantic retrieval over policies / past cases (hashed n-gram vectors, brute-force cosine)
+    CASE_INDEX_ENABLED: bool = True
+    CASE_INDEX_DIM: int = 1024
+    CASE_INDEX_MAX_CASES: int = 20_000 # Most recent cases kept in the index (and loaded at startup)
+    CASE_INDEX_MAX_POLICIES: int = 5_000
+    CASE_INDEX_TOP_K: int = 3 # Similar past cases (other merchants) added to the evidence
+    CASE_INDEX_MIN_SCORE: float = 0.3 # Cosine below which a past case is not considered similar
+    CASE_INDEX_POLICY_MIN_SCORE: float = 0.5 # Closest policy shown by /similar-cases (never used as the merchant's own)
+
+    # Investigation cache (parsed LLM results keyed by a hash of the prompt)
+    INVESTIGATION_CACHE_ENABLED: bool = True
+    INVESTIGATION_CACHE_SIZE: int = 1000
+    INVESTIGATION_CACHE_TTL_SECONDS: float = 86400 # 0 = no expiry
+    INVESTIGATION_CACHE_PERSIST: bool = False # Also keep entries in Mongo (survives restarts, shared across replicas)
+    LLM_COST_PER_1K_INPUT_TOKENS: float = 0.0 # Pricing for the cache's savings report
+    LLM_COST_PER_1K_OUTPUT_TOKENS: float = 0.0
 
     # Paths
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -23,6 +73,69 @@ class Settings(BaseSettings):
     MASTER_CSV_PATH: str = os.path.join(ML_DIR, "Online retial II", "MERGED MASTER NOTEBOOK", "merged_master_firewall_output.csv")
     COMPANY_CSV_PATH: str = os.path.join(ML_DIR, "Online retial II", "company names", "Company Names.csv")
 
+    # Binary snapshots of the parsed CSVs (rebuilt when the source changes)
+    SNAPSHOT_ENABLED: bool = True
+    SNAPSHOT_DIR: str = os.path.join(BASE_DIR, ".snapshots")
+    DATA_WATCH_INTERVAL_SECONDS: float = 0 # Poll the CSVs for changes and hot-reload; 0 = disabled
+
+    # Batch scoring
+    SCORE_BATCH_MAX_SIZE: int = 1000 # Transactions per /score-transactions request
+
+    # Similarity
+    SIMILARITY_NGRAM_SIZE: int = 3
+    # True (default) adds a residual scan over names sharing no n-gram with the query, so results
+    # are identical to extractOne; weak queries then scan most of the registry. False keeps lookups
+    # inside the n-gram candidates (flat p99) but can miss or lower a best match, REVIEW-level ones included.
+    SIMILARITY_EXHAUSTIVE: bool = True
+    MATCH_CACHE_SIZE: int = 10000
+    MATCH_CACHE_TTL_SECONDS: float = 0 # 0 = no expiry
+    SIMILARITY_CDIST_MAX_CELLS: int = 16_000_000 # Score matrix cells per cdist call in batch scoring
+    SIMILARITY_CDIST_WORKERS: int = -1 # Threads per cdist call; -1 = all cores
+
+    # Rename detection pipeline (on top of token_sort_ratio)
+    RENAME_PIPELINE_ENABLED: bool = True
+    RENAME_SCORE_CUTOFF: float = 80 # REVIEW threshold; every pipeline scorer discards scores below it
+    RENAME_MAX_CANDIDATES: int = 20 # Top folded n-gram candidates rescored by the pipeline scorers
+    RENAME_SCORERS: str = "homoglyph" # Applied in this order; token_set_ratio / partial_ratio are opt-in
+    # token_set_ratio / partial_ratio score 100 for any query inside a longer name ("bank" ~ "yes bank"),
+    # so they only score names of comparable length, and never reach the BLOCK line (90) on their own
+    RENAME_PARTIAL_MIN_LENGTH_RATIO: float = 0.8
+    RENAME_PARTIAL_SCORE_CAP: float = 89
+
+    # Online subscription features (running stats per subscription_id)
+    SUBSCRIPTION_FEATURES_ENABLED: bool = True
+    SUBSCRIPTION_STORE_SIZE: int = 100_000 # Max subscriptions kept in memory (LRU)
+    SUBSCRIPTION_IDLE_TTL_SECONDS: float = 0 # Forget subscriptions idle this long; 0 = never
+    SUBSCRIPTION_STEP_SECONDS: float = 86400 # Length of one BankSim "step"
+    SUBSCRIPTION_WINDOW_STEPS: int = 7 # tx_in_window_max counts transactions at most this many steps apart
+    SUBSCRIPTION_MICRO_THRESHOLD: float = 5.0 # Amounts at or below this count as micro-charges
+    SUBSCRIPTION_REVIEW_SCORE: float = 0.7 # rule_abuse_score at which an ALLOW is escalated to REVIEW
+
+    # Live merchant velocity (per-minute sliding windows)
+    VELOCITY_ENABLED: bool = True
+    VELOCITY_MAX_MERCHANTS: int = 50_000 # Merchants tracked at once (LRU)
+    VELOCITY_WINDOW_MINUTES: int = 60
+    VELOCITY_SHORT_MINUTES: int = 5 # Recent span compared against the rest of the window
+    VELOCITY_MIN_TX: int = 10 # Window volume below which no ratios are reported
+    VELOCITY_MICRO_THRESHOLD: float = 5.0
+    VELOCITY_SPIKE_RATIO: float = 5.0 # Same cutoffs as the offline build_reasons
+    VELOCITY_MICROCHARGE_RATE: float = 0.5
+
+    # Embedded BankSim fraud model
+    MODEL_PREPROCESS_PATH: str = os.path.join(ML_DIR, "banksim_preprocess.pkl")
+    MODEL_CLASSIFIER_PATH: str = os.path.join(ML_DIR, "banksim_model.pkl") # Classifier or full Pipeline; absent = disabled
+    MODEL_THRESHOLDS_PATH: str = os.path.join(ML_DIR, "banksim_thresholds.json")
+    MODEL_BATCH_SIZE: int = 256
+    MODEL_BATCH_WAIT_MS: float = 2 # How long the first request of a micro-batch waits for company
+    MODEL_LATENCY_SAMPLES: int = 10000 # Recent timings kept for p50/p99
+
+    # Audit writes (write-behind)
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 0.5
+    AUDIT_OVERFLOW_POLICY: str = "block" # block | drop | spill
+    AUDIT_SPILL_PATH: str = os.path.join(BASE_DIR, "audit_spill.jsonl")
+
     model_config = SettingsConfigDict(
         env_file=(".env", "recurring_firewall/app/.env", "app/.env"), 
         env_file_encoding="utf-8",
@@ -1,89 +1,178 @@
 import pandas as pd
-import ast
-import re
-from typing import Dict, List, Optional
+import numpy as np
+import os
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from ..domain.entities import MerchantProfile
+from .profile_store import ProfileStore, NameIndex
+from .normalize import normalize_name, normalize_many, parse_patterns, fingerprint as normalizer_fingerprint
+from . import snapshot
 from .config import settings
 from .logger import logger
 
+# Bump when the parsing logic changes so old snapshots are ignored; normalization
+# changes are caught by the normalizer fingerprint stored next to it
+_SNAPSHOT_SCHEMA = 1
+
+class ReferenceData:
+    """
+    One generation of reference data: merchant profiles, the normalized-name
+    index, the company registry and its similarity index. Never mutated once
+    published; a reload publishes a new instance, so a request that reads
+    `CSVLoader.data` once sees a single consistent generation throughout.
+    """
+    __slots__ = ("master_df", "company_list", "merchant_lookup", "merchant_name_map", "index", "version")
+
+    def __init__(
+        self,
+        master_df: pd.DataFrame,
+        company_list: List[str],
+        merchant_lookup: Mapping[str, MerchantProfile],
+        merchant_name_map: Mapping[str, str],
+        index: Optional[Any] = None,  # NGramIndex over company_list, built by SimilarityEngine
+        version: int = 0
+    ):
+        self.master_df = master_df
+        self.company_list = company_list
+        self.merchant_lookup = merchant_lookup
+        self.merchant_name_map = merchant_name_map
+        self.index = index
+        self.version = version
+
+    @classmethod
+    def empty(cls) -> "ReferenceData":
+        lookup = ProfileStore.empty()
+        return cls(pd.DataFrame(), [], lookup, NameIndex.build([], lookup.merchant_ids))
+
+    def replace(self, **changes) -> "ReferenceData":
+        fields = {k: getattr(self, k) for k in self.__slots__}
+        fields.update(changes)
+        return ReferenceData(**fields)
+
+    def get_merchant(self, merchant_id: str) -> Optional[MerchantProfile]:
+        return self.merchant_lookup.get(merchant_id)
+
+    def get_merchant_by_name(self, merchant_name: str) -> Optional[MerchantProfile]:
+        mid = self.merchant_name_map.get(normalize_name(merchant_name))
+        if mid:
+            return self.merchant_lookup.get(mid)
+        return None
+
 class CSVLoader:
     def __init__(self):
-        self.master_df = pd.DataFrame()
-        self.company_list: List[str] = []
-        self.merchant_lookup: Dict[str, MerchantProfile] = {}
-        self.merchant_name_map: Dict[str, str] = {}
-
-    def _normalize_name(self, x: str) -> str:
-        # Move normalize logic here or import from utils
-        x = str(x).lower()
-        x = re.sub(r"[^a-z0-9\s]", " ", x)
-        x = re.sub(r"\s+", " ", x).strip()
-        stop = {
-            "pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp",
-            "official", "store", "shop", "online", "services", "service", "solutions",
-            "technology", "technologies", "international", "group", "payments", "pay"
-        }
-        tokens = [t for t in x.split() if t not in stop]
-        return " ".join(tokens).strip()
+        self.data = ReferenceData.empty()
+        self.load_errors: List[str] = []
+
+    # Read-only views of the current generation. Code that reads more than
+    # one of them for the same request should capture `data` once instead.
+    @property
+    def master_df(self) -> pd.DataFrame:
+        return self.data.master_df
+
+    @property
+    def company_list(self) -> List[str]:
+        return self.data.company_list
+
+    @property
+    def merchant_lookup(self) -> Mapping[str, MerchantProfile]:
+        return self.data.merchant_lookup
+
+    @property
+    def merchant_name_map(self) -> Mapping[str, str]:
+        return self.data.merchant_name_map
+
+    @property
+    def version(self) -> int:
+        return self.data.version
 
     def _safe_parse_patterns(self, x):
-        if x is None or (isinstance(x, float) and pd.isna(x)):
-            return []
-        if isinstance(x, list):
-            return x
-        x = str(x).strip()
-        try:
-            v = ast.literal_eval(x)
-            if isinstance(v, list):
-                return [str(i) for i in v]
-        except Exception:
-            pass
-        if "," in x:
-            return [p.strip() for p in x.split(",") if p.strip()]
-        return [x] if x else []
+        return parse_patterns(x)
 
     def load_data(self):
         logger.info("Loading CSV data...")
-        self._load_master_csv()
-        self._load_company_csv()
-        logger.info(f"Data Loaded. Merchants: {len(self.merchant_lookup)}, Companies: {len(self.company_list)}")
+        data = self.data
+        master = self._load_master_csv()
+        if master:
+            df, lookup, name_map = master
+            data = data.replace(master_df=df, merchant_lookup=lookup, merchant_name_map=name_map)
+        companies = self._load_company_csv()
+        if companies is not None:
+            data = data.replace(company_list=companies, index=None)
+        self.publish(data)
+        logger.info(f"Data Loaded. Merchants: {len(data.merchant_lookup)}, Companies: {len(data.company_list)}")
+
+    def publish(self, data: ReferenceData):
+        """
+        Makes `data` the current generation in a single assignment; requests
+        that captured the previous one keep using it unchanged.
+        """
+        self.data = data
 
-    def _load_master_csv(self):
+    def _load_master_csv(self) -> Optional[Tuple[pd.DataFrame, ProfileStore, NameIndex]]:
+        restored = self._restore_master_snapshot()
+        if restored:
+            return restored
         try:
             df = pd.read_csv(settings.MASTER_CSV_PATH)
             df["merchant_id"] = df["merchant_id"].astype(str).str.strip()
-            
-            # Populate Lookup
-            for _, row in df.iterrows():
-                mid = row["merchant_id"]
-                name = row.get("merchant_name", "Unknown")
-                
-                # Create Domain object
-                try:
-                    profile = MerchantProfile(
-                        merchant_id=mid,
-                        merchant_name=name,
-                        merchant_trust_score=float(row.get("merchant_trust_score", 50)),
-                        risk_score=float(row.get("risk_score", 0.5)),
-                        rename_similarity_score=int(row.get("rename_similarity_score", 0)),
-                        patterns_detected=self._safe_parse_patterns(row.get("patterns_detected")),
-                        final_decision=row.get("final_decision", "REVIEW")
-                    )
-                    self.merchant_lookup[mid] = profile
-                    
-                    clean_name = self._normalize_name(name)
-                    if clean_name:
-                        self.merchant_name_map[clean_name] = mid
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to map row {mid}: {e}")
-            
-            self.master_df = df
+
+            names = df["merchant_name"] if "merchant_name" in df else pd.Series("Unknown", index=df.index)
+            decisions = df["final_decision"] if "final_decision" in df else pd.Series("REVIEW", index=df.index)
+            trust = self._numeric_column(df, "merchant_trust_score", 50)
+            risk = self._numeric_column(df, "risk_score", 0.5)
+            rename = self._numeric_column(df, "rename_similarity_score", 0)
+
+            # Rows the per-row MerchantProfile build used to reject (and skip with a warning)
+            bad = (
+                names.isna() | decisions.isna() | rename.isna()
+                | (trust.isna() & df.get("merchant_trust_score", trust).notna())
+                | (risk.isna() & df.get("risk_score", risk).notna())
+            )
+            if bad.any():
+                logger.warning(f"Skipping {int(bad.sum())} unmappable rows in Master CSV")
+            keep = ~bad.to_numpy()
+
+            # Pattern strings repeat heavily, so parse each distinct value once
+            if "patterns_detected" in df:
+                raw_patterns = df["patterns_detected"].astype(object).where(df["patterns_detected"].notna(), None)
+                parsed = {u: self._safe_parse_patterns(u) for u in raw_patterns[keep].unique()}
+                patterns = [parsed[p] for p in raw_patterns[keep]]
+            else:
+                patterns = [[] for _ in range(int(keep.sum()))]
+
+            mids = df["merchant_id"][keep].tolist()
+            kept_names = names[keep].astype(str)
+            lookup = ProfileStore.from_rows(
+                merchant_ids=mids,
+                merchant_names=kept_names.tolist(),
+                trust_scores=trust[keep].to_numpy(dtype=np.float64),
+                risk_scores=risk[keep].to_numpy(dtype=np.float64),
+                rename_scores=rename[keep].to_numpy().astype(np.int64),
+                patterns=patterns,
+                decisions=decisions[keep].astype(str).tolist()
+            )
+
+            clean = normalize_many(kept_names).tolist()
+            name_map = NameIndex.build(clean, lookup.merchant_ids)
+
+            self._save_master_snapshot(lookup, name_map)
+            return df, lookup, name_map
 
         except Exception as e:
+            self.load_errors.append(f"master: {e}")
             logger.error(f"Failed to load Master CSV: {settings.MASTER_CSV_PATH}", exc_info=e)
+            return None
 
-    def _load_company_csv(self):
+    @staticmethod
+    def _numeric_column(df: pd.DataFrame, col: str, default: float) -> pd.Series:
+        if col not in df:
+            return pd.Series(default, index=df.index, dtype=np.float64)
+        return pd.to_numeric(df[col], errors="coerce")
+
+    def _load_company_csv(self) -> Optional[List[str]]:
+        cached = self._read_snapshot("companies", settings.COMPANY_CSV_PATH)
+        if cached:
+            meta, arrays = cached
+            return snapshot.decode_strings(arrays["company_list"], meta["rows"])
         try:
             df = pd.read_csv(settings.COMPANY_CSV_PATH)
             # Normalize columns to lower case/stripped
@@ -93,19 +182,73 @@ class CSVLoader:
             cols = df.columns.tolist()
             name_col = next((c for c in cols if "name" in c or "company" in c), cols[0])
             
-            clean_names = df[name_col].astype(str).dropna().apply(self._normalize_name).unique()
-            self.company_list = clean_names.tolist()
+            clean_names = normalize_many(df[name_col].astype(str).dropna()).unique()
+            company_list = clean_names.tolist()
+            self._write_snapshot("companies", settings.COMPANY_CSV_PATH, {
+                "company_list": snapshot.encode_strings(company_list)
+            }, rows=len(company_list))
+            return company_list
             
         except Exception as e:
+            self.load_errors.append(f"companies: {e}")
             logger.error(f"Failed to load Company CSV: {settings.COMPANY_CSV_PATH}", exc_info=e)
+            return None
+
+    # --- Binary snapshots ---
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(settings.SNAPSHOT_DIR, f"{name}.snap")
+
+    def _read_snapshot(self, name: str, source: str):
+        if not settings.SNAPSHOT_ENABLED:
+            return None
+        try:
+            cached = snapshot.read_snapshot(self._snapshot_path(name))
+            if (
+                cached
+                and cached[0].get("schema") == _SNAPSHOT_SCHEMA
+                and cached[0].get("normalizer") == normalizer_fingerprint()
+                and snapshot.is_fresh(cached[0], source)
+            ):
+                logger.info(f"Loaded '{name}' from snapshot ({cached[0]['rows']} rows)")
+                return cached
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot '{name}': {e}")
+        return None
+
+    def _write_snapshot(self, name: str, source: str, arrays: Dict[str, np.ndarray], rows: int, **extra):
+        if not settings.SNAPSHOT_ENABLED:
+            return
+        try:
+            fingerprint = snapshot.source_fingerprint(source)
+            fingerprint["sha256"] = snapshot.file_sha256(source)
+            meta = {
+                "schema": _SNAPSHOT_SCHEMA, "normalizer": normalizer_fingerprint(),
+                "source": fingerprint, "rows": rows, **extra
+            }
+            snapshot.write_snapshot(self._snapshot_path(name), arrays, meta)
+        except Exception as e:
+            logger.warning(f"Could not write snapshot '{name}': {e}")
+
+    def _save_master_snapshot(self, store: ProfileStore, names: NameIndex):
+        self._write_snapshot(
+            "master", settings.MASTER_CSV_PATH, {**store.to_arrays(), **names.to_arrays()},
+            rows=len(store.merchant_ids), profiles=store.meta(), names=len(names)
+        )
+
+    def _restore_master_snapshot(self) -> Optional[Tuple[pd.DataFrame, ProfileStore, NameIndex]]:
+        cached = self._read_snapshot("master", settings.MASTER_CSV_PATH)
+        if not cached:
+            return None
+        meta, arrays = cached
+        # Everything stays memory-mapped; nothing is rebuilt per row
+        lookup = ProfileStore.from_arrays(arrays, meta["profiles"])
+        name_map = NameIndex.from_arrays(arrays, lookup.merchant_ids, meta["names"])
+        # The raw DataFrame is not part of the snapshot
+        return pd.DataFrame(), lookup, name_map
 
     def get_merchant(self, merchant_id: str) -> Optional[MerchantProfile]:
-        return self.merchant_lookup.get(merchant_id)
+        return self.data.get_merchant(merchant_id)
 
     def get_merchant_by_name(self, merchant_name: str) -> Optional[MerchantProfile]:
-        clean = self._normalize_name(merchant_name)
-        mid = self.merchant_name_map.get(clean)
-        if mid:
-            return self.merchant_lookup.get(mid)
-        return None
+        return self.data.get_merchant_by_name(merchant_name)
 
@@ -0,0 +1,59 @@
+import json
+from typing import Any, List, Tuple
+
+
+class JSONFieldStream:
+    """
+    Incremental reader for a JSON object arriving in pieces (optionally inside
+    a ```json fence). feed() returns the top-level members whose values have
+    just completed, so callers can surface them before the object closes.
+    Scanning resumes where the previous chunk stopped, so the total work is
+    linear in the output length.
+    """
+    __slots__ = ("buf", "pos", "depth", "in_str", "esc", "start")
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.start = None  # Offset of the current top-level member
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buf += chunk
+        buf, fields = self.buf, []
+        for i in range(self.pos, len(buf)):
+            c = buf[i]
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif c == "\\":
+                    self.esc = True
+                elif c == '"':
+                    self.in_str = False
+            elif c == '"':
+                self.in_str = True
+            elif c in "{[":
+                self.depth += 1
+                if self.depth == 1 and c == "{":
+                    self.start = i + 1
+            elif c in "}]":
+                if self.depth == 1 and self.start is not None:
+                    fields += self._member(buf[self.start:i])
+                    self.start = None
+                self.depth = max(self.depth - 1, 0)
+            elif c == "," and self.depth == 1 and self.start is not None:
+                fields += self._member(buf[self.start:i])
+                self.start = i + 1
+        self.pos = len(buf)
+        return fields
+
+    @staticmethod
+    def _member(text: str) -> List[Tuple[str, Any]]:
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except ValueError:
+            return []
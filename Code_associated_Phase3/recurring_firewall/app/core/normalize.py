@@ -0,0 +1,104 @@
+"""
+Merchant/company name normalization shared by the firewall service and the
+standalone ML apps, so offline and online similarity scores agree. Also
+holds the patterns_detected cell parser, for the same reason.
+
+Stdlib only and free of package-relative imports: the ML apps load this file
+by path (see ML/Merchant_score_app/app.py).
+"""
+
+import ast
+import hashlib
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+STOP_WORDS = frozenset({
+    "pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp",
+    "official", "store", "shop", "online", "services", "service", "solutions",
+    "technology", "technologies", "international", "group", "payments", "pay"
+})
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+
+# Look-alike characters typosquats swap in ("netfl1x", "0penai", "rnicrosoft"),
+# each class folded onto one representative
+_HOMOGLYPH_PAIRS = (("rn", "m"), ("vv", "w"))
+_HOMOGLYPHS = str.maketrans({"0": "o", "1": "l", "i": "l", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g"})
+
+CACHE_SIZE = 100_000
+
+# Bump when _normalize / fold_homoglyphs change in ways fingerprint() can't see
+NORMALIZER_VERSION = 1
+
+
+def _normalize(x: str) -> str:
+    x = _NON_ALNUM_RE.sub(" ", x.lower())
+    # split() already collapses and trims whitespace runs
+    return " ".join(t for t in x.split() if t not in STOP_WORDS)
+
+
+_normalize_cached = lru_cache(maxsize=CACHE_SIZE)(_normalize)
+
+
+def normalize_name(x) -> str:
+    """Lowercase, strip punctuation and drop legal/marketing stop words. Memoized."""
+    return _normalize_cached(str(x))
+
+
+def normalize_many(values: Iterable):
+    """
+    normalize_name over a pandas Series (returns a Series on the same index)
+    or any iterable (returns a list). Each distinct value is normalized once;
+    bulk loads bypass the memo so they don't evict hot request-path names.
+    """
+    items = values.tolist() if hasattr(values, "tolist") else list(values)
+    clean = {}
+    result: List[str] = []
+    for v in items:
+        c = clean.get(v)
+        if c is None:
+            c = clean[v] = _normalize(str(v))
+        result.append(c)
+    if hasattr(values, "index") and hasattr(values, "map"):
+        return type(values)(result, index=values.index, dtype=object)
+    return result
+
+
+def fold_homoglyphs(x: str) -> str:
+    """Maps a normalized name onto homoglyph classes, e.g. 'netfl1x' and 'netflix' both fold to 'netfllx'."""
+    for a, b in _HOMOGLYPH_PAIRS:
+        x = x.replace(a, b)
+    return x.translate(_HOMOGLYPHS)
+
+
+def parse_patterns(x) -> List[str]:
+    """
+    A patterns_detected cell as a list: a list literal ("['A', 'B']"), a
+    comma-separated string ("A, B") or a single pattern. None/NaN/"" give [].
+    """
+    if x is None or (isinstance(x, float) and x != x):
+        return []
+    if isinstance(x, list):
+        return x
+    x = str(x).strip()
+    try:
+        v = ast.literal_eval(x)
+        if isinstance(v, list):
+            return [str(i) for i in v]
+    except Exception:
+        pass
+    if "," in x:
+        return [p.strip() for p in x.split(",") if p.strip()]
+    return [x] if x else []
+
+
+def fingerprint() -> str:
+    """Hash of the normalization rules; anything persisted in normalized form is stale once it changes."""
+    rules = repr((
+        NORMALIZER_VERSION, sorted(STOP_WORDS), _NON_ALNUM_RE.pattern, _HOMOGLYPH_PAIRS, sorted(_HOMOGLYPHS.items())
+    ))
+    return hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_info():
+    return _normalize_cached.cache_info()
@@ -0,0 +1,206 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+import numpy as np
+from ..domain.entities import MerchantProfile
+from .columns import StringColumn, HashIndex, narrow_int_dtype
+
+def _column_arrays(name: str, col: StringColumn) -> Dict[str, np.ndarray]:
+    return {f"{name}_blob": col.blob, f"{name}_offsets": col.offsets}
+
+def _column_from(arrays: Dict[str, np.ndarray], name: str) -> StringColumn:
+    return StringColumn(arrays[f"{name}_blob"], arrays[f"{name}_offsets"])
+
+def _index_arrays(name: str, index: HashIndex) -> Dict[str, np.ndarray]:
+    return {f"{name}_hashes": index.hashes, f"{name}_rows": index.rows}
+
+def _codes(lookup: Dict, keys: List) -> np.ndarray:
+    dtype = narrow_int_dtype(0, max(len(lookup) - 1, 0))
+    return np.fromiter((lookup[k] for k in keys), dtype=dtype, count=len(keys))
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.int64)
+    if not len(values):
+        return values.astype(np.int8)
+    return values.astype(narrow_int_dtype(int(values.min()), int(values.max())))
+
+
+class ProfileStore(Mapping):
+    """
+    Read-only merchant_id -> MerchantProfile mapping over columnar data.
+    Profiles are only built when a merchant is actually looked up.
+    Decisions and pattern lists are interned as codes into small vocabularies,
+    with integer columns stored in the narrowest dtype that holds them.
+    """
+    def __init__(
+        self,
+        merchant_ids: StringColumn,
+        merchant_names: StringColumn,
+        trust_scores: np.ndarray,
+        risk_scores: np.ndarray,
+        rename_scores: np.ndarray,
+        decision_vocab: List[str],
+        decision_codes: np.ndarray,
+        pattern_vocab: List[List[str]],
+        pattern_codes: np.ndarray,
+        id_index: HashIndex
+    ):
+        self.merchant_ids = merchant_ids
+        self.merchant_names = merchant_names
+        self.trust_scores = trust_scores
+        self.risk_scores = risk_scores
+        self.rename_scores = rename_scores
+        self.decision_vocab = decision_vocab
+        self.decision_codes = decision_codes
+        self.pattern_vocab = pattern_vocab
+        self.pattern_codes = pattern_codes
+        self.id_index = id_index
+
+    @classmethod
+    def from_rows(
+        cls,
+        merchant_ids: List[str],
+        merchant_names: List[str],
+        trust_scores: np.ndarray,
+        risk_scores: np.ndarray,
+        rename_scores: np.ndarray,
+        patterns: List[List[str]],
+        decisions: List[str]
+    ) -> "ProfileStore":
+        decision_vocab = sorted(set(decisions))
+        decision_lookup = {d: i for i, d in enumerate(decision_vocab)}
+        pattern_keys = [tuple(p) for p in patterns]
+        pattern_lookup: Dict[tuple, int] = {}
+        for p in pattern_keys:
+            pattern_lookup.setdefault(p, len(pattern_lookup))
+
+        ids = StringColumn.from_list(merchant_ids)
+        return cls(
+            merchant_ids=ids,
+            merchant_names=StringColumn.from_list(merchant_names),
+            trust_scores=np.asarray(trust_scores, dtype=np.float64),
+            risk_scores=np.asarray(risk_scores, dtype=np.float64),
+            rename_scores=_narrow(rename_scores),
+            decision_vocab=decision_vocab,
+            decision_codes=_codes(decision_lookup, decisions),
+            pattern_vocab=[list(p) for p in pattern_lookup],
+            pattern_codes=_codes(pattern_lookup, pattern_keys),
+            id_index=HashIndex.build(ids, merchant_ids)
+        )
+
+    @classmethod
+    def empty(cls) -> "ProfileStore":
+        return cls.from_rows([], [], np.empty(0), np.empty(0), np.empty(0), [], [])
+
+    # --- Snapshot (de)serialization ---
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            **_column_arrays("merchant_ids", self.merchant_ids),
+            **_column_arrays("merchant_names", self.merchant_names),
+            **_index_arrays("id_index", self.id_index),
+            "trust_scores": self.trust_scores,
+            "risk_scores": self.risk_scores,
+            "rename_scores": self.rename_scores,
+            "decision_codes": self.decision_codes,
+            "pattern_codes": self.pattern_codes,
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (vocabularies excluded, they are tiny)."""
+        return sum(a.nbytes for a in self.to_arrays().values())
+
+    def meta(self) -> dict:
+        return {"decision_vocab": self.decision_vocab, "pattern_vocab": self.pattern_vocab, "size": len(self)}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict) -> "ProfileStore":
+        ids = _column_from(arrays, "merchant_ids")
+        return cls(
+            merchant_ids=ids,
+            merchant_names=_column_from(arrays, "merchant_names"),
+            trust_scores=arrays["trust_scores"],
+            risk_scores=arrays["risk_scores"],
+            rename_scores=arrays["rename_scores"],
+            decision_vocab=meta["decision_vocab"],
+            decision_codes=arrays["decision_codes"],
+            pattern_vocab=meta["pattern_vocab"],
+            pattern_codes=arrays["pattern_codes"],
+            id_index=HashIndex(ids, arrays["id_index_hashes"], arrays["id_index_rows"], meta["size"])
+        )
+
+    # --- Mapping API ---
+    def profile_at(self, row: int) -> MerchantProfile:
+        return MerchantProfile(
+            merchant_id=self.merchant_ids[row],
+            merchant_name=self.merchant_names[row],
+            merchant_trust_score=float(self.trust_scores[row]),
+            risk_score=float(self.risk_scores[row]),
+            rename_similarity_score=int(self.rename_scores[row]),
+            patterns_detected=list(self.pattern_vocab[self.pattern_codes[row]]),
+            final_decision=self.decision_vocab[self.decision_codes[row]]
+        )
+
+    def __getitem__(self, merchant_id: str) -> MerchantProfile:
+        row = self.id_index.get(merchant_id)
+        if row is None:
+            raise KeyError(merchant_id)
+        return self.profile_at(row)
+
+    def __contains__(self, merchant_id) -> bool:
+        return isinstance(merchant_id, str) and self.id_index.get(merchant_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self.merchant_ids)):
+            mid = self.merchant_ids[row]
+            if self.id_index.get(mid) == row:
+                yield mid
+
+    def __len__(self) -> int:
+        return len(self.id_index)
+
+
+class NameIndex(Mapping):
+    """
+    Read-only normalized merchant name -> merchant_id mapping. Rows line up
+    with the ProfileStore the merchant ids come from; empty names are skipped.
+    """
+    def __init__(self, clean_names: StringColumn, merchant_ids: StringColumn, index: HashIndex):
+        self.clean_names = clean_names
+        self.merchant_ids = merchant_ids
+        self.index = index
+
+    @classmethod
+    def build(cls, clean_names: List[str], merchant_ids: StringColumn) -> "NameIndex":
+        names = StringColumn.from_list(clean_names)
+        mask = np.fromiter((bool(c) for c in clean_names), dtype=bool, count=len(clean_names))
+        return cls(names, merchant_ids, HashIndex.build(names, clean_names, mask))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {**_column_arrays("clean_names", self.clean_names), **_index_arrays("name_index", self.index)}
+
+    @property
+    def nbytes(self) -> int:
+        # merchant_ids is shared with the ProfileStore and counted there
+        return self.clean_names.nbytes + self.index.nbytes
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], merchant_ids: StringColumn, size: int) -> "NameIndex":
+        names = _column_from(arrays, "clean_names")
+        return cls(names, merchant_ids, HashIndex(names, arrays["name_index_hashes"], arrays["name_index_rows"], size))
+
+    def __getitem__(self, name: str) -> str:
+        row = self.index.get(name) if name else None
+        if row is None:
+            raise KeyError(name)
+        return self.merchant_ids[row]
+
+    def __iter__(self) -> Iterator[str]:
+        seen = set()
+        for row in self.index.rows:
+            name = self.clean_names[int(row)]
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+    def __len__(self) -> int:
+        return len(self.index)
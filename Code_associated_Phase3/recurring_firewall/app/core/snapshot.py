@@ -0,0 +1,107 @@
+"""
+Versioned single-file binary snapshots of parsed CSV state.
+
+Layout: MAGIC | u32 format version | u64 header length | JSON header | arrays.
+Each array starts on a 64-byte boundary and is opened with np.memmap, so the
+OS page cache shares the pages between every worker process that loads the
+same snapshot. Strings are stored as one NUL-separated UTF-8 blob.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+MAGIC = b"RFSNAP"
+FORMAT_VERSION = 1
+_ALIGN = 64
+_SEP = "\x00"
+
+
+def source_fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def encode_strings(values: List[str]) -> np.ndarray:
+    if any(_SEP in v for v in values):
+        raise ValueError("Strings containing NUL cannot be snapshotted")
+    return np.frombuffer(_SEP.join(values).encode("utf-8"), dtype=np.uint8)
+
+
+def decode_strings(blob: np.ndarray, count: int) -> List[str]:
+    if count == 0:
+        return []
+    return blob.tobytes().decode("utf-8").split(_SEP)
+
+
+def write_snapshot(path: str, arrays: Dict[str, np.ndarray], meta: dict):
+    """Writes to a temp file and renames, so readers never see a partial snapshot."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+    prefix = len(MAGIC) + 4 + 8
+    data_start = -(-(prefix + len(header)) // _ALIGN) * _ALIGN
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<IQ", FORMAT_VERSION, len(header)) + header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """Returns (meta, memory-mapped arrays), or None if missing or from another format version."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            return None
+        version, header_len = struct.unpack("<IQ", f.read(12))
+        if version != FORMAT_VERSION:
+            return None
+        header = json.loads(f.read(header_len))
+
+    prefix = len(MAGIC) + 4 + 8
+    data_start = -(-(prefix + header_len) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=spec["dtype"])
+            continue
+        arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+    return header["meta"], arrays
+
+
+def is_fresh(meta: dict, source: str) -> bool:
+    """
+    True if the snapshot was built from `source` as it is now. Size+mtime is the
+    fast path; a content hash rescues snapshots of files that were only touched.
+    """
+    recorded = meta.get("source", {})
+    current = source_fingerprint(source)
+    if recorded.get("path") != current["path"] or recorded.get("size") != current["size"]:
+        return False
+    if recorded.get("mtime_ns") == current["mtime_ns"]:
+        return True
+    return recorded.get("sha256") == file_sha256(source)
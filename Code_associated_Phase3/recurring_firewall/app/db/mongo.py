@@ -1,19 +1,89 @@
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from ..core.config import settings
 from ..core.logger import logger
 
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters fed by pymongo's CMAP events. Events arrive on
+    driver threads; plain int increments are good enough for monitoring.
+    """
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_in += 1
+
+    def stats(self) -> dict:
+        return {
+            "open": self.created - self.closed,
+            "in_use": self.checked_out - self.checked_in,
+            "created": self.created,
+            "closed": self.closed,
+            "checkouts": self.checked_out,
+            "checkout_failures": self.checkout_failures,
+            "pools_cleared": self.pools_cleared,
+        }
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS or None,
+    }
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
 class MongoManager:
     def __init__(self):
         self.client: AsyncIOMotorClient | None = None
         self.db = None
+        self.pool_stats = PoolStats()
 
     async def connect(self):
         logger.info(f"Connecting to MongoDB at {settings.MONGO_URI}...")
         # tlsAllowInvalidCertificates=True is used to bypass SSL errors in dev environments
-        self.client = AsyncIOMotorClient(settings.MONGO_URI, tlsCAFile=certifi.where(), tlsAllowInvalidCertificates=True)
+        self.client = AsyncIOMotorClient(
+            settings.MONGO_URI,
+            tlsCAFile=certifi.where(),
+            tlsAllowInvalidCertificates=True,
+            event_listeners=[self.pool_stats],
+            **client_options()
+        )
         self.db = self.client[settings.DB_NAME]
-        
+
         # Ping to verify
         try:
             await self.client.admin.command("ping")
@@ -22,6 +92,16 @@ class MongoManager:
             logger.error("MongoDB connection failed.", exc_info=e)
             raise e
 
+    def stats(self) -> dict:
+        options = client_options()
+        return {
+            "connected": self.client is not None,
+            "max_pool_size": options["maxPoolSize"],
+            "min_pool_size": options["minPoolSize"],
+            "compressors": options.get("compressors", ""),
+            **self.pool_stats.stats(),
+        }
+
     async def close(self):
         if self.client:
             self.client.close()
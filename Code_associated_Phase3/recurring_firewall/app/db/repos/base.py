@@ -1,22 +1,67 @@
 from typing import Generic, TypeVar, List, Optional
 from pydantic import BaseModel
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import BulkWriteError
+from ...core.logger import logger
 
 T = TypeVar("T", bound=BaseModel)
 
 class BaseRepository(Generic[T]):
+    # Indexes the repository's queries rely on; created by ensure_indexes()
+    INDEXES: List[IndexModel] = []
+
     def __init__(self, db: AsyncIOMotorDatabase, collection_name: str, model_cls: type[T]):
         self.collection = db[collection_name]
         self.model_cls = model_cls
 
+    def index_models(self) -> List[IndexModel]:
+        return self.INDEXES
+
+    async def ensure_indexes(self) -> List[str]:
+        """Creates any missing indexes (a no-op for ones that already exist)."""
+        indexes = self.index_models()
+        if not indexes:
+            return []
+        return await self.collection.create_indexes(indexes)
+
     async def insert(self, entity: T) -> bool:
         try:
             # exclude_none=True might be risky if None is meaningful, but usually safe for Mongo
             await self.collection.insert_one(entity.model_dump(by_alias=True))
             return True
-        except Exception:
+        except Exception as e:
+            logger.error(f"Insert into '{self.collection.name}' failed", exc_info=e)
             return False
 
+    async def insert_many(self, entities: List[T]) -> bool:
+        return not await self.insert_many_failed(entities)
+
+    async def insert_many_failed(self, entities: List[T]) -> List[T]:
+        """
+        Unordered bulk insert; returns the entities that were not written. A
+        BulkWriteError still writes every document missing from its
+        writeErrors, so only those are reported as failed.
+        """
+        if not entities:
+            return []
+        try:
+            await self.collection.insert_many(
+                [e.model_dump(by_alias=True) for e in entities], ordered=False
+            )
+            return []
+        except BulkWriteError as e:
+            failed = sorted({err["index"] for err in e.details.get("writeErrors", [])})
+            logger.error(
+                f"Bulk insert into '{self.collection.name}': {e.details.get('nInserted', 0)} "
+                f"of {len(entities)} written, {len(failed)} failed",
+                exc_info=e
+            )
+            return [entities[i] for i in failed]
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(entities)} into '{self.collection.name}' failed", exc_info=e)
+            return list(entities)
+
     async def find_one(self, query: dict) -> Optional[T]:
         doc = await self.collection.find_one(query)
         if doc:
@@ -1,11 +1,197 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
 from .base import BaseRepository
-from ...domain.entities import MerchantProfile, TransactionScore, MerchantPolicy
+from ...core.config import settings
+from ...core.logger import logger
+from ...domain.entities import MerchantProfile, TransactionScore, MerchantPolicy, TransactionRollup, CachedInvestigation, CaseLog
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def _ttl_seconds(days: float) -> int:
+    return int(timedelta(days=days).total_seconds())
+
+async def _summary(collection, query: dict, count, amount, decisions: list, top: int) -> dict:
+    """
+    Window totals, decision counts and the busiest merchants in one
+    aggregation, so only the top merchants leave the server. count/amount are
+    the per-document expressions; decisions unwinds documents to
+    {_id: decision, n: count}.
+    """
+    by_merchant = {"$group": {"_id": "$merchant_id", "count": {"$sum": count}}}
+    pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "totals": [{"$group": {"_id": None, "transactions": {"$sum": count}, "amount_sum": {"$sum": amount}}}],
+            "decisions": decisions,
+            "merchants": [by_merchant, {"$count": "n"}],
+            "top_merchants": [by_merchant, {"$sort": {"count": -1, "_id": 1}}, {"$limit": top}],
+        }},
+    ]
+    docs = [doc async for doc in collection.aggregate(pipeline)]
+    facets = docs[0] if docs else {}
+    totals = (facets.get("totals") or [{}])[0]
+    merchants = (facets.get("merchants") or [{}])[0]
+    return {
+        "transactions": totals.get("transactions", 0),
+        "amount_sum": totals.get("amount_sum", 0.0),
+        "merchants": merchants.get("n", 0),
+        "decisions": {d["_id"]: d["n"] for d in facets.get("decisions", [])},
+        "top_merchants": [{"merchant_id": m["_id"], "count": m["count"]} for m in facets.get("top_merchants", [])],
+    }
 
 class MerchantRepo(BaseRepository[MerchantProfile]):
-    pass
+    INDEXES = [IndexModel([("merchant_id", ASCENDING)], name="merchant_id")]
+
+class RollupRepo(BaseRepository[TransactionRollup]):
+    """
+    Hourly per-merchant rollups, one document per (merchant_id, hour) with a
+    deterministic _id so writers can upsert with $inc and never read first.
+    """
+    INDEXES = [IndexModel([("merchant_id", ASCENDING), ("bucket", DESCENDING)], name="merchant_id_bucket")]
+
+    def index_models(self) -> List[IndexModel]:
+        if settings.TX_ROLLUP_RETENTION_DAYS <= 0:
+            return self.INDEXES + [IndexModel([("bucket", DESCENDING)], name="bucket")]
+        ttl = _ttl_seconds(settings.TX_ROLLUP_RETENTION_DAYS)
+        return self.INDEXES + [IndexModel([("bucket", ASCENDING)], name="bucket_ttl", expireAfterSeconds=ttl)]
+
+    async def record(self, scores: List[TransactionScore]) -> bool:
+        """Folds a batch into its rollups: one upsert per (merchant, hour) the batch touches."""
+        groups: Dict[Tuple[str, datetime], dict] = {}
+        for s in scores:
+            key = (s.merchant_id, hour_bucket(s.timestamp))
+            g = groups.get(key)
+            if g is None:
+                g = groups[key] = {"name": s.merchant_name, "count": 0, "sum": 0.0, "max": s.amount, "decisions": Counter()}
+            g["count"] += 1
+            g["sum"] += s.amount
+            g["max"] = max(g["max"], s.amount)
+            g["decisions"][s.decision] += 1
+
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"_id": f"{mid}|{bucket:%Y-%m-%dT%H}"},
+                {
+                    "$inc": {
+                        "count": g["count"],
+                        "amount_sum": g["sum"],
+                        **{f"decisions.{d}": n for d, n in g["decisions"].items()},
+                    },
+                    "$max": {"amount_max": g["max"]},
+                    "$set": {"merchant_name": g["name"], "updated_at": now},
+                    "$setOnInsert": {"merchant_id": mid, "bucket": bucket},
+                },
+                upsert=True
+            )
+            for (mid, bucket), g in groups.items()
+        ]
+        if not ops:
+            return True
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+            return True
+        except Exception as e:
+            logger.error(f"Rollup update of {len(ops)} buckets failed", exc_info=e)
+            return False
+
+    async def summary(self, query: dict, top: int) -> dict:
+        decisions = [
+            {"$project": {"d": {"$objectToArray": "$decisions"}}},
+            {"$unwind": "$d"},
+            {"$group": {"_id": "$d.k", "n": {"$sum": "$d.v"}}},
+        ]
+        return await _summary(self.collection, query, "$count", "$amount_sum", decisions, top)
 
 class TransactionRepo(BaseRepository[TransactionScore]):
-    pass
+    INDEXES = [
+        # RAGService.build_context: one merchant's latest transactions
+        IndexModel([("merchant_id", ASCENDING), ("timestamp", DESCENDING)], name="merchant_id_timestamp"),
+    ]
+
+    def __init__(self, *args, rollups: Optional[RollupRepo] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rollups = rollups
+
+    def index_models(self) -> List[IndexModel]:
+        if not self.rollups:
+            # /recent-transactions: latest transactions overall
+            return self.INDEXES + [IndexModel([("timestamp", DESCENDING)], name="timestamp")]
+        # Bucketed mode: the TTL index serves the same sort and expires old transactions
+        ttl = _ttl_seconds(settings.TX_RETENTION_DAYS)
+        return self.INDEXES + [IndexModel([("timestamp", ASCENDING)], name="timestamp_ttl", expireAfterSeconds=ttl)]
+
+    async def insert_many_failed(self, entities: List[TransactionScore]) -> List[TransactionScore]:
+        failed = await super().insert_many_failed(entities)
+        # Rollups only count what was stored, so a retried batch isn't double counted
+        if self.rollups and len(failed) < len(entities):
+            failed_ids = {id(e) for e in failed}
+            await self.rollups.record([e for e in entities if id(e) not in failed_ids])
+        return failed
+
+    async def insert(self, entity: TransactionScore) -> bool:
+        return await self.insert_many([entity])
+
+    async def hourly_rollups(self, query: dict) -> List[TransactionRollup]:
+        """Rollups computed from raw transactions, for when none are stored (raw mode)."""
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": {
+                    "merchant_id": "$merchant_id",
+                    "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}},
+                    "decision": "$decision",
+                },
+                "merchant_name": {"$last": "$merchant_name"},
+                "count": {"$sum": 1},
+                "amount_sum": {"$sum": "$amount"},
+                "amount_max": {"$max": "$amount"},
+            }},
+        ]
+        rollups: Dict[Tuple[str, datetime], TransactionRollup] = {}
+        async for doc in self.collection.aggregate(pipeline):
+            key = (doc["_id"]["merchant_id"], doc["_id"]["bucket"])
+            r = rollups.get(key)
+            if r is None:
+                r = rollups[key] = TransactionRollup(merchant_id=key[0], merchant_name=doc["merchant_name"], bucket=key[1])
+            r.count += doc["count"]
+            r.amount_sum += doc["amount_sum"]
+            r.amount_max = max(r.amount_max, doc["amount_max"])
+            r.decisions[doc["_id"]["decision"]] = doc["count"]
+        return sorted(rollups.values(), key=lambda r: r.bucket, reverse=True)
+
+    async def summary(self, query: dict, top: int) -> dict:
+        """The rollup summary straight from raw transactions (raw mode)."""
+        decisions = [{"$group": {"_id": "$decision", "n": {"$sum": 1}}}]
+        return await _summary(self.collection, query, 1, "$amount", decisions, top)
 
 class PolicyRepo(BaseRepository[MerchantPolicy]):
-    pass
+    INDEXES = [IndexModel([("merchant_key", ASCENDING)], name="merchant_key")]
+
+class InvestigationCacheRepo(BaseRepository[CachedInvestigation]):
+    """Persistent tier of the investigation cache; Mongo expires entries by created_at."""
+    def index_models(self) -> List[IndexModel]:
+        ttl = int(settings.INVESTIGATION_CACHE_TTL_SECONDS)
+        if ttl <= 0:
+            return []
+        return [IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=ttl)]
+
+    async def put(self, entry: CachedInvestigation) -> bool:
+        try:
+            await self.collection.replace_one(
+                {"_id": entry.fingerprint}, entry.model_dump(by_alias=True), upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Investigation cache write to '{self.collection.name}' failed", exc_info=e)
+            return False
+
+class CaseLogRepo(BaseRepository[CaseLog]):
+    INDEXES = [
+        # CaseIndex.load: the most recent cases
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("merchant_id", ASCENDING), ("timestamp", DESCENDING)], name="merchant_id_timestamp"),
+    ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class DomainEntity(BaseModel):
@@ -36,8 +36,21 @@ class TransactionScore(DomainEntity):
     patterns_detected: List[str] = Field(default_factory=list)
     reasons: List[str] = Field(default_factory=list)
     user_guidance: str = "No guidance available."
+    subscription_id: Optional[str] = None
+    subscription_features: Optional[dict] = None
+    fraud_prob: Optional[float] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class TransactionRollup(DomainEntity):
+    """Per-merchant, per-hour aggregate of scored transactions."""
+    merchant_id: str
+    merchant_name: str = ""
+    bucket: datetime
+    count: int = 0
+    amount_sum: float = 0.0
+    amount_max: float = 0.0
+    decisions: Dict[str, int] = Field(default_factory=dict)
+
 class InvestigationResult(DomainEntity):
     risk_summary: str
     key_reasons: List[str]
@@ -46,6 +59,16 @@ class InvestigationResult(DomainEntity):
     cancellation_instructions: List[str]
     confidence: str
 
+class CachedInvestigation(DomainEntity):
+    """A parsed investigation, stored under the fingerprint of the prompt that produced it."""
+    fingerprint: str = Field(alias="_id")
+    investigation: dict
+    model: str = ""
+    generation_ms: float = 0.0
+    prompt_chars: int = 0
+    output_chars: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 class CaseLog(DomainEntity):
     merchant_id: str
     merchant_name: str
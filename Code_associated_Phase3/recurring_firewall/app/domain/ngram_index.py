@@ -0,0 +1,166 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from rapidfuzz import process, fuzz
+from ..core.normalize import fold_homoglyphs
+
+
+class NGramIndex:
+    """
+    Character n-gram blocking index over a list of normalized names.
+
+    Names sharing n-grams with the query are scored in descending order of an
+    upper bound on their token_sort_ratio (q-gram lemma), so the scan stops as
+    soon as no remaining name can beat the current best. With `exhaustive`,
+    results are identical to `process.extractOne(query, names,
+    scorer=fuzz.token_sort_ratio)`; without it, names sharing no n-gram with
+    the query are never scored, which bounds the scan but can miss a weak
+    best match.
+
+    Also keeps the homoglyph-folded sort key of every name, with postings of
+    its own, so the rename pipeline in SimilarityEngine can pick its few
+    candidates by shared folded n-grams instead of scanning the registry.
+    """
+
+    # Upper-bound tiers the candidate set is scored in, highest first
+    TIERS = (95.0, 85.0, 75.0, 60.0, 0.0)
+
+    def __init__(self, names: List[str], n: int = 3, exhaustive: bool = True):
+        self.names = names
+        self.n = n
+        self.exhaustive = exhaustive
+
+        keys = [self._sort_key(x) for x in names]
+        self.folded = [fold_homoglyphs(k) for k in keys]
+        self.lengths = np.fromiter((len(k) for k in keys), dtype=np.int32, count=len(keys))
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, key in enumerate(keys):
+            for g in set(self._grams(key)):
+                postings[g].append(i)
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+        folded_postings: Dict[str, List[int]] = defaultdict(list)
+        folded_grams = np.zeros(len(names), dtype=np.int32)
+        for i, key in enumerate(self.folded):
+            grams = set(self._grams(key))
+            folded_grams[i] = len(grams)
+            for g in grams:
+                folded_postings[g].append(i)
+        self.folded_postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in folded_postings.items()}
+        self.folded_grams = folded_grams
+
+        # Length buckets for names that share no n-gram with the query
+        self._by_length = np.argsort(self.lengths, kind="stable").astype(np.int32)
+        self._bucket_lengths, self._bucket_starts = np.unique(self.lengths[self._by_length], return_index=True)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _sort_key(x: str) -> str:
+        # Same preprocessing token_sort_ratio applies before comparing
+        return " ".join(sorted(x.split()))
+
+    @classmethod
+    def folded_key(cls, x: str) -> str:
+        return fold_homoglyphs(cls._sort_key(x))
+
+    def _grams(self, key: str) -> List[str]:
+        return [key[i:i + self.n] for i in range(len(key) - self.n + 1)]
+
+    def _bounds(self, la: int, lb: np.ndarray, shared: np.ndarray) -> np.ndarray:
+        # Each indel destroys at most n grams, so d >= (max_len - n + 1 - shared) / n
+        longest = np.maximum(la, lb)
+        d = np.maximum(np.abs(la - lb), np.ceil((longest - self.n + 1 - shared) / self.n))
+        total = la + lb
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bound = np.where(total > 0, 100.0 * (1.0 - np.maximum(d, 0) / np.maximum(total, 1)), 100.0)
+        return bound + 1e-9
+
+    def _scan(self, query: str, ids: np.ndarray, best: Optional[Tuple[float, int]]) -> Optional[Tuple[float, int]]:
+        """Scores `ids` (ascending) and merges with `best` using extractOne tie-breaking."""
+        # Slightly below the best so equal scores still come back for tie-breaking
+        cutoff = max(best[0] - 0.01, 0) if best else 0
+        res = process.extractOne(query, [self.names[i] for i in ids], scorer=fuzz.token_sort_ratio, score_cutoff=cutoff)
+        if res is None:
+            return best
+        score, idx = res[1], int(ids[res[2]])
+        if best is None or score > best[0] or (score == best[0] and idx < best[1]):
+            return score, idx
+        return best
+
+    def search(self, query: str) -> Optional[Tuple[str, float, int]]:
+        """
+        Returns (match, score, index) like extractOne, or None.
+        """
+        if not self.names:
+            return None
+
+        key = self._sort_key(query)
+        la = len(key)
+        grams = Counter(self._grams(key))
+        hits = [(self.postings[g], w) for g, w in grams.items() if g in self.postings]
+
+        best: Optional[Tuple[float, int]] = None
+        seen = np.empty(0, dtype=np.int32)
+
+        if hits:
+            ids = np.concatenate([p for p, _ in hits])
+            weights = np.concatenate([np.full(len(p), w, dtype=np.float64) for p, w in hits])
+            # Query-side gram counts over-estimate the shared multiset, which keeps the bound safe
+            seen, inv = np.unique(ids, return_inverse=True)
+            shared = np.bincount(inv, weights=weights)
+            bounds = self._bounds(la, self.lengths[seen], shared)
+
+            # Highest bounds first; stop once the best score beats every remaining bound
+            upper = np.inf
+            for lower in self.TIERS:
+                if best is not None and best[0] >= upper:
+                    break
+                mask = (bounds >= lower) & (bounds < upper)
+                if best is not None:
+                    mask &= bounds >= best[0]
+                if mask.any():
+                    best = self._scan(query, seen[mask], best)
+                upper = lower
+
+        if self.exhaustive:
+            rest = self._residual(la, seen, best[0] if best else 0)
+            if rest.size:
+                best = self._scan(query, rest, best)
+
+        if best is None:
+            return None
+        score, idx = best
+        return self.names[idx], score, idx
+
+    def candidates(self, query: str, limit: int) -> np.ndarray:
+        """
+        Ids of up to `limit` names sharing the most homoglyph-folded n-grams
+        with the query, ranked by the share of the name's grams found in the
+        query (so a company name embedded in a longer query ranks first), then
+        by the number shared, then by index. Costs one pass over the query's
+        postings, like search().
+        """
+        grams = set(self._grams(self.folded_key(query)))
+        hits = [self.folded_postings[g] for g in grams if g in self.folded_postings]
+        if not hits or limit <= 0:
+            return np.empty(0, dtype=np.int32)
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        containment = shared / np.maximum(self.folded_grams[ids], 1)
+        return ids[np.lexsort((ids, -shared, -containment))[:limit]]
+
+    def _residual(self, la: int, seen: np.ndarray, floor: float) -> np.ndarray:
+        """Names outside the candidate set whose length alone cannot rule them out."""
+        bounds = self._bounds(la, self._bucket_lengths, np.zeros(len(self._bucket_lengths)))
+        ends = np.append(self._bucket_starts[1:], len(self._by_length))
+        parts = [
+            self._by_length[s:e]
+            for s, e, b in zip(self._bucket_starts, ends, bounds)
+            if b >= floor
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        return np.sort(np.setdiff1d(np.concatenate(parts), seen, assume_unique=True))
+
@@ -1,21 +1,165 @@
+import numpy as np
 from rapidfuzz import process, fuzz
-from typing import Tuple, List
-from ..core.csv_loader import CSVLoader
+from typing import Callable, Tuple, List, Optional
+from ..core.csv_loader import CSVLoader, ReferenceData
+from ..core.config import settings
+from ..core.exceptions import ConfigurationError
+from ..core.normalize import normalize_name
+from .ngram_index import NGramIndex
+
+# Scorers the rename pipeline applies to the n-gram candidates. "homoglyph" is
+# fuzz.ratio over homoglyph-folded sort keys. They can only raise the
+# token_sort_ratio score, never replace it.
+RENAME_SCORERS = {
+    "token_set_ratio": fuzz.token_set_ratio,
+    "partial_ratio": fuzz.partial_ratio,
+    "homoglyph": None,
+}
+# Scorers that match a name against part of another; see RENAME_PARTIAL_* in config
+_PARTIAL_SCORERS = {"token_set_ratio", "partial_ratio"}
+
+def _parse_scorers(spec: str) -> List[Tuple[str, Optional[Callable]]]:
+    names = [s.strip() for s in spec.split(",") if s.strip()]
+    unknown = [n for n in names if n not in RENAME_SCORERS]
+    if unknown:
+        raise ConfigurationError(f"Unknown RENAME_SCORERS: {', '.join(unknown)}")
+    return [(n, RENAME_SCORERS[n]) for n in names]
 
 class SimilarityEngine:
     def __init__(self, csv_loader: CSVLoader):
         self.csv_loader = csv_loader # Dependency Injection
+        self.scorers = _parse_scorers(settings.RENAME_SCORERS)
+        # Build eagerly so the first request doesn't pay for it
+        self.install_index(self.build_index(self.csv_loader.company_list))
+
+    @property
+    def index(self) -> NGramIndex:
+        return self.snapshot().index
+
+    def snapshot(self, data: Optional[ReferenceData] = None) -> ReferenceData:
+        """
+        `data` (default: the loader's current generation) with its similarity
+        index, built now if that generation was published without one.
+        """
+        data = data or self.csv_loader.data
+        if data.index is None:
+            built = data.replace(index=self.build_index(data.company_list))
+            # Keep it for later requests, unless a newer generation appeared meanwhile
+            if self.csv_loader.data is data:
+                self.csv_loader.publish(built)
+            data = built
+        return data
+
+    def build_index(self, companies: List[str]) -> NGramIndex:
+        return NGramIndex(
+            companies,
+            n=settings.SIMILARITY_NGRAM_SIZE,
+            exhaustive=settings.SIMILARITY_EXHAUSTIVE
+        )
+
+    def install_index(self, index: NGramIndex):
+        """Publishes the current generation with `index` (built for its company list)."""
+        self.csv_loader.publish(self.csv_loader.data.replace(index=index))
 
     def find_best_match(self, query: str) -> Tuple[str, int]:
-        clean_q = self.csv_loader._normalize_name(query)
-        candidates = self.csv_loader.company_list
-        
-        if not clean_q or len(clean_q) < 3 or not candidates:
+        return self.match_normalized(normalize_name(query))
+
+    def match_normalized(self, clean_q: str, data: Optional[ReferenceData] = None) -> Tuple[str, int]:
+        # One generation for the whole lookup: ids and names both come from this index
+        index = self.snapshot(data).index
+
+        if not clean_q or len(clean_q) < 3 or not index.names:
             return "", 0
             
-        # Using token_sort_ratio as per original logic
-        best = process.extractOne(clean_q, candidates, scorer=fuzz.token_sort_ratio)
-        if best:
-             # best is (match, score, index)
-            return best[0], int(best[1])
-        return "", 0
+        # Using token_sort_ratio as per original logic; the index only narrows the scan
+        found = index.search(clean_q)
+        # best is (score, index)
+        best = (found[1], found[2]) if found else None
+        if self._needs_pipeline(best):
+            best = self._rescore(index, clean_q, best)
+        return self._result(index, best)
+
+    def _needs_pipeline(self, best: Optional[Tuple[float, int]]) -> bool:
+        return settings.RENAME_PIPELINE_ENABLED and bool(self.scorers) and (best is None or best[0] < 100)
+
+    def _rescore(
+        self, index: NGramIndex, clean_q: str, best: Optional[Tuple[float, int]]
+    ) -> Optional[Tuple[float, int]]:
+        """
+        Runs the configured scorers over the index's top RENAME_MAX_CANDIDATES
+        folded n-gram candidates. Each scorer is gated by its own score_cutoff
+        (the REVIEW threshold, or the best score so far if higher), so anything
+        that cannot win is abandoned inside rapidfuzz. Partial scorers skip
+        names of very different length and are capped below the BLOCK line.
+        """
+        cutoff = settings.RENAME_SCORE_CUTOFF
+        cap = settings.RENAME_PARTIAL_SCORE_CAP
+        folded_q = None
+        for idx in index.candidates(clean_q, settings.RENAME_MAX_CANDIDATES):
+            if best is not None and best[0] >= 100:
+                break
+            idx = int(idx)
+            name = index.names[idx]
+            score = 0.0
+            for scorer_name, scorer in self.scorers:
+                floor = max(cutoff, score, best[0] if best else 0)
+                if scorer is None:
+                    folded_q = folded_q if folded_q is not None else index.folded_key(clean_q)
+                    s = fuzz.ratio(folded_q, index.folded[idx], score_cutoff=floor)
+                elif scorer_name in _PARTIAL_SCORERS:
+                    short, long = sorted((len(clean_q), len(name)))
+                    if floor > cap or short < settings.RENAME_PARTIAL_MIN_LENGTH_RATIO * long:
+                        continue
+                    s = min(scorer(clean_q, name, score_cutoff=floor), cap)
+                else:
+                    s = scorer(clean_q, name, score_cutoff=floor)
+                score = max(score, s)
+                if score >= 100:
+                    break
+            if score >= cutoff and (best is None or score > best[0] or (score == best[0] and idx < best[1])):
+                best = (score, idx)
+        return best
+
+    @staticmethod
+    def _result(index: NGramIndex, best: Optional[Tuple[float, int]]) -> Tuple[str, int]:
+        if best is None:
+            return "", 0
+        return index.names[best[1]], int(best[0])
+
+    def match_many(self, clean_names: List[str], data: Optional[ReferenceData] = None) -> List[Tuple[str, int]]:
+        """
+        Bulk variant of match_normalized over a single data generation. With
+        the exhaustive index, token_sort_ratio against the whole registry is
+        one multi-threaded cdist (in row blocks to bound memory) with
+        extractOne's first-best tie-breaking, which is exactly what the index
+        finds; the rename pipeline then runs per query as in match_normalized.
+        The bounded index can miss matches cdist would find, so it keeps the
+        per-name lookup to return the same rows as /score-transaction.
+        """
+        data = self.snapshot(data)
+        index = data.index
+        if not index.exhaustive:
+            return [self.match_normalized(q, data) for q in clean_names]
+
+        results: List[Tuple[str, int]] = [("", 0)] * len(clean_names)
+        candidates = index.names
+        queries = [(i, q) for i, q in enumerate(clean_names) if q and len(q) >= 3]
+        if not queries or not candidates:
+            return results
+
+        rows = max(1, settings.SIMILARITY_CDIST_MAX_CELLS // len(candidates))
+        for start in range(0, len(queries), rows):
+            block = queries[start:start + rows]
+            scores = process.cdist(
+                [q for _, q in block], candidates,
+                scorer=fuzz.token_sort_ratio, dtype=np.float64, workers=settings.SIMILARITY_CDIST_WORKERS
+            )
+            best = scores.argmax(axis=1)
+            found = [(float(row[j]), int(j)) for j, row in zip(best, scores)]
+            del scores
+
+            for (i, q), b in zip(block, found):
+                if self._needs_pipeline(b):
+                    b = self._rescore(index, q, b)
+                results[i] = self._result(index, b)
+        return results
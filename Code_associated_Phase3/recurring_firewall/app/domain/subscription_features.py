@@ -0,0 +1,161 @@
+import math
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+from ..core.cache import LRUCache
+
+
+class SubscriptionState:
+    """
+    Running behavioural features of one subscription, updated in O(1) per
+    transaction (amortized for the sliding window). Mirrors the columns of
+    banksim_subscription_abuse_features.csv except median_amount, which needs
+    the full history, and the IsolationForest anomaly score.
+    """
+    __slots__ = (
+        "tx_count", "mean_amount", "_m2_amount", "min_amount", "max_amount",
+        "gap_count", "mean_gap_steps", "_m2_gap", "max_gap_steps",
+        "first_step", "last_step", "micro_count", "_micro_streak", "micro_streak_max",
+        "_window", "tx_in_window_max"
+    )
+
+    def __init__(self):
+        self.tx_count = 0
+        self.mean_amount = 0.0
+        self._m2_amount = 0.0
+        self.min_amount = math.inf
+        self.max_amount = -math.inf
+        self.gap_count = 0
+        self.mean_gap_steps = 0.0
+        self._m2_gap = 0.0
+        self.max_gap_steps = 0
+        self.first_step: Optional[int] = None
+        self.last_step: Optional[int] = None
+        self.micro_count = 0
+        self._micro_streak = 0
+        self.micro_streak_max = 0
+        self._window: deque = deque()
+        self.tx_in_window_max = 0
+
+    def update(self, amount: float, step: int, micro_threshold: float, window_steps: int):
+        # Welford for the amounts
+        self.tx_count += 1
+        delta = amount - self.mean_amount
+        self.mean_amount += delta / self.tx_count
+        self._m2_amount += delta * (amount - self.mean_amount)
+        self.min_amount = min(self.min_amount, amount)
+        self.max_amount = max(self.max_amount, amount)
+
+        # ...and for the gaps between consecutive transactions (out-of-order ones count as 0)
+        if self.last_step is None:
+            self.first_step = step
+        else:
+            gap = max(step - self.last_step, 0)
+            self.gap_count += 1
+            d = gap - self.mean_gap_steps
+            self.mean_gap_steps += d / self.gap_count
+            self._m2_gap += d * (gap - self.mean_gap_steps)
+            self.max_gap_steps = max(self.max_gap_steps, gap)
+        self.last_step = max(step, self.last_step if self.last_step is not None else step)
+
+        if amount <= micro_threshold:
+            self.micro_count += 1
+            self._micro_streak += 1
+            self.micro_streak_max = max(self.micro_streak_max, self._micro_streak)
+        else:
+            self._micro_streak = 0
+
+        # Transactions at most `window_steps` steps before this one, itself included
+        self._window.append(step)
+        while self._window[0] < step - window_steps:
+            self._window.popleft()
+        self.tx_in_window_max = max(self.tx_in_window_max, len(self._window))
+
+    @property
+    def std_amount(self) -> float:
+        # Sample std, like pandas' default in the offline notebook
+        return math.sqrt(self._m2_amount / (self.tx_count - 1)) if self.tx_count > 1 else 0.0
+
+    @property
+    def std_gap_steps(self) -> float:
+        return math.sqrt(self._m2_gap / self.gap_count) if self.gap_count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "tx_count": self.tx_count,
+            "mean_amount": self.mean_amount,
+            "std_amount": self.std_amount,
+            "min_amount": self.min_amount if self.tx_count else 0.0,
+            "max_amount": self.max_amount if self.tx_count else 0.0,
+            "mean_gap_steps": self.mean_gap_steps,
+            "std_gap_steps": self.std_gap_steps,
+            "max_gap_steps": self.max_gap_steps,
+            "tx_in_window_max": self.tx_in_window_max,
+            "micro_ratio": self.micro_count / self.tx_count if self.tx_count else 0.0,
+            "micro_count": self.micro_count,
+            "micro_streak_max": self.micro_streak_max,
+            "first_step": self.first_step,
+            "last_step": self.last_step,
+            "active_steps": (self.last_step - self.first_step) if self.tx_count else 0,
+        }
+
+
+class SubscriptionFeatureStore:
+    """
+    Bounded, in-process store of SubscriptionState keyed by subscription_id.
+    Idle subscriptions fall out by LRU (and optionally TTL), so memory is
+    capped at `max_subscriptions` states.
+    """
+    # Rule thresholds, as in the offline subscription abuse notebook
+    VELOCITY_WINDOW_MIN = 5
+    IRREGULAR_MIN_TX = 6
+    IRREGULAR_MIN_GAP_STD = 5.0
+    RULE_WEIGHT = 0.35
+
+    def __init__(
+        self,
+        max_subscriptions: int,
+        ttl_seconds: float = 0,
+        step_seconds: float = 86400,
+        window_steps: int = 7,
+        micro_threshold: float = 5.0
+    ):
+        self.states = LRUCache(max_subscriptions, ttl_seconds)
+        self.step_seconds = step_seconds
+        self.window_steps = window_steps
+        self.micro_threshold = micro_threshold
+
+    def step_of(self, ts: datetime) -> int:
+        return int(ts.timestamp() // self.step_seconds)
+
+    def update(self, subscription_id: str, amount: float, ts: datetime) -> dict:
+        """Folds one transaction in and returns the subscription's current features."""
+        state = self.states.get(subscription_id)
+        if state is None:
+            state = SubscriptionState()
+        state.update(amount, self.step_of(ts), self.micro_threshold, self.window_steps)
+        # set() also refreshes the LRU position and TTL
+        self.states.set(subscription_id, state)
+        return self.features(state)
+
+    def get(self, subscription_id: str) -> Optional[dict]:
+        state = self.states.get(subscription_id)
+        return self.features(state) if state is not None else None
+
+    def features(self, state: SubscriptionState) -> dict:
+        features = state.to_dict()
+        patterns = self.patterns(features)
+        features["patterns_detected"] = patterns
+        features["rule_abuse_score"] = round(self.RULE_WEIGHT * len(patterns), 4)
+        return features
+
+    def patterns(self, f: dict) -> List[str]:
+        patterns = []
+        if f["tx_in_window_max"] >= self.VELOCITY_WINDOW_MIN:
+            patterns.append("VELOCITY_SPIKE")
+        if f["tx_count"] >= self.IRREGULAR_MIN_TX and f["std_gap_steps"] >= self.IRREGULAR_MIN_GAP_STD:
+            patterns.append("IRREGULAR_RECURRING")
+        return patterns
+
+    def stats(self) -> dict:
+        return {**self.states.stats(), "window_steps": self.window_steps, "step_seconds": self.step_seconds}
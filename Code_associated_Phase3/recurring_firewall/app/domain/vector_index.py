@@ -0,0 +1,140 @@
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashedVectorIndex:
+    """
+    In-memory similarity index over short texts (policies, case summaries).
+
+    Each text becomes a signed feature-hashed vector of its words and the
+    character n-grams of each word, weighted 1 + log(tf) and L2-normalized, so
+    a search is one matrix-vector product (cosine similarity) over a float32
+    matrix: brute force, but a few ms for tens of thousands of rows. Rows are
+    added one at a time; an existing key is overwritten in place, and once
+    `max_docs` is reached the oldest row is replaced. Rows may carry a group
+    (e.g. a merchant id) that a search can exclude wholesale.
+    """
+
+    def __init__(self, dim: int = 1024, n: int = 3, max_docs: int = 20_000):
+        self.dim = dim
+        self.n = n
+        self.max_docs = max_docs
+        self._vectors = np.zeros((min(max_docs, 256), dim), dtype=np.float32)
+        self._keys: List[str] = []
+        self._meta: List[Any] = []
+        self._groups: List[Optional[str]] = []
+        self._group_rows: Dict[str, Set[int]] = {}
+        self._rows: Dict[str, int] = {}
+        self._next = 0  # Row the next new key goes to once the index is full
+
+        # Metrics
+        self.adds = 0
+        self.replacements = 0
+        self.evictions = 0
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _features(self, text: str) -> Counter:
+        feats = Counter()
+        for w in _WORD_RE.findall(text.lower()):
+            feats["w:" + w] += 1
+            padded = f"<{w}>"
+            for i in range(len(padded) - self.n + 1):
+                feats[padded[i:i + self.n]] += 1
+        return feats
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for f, tf in self._features(text).items():
+            h = zlib.crc32(f.encode("utf-8"))
+            # Top bit picks the sign so colliding features tend to cancel, not pile up
+            vec[h % self.dim] += (1.0 + math.log(tf)) * (1.0 if h & 0x80000000 else -1.0)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def add(self, key: str, text: str, meta: Any = None, group: Optional[str] = None):
+        vec = self.embed(text)
+        row = self._rows.get(key)
+        if row is not None:
+            self.replacements += 1
+        elif len(self._keys) < self.max_docs:
+            row = len(self._keys)
+            if row == len(self._vectors):
+                grown = np.zeros((min(2 * row, self.max_docs), self.dim), dtype=np.float32)
+                grown[:row] = self._vectors
+                self._vectors = grown
+            self._keys.append(key)
+            self._meta.append(None)
+            self._groups.append(None)
+        else:
+            # Full: reuse the oldest row
+            row = self._next
+            self._next = (row + 1) % self.max_docs
+            del self._rows[self._keys[row]]
+            self._keys[row] = key
+            self.evictions += 1
+        self._rows[key] = row
+        self._vectors[row] = vec
+        self._meta[row] = meta
+        self._set_group(row, group)
+        self.adds += 1
+
+    def _set_group(self, row: int, group: Optional[str]):
+        old = self._groups[row]
+        if old == group:
+            return
+        if old is not None:
+            rows = self._group_rows[old]
+            rows.discard(row)
+            if not rows:
+                del self._group_rows[old]
+        if group is not None:
+            self._group_rows.setdefault(group, set()).add(row)
+        self._groups[row] = group
+
+    def search(
+        self,
+        text: str,
+        k: int = 5,
+        min_score: float = 0.0,
+        exclude_group: Optional[str] = None
+    ) -> List[Tuple[str, float, Any]]:
+        """Returns up to k (key, cosine, meta) rows, best first, skipping rows of `exclude_group`."""
+        self.searches += 1
+        size = len(self._keys)
+        if not size or k <= 0:
+            return []
+        scores = self._vectors[:size] @ self.embed(text)
+        excluded = self._group_rows.get(exclude_group) if exclude_group is not None else None
+        if excluded:
+            # Masked before ranking, so however many rows the group has, it can't crowd out the rest
+            scores[np.fromiter(excluded, dtype=np.int64, count=len(excluded))] = -np.inf
+        want = min(size, k)
+        top = np.argpartition(-scores, want - 1)[:want]
+        out = []
+        for row in top[np.argsort(-scores[top], kind="stable")]:
+            score = float(scores[row])
+            if score < min_score or score == -np.inf:
+                break
+            out.append((self._keys[row], round(score, 4), self._meta[row]))
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._keys),
+            "max_docs": self.max_docs,
+            "dim": self.dim,
+            "memory_bytes": int(self._vectors.nbytes),
+            "adds": self.adds,
+            "replacements": self.replacements,
+            "evictions": self.evictions,
+            "searches": self.searches,
+        }
@@ -0,0 +1,123 @@
+import time
+from array import array
+from typing import Callable, Optional
+from ..core.cache import LRUCache
+
+
+class MerchantWindow:
+    """
+    Ring buffer of per-minute transaction and micro-charge counts covering the
+    last `size` minutes, with running totals. Advancing the clock clears only
+    the slots that expired, so updates are amortized O(1). `first` is the
+    earliest minute seen, so callers know how much of the window was observed.
+    """
+    __slots__ = ("counts", "micro", "head", "first", "total", "micro_total")
+
+    def __init__(self, size: int, minute: int):
+        self.counts = array("I", bytes(4 * size))
+        self.micro = array("I", bytes(4 * size))
+        self.head = minute
+        self.first = minute
+        self.total = 0
+        self.micro_total = 0
+
+    def advance(self, minute: int):
+        if minute <= self.head:
+            return
+        size = len(self.counts)
+        for m in range(max(self.head + 1, minute - size + 1), minute + 1):
+            slot = m % size
+            self.total -= self.counts[slot]
+            self.micro_total -= self.micro[slot]
+            self.counts[slot] = 0
+            self.micro[slot] = 0
+        self.head = minute
+
+    def add(self, minute: int, is_micro: bool):
+        self.advance(minute)
+        # Late events still land in their minute if it is inside the window
+        if minute <= self.head - len(self.counts):
+            return
+        self.first = min(self.first, minute)
+        slot = minute % len(self.counts)
+        self.counts[slot] += 1
+        self.total += 1
+        if is_micro:
+            self.micro[slot] += 1
+            self.micro_total += 1
+
+    def observed(self) -> int:
+        """Minutes of the window actually covered since tracking started."""
+        return min(self.head - self.first + 1, len(self.counts))
+
+    def recent(self, minutes: int) -> int:
+        size = len(self.counts)
+        return sum(self.counts[m % size] for m in range(self.head - minutes + 1, self.head + 1))
+
+
+class VelocityTracker:
+    """
+    Live spike ratio and microcharge rate per merchant.
+
+    spike_ratio compares the per-minute rate of the last `short_minutes` with
+    the rate over the rest of the `window_minutes` window. A window that only
+    started recently (restart, LRU eviction) is measured over the minutes it
+    actually covers, and reports no ratio until that baseline spans at least
+    `short_minutes`, so a cold start doesn't read as a spike. Merchants are kept
+    in an LRU of at most `max_merchants` windows, so memory stays bounded and
+    the long tail of one-off merchants simply ages out.
+    """
+    def __init__(
+        self,
+        max_merchants: int,
+        window_minutes: int = 60,
+        short_minutes: int = 5,
+        micro_threshold: float = 5.0,
+        min_transactions: int = 10,
+        clock: Callable[[], float] = time.time
+    ):
+        if not 0 < short_minutes < window_minutes:
+            raise ValueError("short_minutes must be positive and shorter than window_minutes")
+        self.windows = LRUCache(max_merchants)
+        self.window_minutes = window_minutes
+        self.short_minutes = short_minutes
+        self.micro_threshold = micro_threshold
+        self.min_transactions = min_transactions
+        self.clock = clock
+
+    def record(self, merchant_id: str, amount: float, ts: Optional[float] = None) -> dict:
+        """Counts one transaction and returns the merchant's current signals."""
+        minute = int((ts if ts is not None else self.clock()) // 60)
+        window = self.windows.get(merchant_id)
+        if window is None:
+            window = MerchantWindow(self.window_minutes, minute)
+        window.add(minute, amount <= self.micro_threshold)
+        self.windows.set(merchant_id, window)
+        return self._signals(window)
+
+    def get(self, merchant_id: str) -> Optional[dict]:
+        window = self.windows.get(merchant_id)
+        if window is None:
+            return None
+        window.advance(int(self.clock() // 60))
+        return self._signals(window)
+
+    def _signals(self, window: MerchantWindow) -> dict:
+        recent = window.recent(self.short_minutes)
+        baseline = window.total - recent
+        baseline_minutes = window.observed() - self.short_minutes
+        enough = window.total >= self.min_transactions
+        spike_ratio = None
+        if enough and baseline_minutes >= self.short_minutes:
+            # At least one baseline transaction, so a brand-new merchant's ratio stays finite
+            baseline_rate = max(baseline, 1) / baseline_minutes
+            spike_ratio = round((recent / self.short_minutes) / baseline_rate, 3)
+        return {
+            "window_tx": window.total,
+            "recent_tx": recent,
+            "spike_ratio": spike_ratio,
+            "microcharge_rate": round(window.micro_total / window.total, 3) if enough and window.total else None,
+        }
+
+    def stats(self) -> dict:
+        return {**self.windows.stats(), "window_minutes": self.window_minutes, "short_minutes": self.short_minutes}
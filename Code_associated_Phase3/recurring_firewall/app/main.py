@@ -2,7 +2,7 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from .container import container
 from .core.config import settings
-from .api.v1 import score_routes, investigate_routes, system_routes, merchant_routes
+from .api.v1 import score_routes, investigate_routes, system_routes, merchant_routes, admin_routes
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -31,6 +31,7 @@ app.include_router(score_routes.router, tags=["Scoring"])
 app.include_router(investigate_routes.router, tags=["Investigation"])
 app.include_router(system_routes.router, tags=["System"])
 app.include_router(merchant_routes.router, tags=["Merchant"])
+app.include_router(admin_routes.router, tags=["Admin"])
 
 from .api.v1 import frontend_routes
 app.include_router(frontend_routes.router, tags=["Frontend"])
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any
+from ..core.config import settings
 
 class InvestigateRequestDTO(BaseModel):
     merchant_id: Optional[str] = None
@@ -16,6 +17,9 @@ class InvestigateResponseDTO(BaseModel):
     merchant_id: str
     merchant_name: str
     investigation: dict # JSON from LLM
+    cached: bool = False
+    sources: Optional[dict] = None # Per RAG source: status (ok/timeout/error) and ms
+    prompt: Optional[dict] = None # Prompt size: estimated tokens, budget, trim level
 
 class MerchantHistoryResponseDTO(BaseModel):
     ok: bool
@@ -34,6 +38,25 @@ class ScoreRequestDTO(BaseModel):
     merchant_name: Optional[str] = None
     amount: float
     currency: str = "USD"
+    customer_id: Optional[str] = None
+    subscription_id: Optional[str] = None
+    # BankSim model inputs; the fraud model runs when a category is given
+    age: Optional[str] = None
+    gender: Optional[str] = None
+    category: Optional[str] = None
+
+    @property
+    def model_features(self) -> Optional[dict]:
+        if not self.category:
+            return None
+        return {"age": self.age, "gender": self.gender, "category": self.category, "amount": self.amount}
+
+    @property
+    def subscription_key(self) -> Optional[str]:
+        # BankSim builds subscription ids as <customer_id>_<merchant_id>
+        if self.subscription_id:
+            return self.subscription_id
+        return f"{self.customer_id}_{self.merchant_id}" if self.customer_id else None
 
 class ScoreResponseDTO(BaseModel):
     merchant_id: str
@@ -46,3 +69,15 @@ class ScoreResponseDTO(BaseModel):
     patterns_detected: List[str]
     reasons: List[str]
     user_guidance: str
+    subscription_id: Optional[str] = None
+    subscription_features: Optional[dict] = None
+    fraud_prob: Optional[float] = None
+
+class ScoreBatchRequestDTO(BaseModel):
+    # Bounded so one request can't monopolize the matching threads
+    transactions: List[ScoreRequestDTO] = Field(..., max_length=settings.SCORE_BATCH_MAX_SIZE)
+
+class ScoreBatchResponseDTO(BaseModel):
+    ok: bool
+    count: int
+    results: List[ScoreResponseDTO]
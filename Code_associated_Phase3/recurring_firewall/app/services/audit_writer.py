@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import List, Optional
+from ..db.repos.base import BaseRepository
+from ..core.config import settings
+from ..core.logger import logger
+
+_STOP = object()
+
+class AuditWriter:
+    """
+    Write-behind pipeline for audit records: callers enqueue, a background
+    worker flushes with insert_many once a batch fills up or the flush
+    interval passes. Overflow policy decides what happens when the queue is full:
+      - block: wait for room (backpressure onto the caller)
+      - drop:  discard the record
+      - spill: append the record to a local JSONL file
+    """
+    POLICIES = ("block", "drop", "spill")
+
+    def __init__(
+        self,
+        repo: BaseRepository,
+        max_queue: int = settings.AUDIT_QUEUE_SIZE,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval: float = settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+        overflow_policy: str = settings.AUDIT_OVERFLOW_POLICY,
+        spill_path: str = settings.AUDIT_SPILL_PATH
+    ):
+        if overflow_policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.repo = repo
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spill_path = spill_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._spill_lock = asyncio.Lock()
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.blocked = 0
+        self.flushes = 0
+        self.high_watermark = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, entity) -> None:
+        await self.submit_many([entity])
+
+    async def submit_many(self, entities: List) -> None:
+        overflow = []
+        for entity in entities:
+            if self._task is None:
+                # Not started (or already closed): fall back to a direct write
+                await self._flush([entity])
+                continue
+            try:
+                self.queue.put_nowait(entity)
+            except asyncio.QueueFull:
+                if self.overflow_policy == "block":
+                    self.blocked += 1
+                    await self.queue.put(entity)
+                elif self.overflow_policy == "spill":
+                    overflow.append(entity)
+                    continue
+                else:
+                    self.dropped += 1
+                    continue
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, self.queue.qsize())
+        if overflow:
+            await self._spill(overflow)
+
+    async def close(self):
+        """Flushes everything still queued and stops the worker."""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Audit writer drained. Written: {self.written}, Failed: {self.failed}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List):
+        start = time.perf_counter()
+        # Only the records Mongo rejected: the rest of a partly failed batch is already stored
+        failed = await self.repo.insert_many_failed(batch)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.written += len(batch) - len(failed)
+        if not failed:
+            return
+        self.failed += len(failed)
+        if self.overflow_policy == "spill":
+            await self._spill(failed)
+
+    def _append(self, lines: List[str]):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    async def _spill(self, entities: List):
+        try:
+            lines = [e.model_dump_json(by_alias=True) + "\n" for e in entities]
+            # File I/O off the event loop; the lock keeps concurrent spills from interleaving lines
+            async with self._spill_lock:
+                await asyncio.to_thread(self._append, lines)
+            self.spilled += len(entities)
+        except Exception as e:
+            self.dropped += len(entities)
+            logger.error(f"Failed to spill {len(entities)} audit records to {self.spill_path}", exc_info=e)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "overflow_policy": self.overflow_policy,
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "high_watermark": self.high_watermark,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "blocked": self.blocked,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Optional
+from ..core.config import settings
+from ..core.logger import logger
+from ..db.repos.concrete import PolicyRepo, CaseLogRepo
+from ..domain.entities import CaseLog, MerchantPolicy
+from ..domain.vector_index import HashedVectorIndex
+from .audit_writer import AuditWriter
+
+def _name_text(payload: dict) -> str:
+    return f"{payload.get('merchant_name') or ''} {payload.get('closest_company_match') or ''}"
+
+def _query_text(payload: dict) -> str:
+    """What cases are searched by: the merchant and what the scorer saw."""
+    return " ".join(str(x) for x in (
+        _name_text(payload),
+        payload.get("decision") or "",
+        *(payload.get("patterns_detected") or []),
+    ))
+
+def _policy_text(p: MerchantPolicy) -> str:
+    # Cancellation steps read alike across merchants, so only identifying text is indexed
+    return f"{p.merchant_name} {p.merchant_key} {p.notes or ''}"
+
+def _case_text(c: CaseLog) -> str:
+    out = c.llm_output or {}
+    reasons = out.get("key_reasons") or []
+    return " ".join(str(x) for x in (
+        _query_text({**c.payload, "merchant_name": c.merchant_name}),
+        out.get("risk_summary") or "",
+        *(reasons if isinstance(reasons, list) else [reasons]),
+    ))
+
+def _case_summary(c: CaseLog) -> dict:
+    out = c.llm_output or {}
+    return {
+        "merchant_id": c.merchant_id,
+        "merchant_name": c.merchant_name,
+        "timestamp": c.timestamp,
+        "decision": c.payload.get("decision"),
+        "patterns": c.payload.get("patterns_detected") or [],
+        "risk_summary": out.get("risk_summary"),
+        "confidence": out.get("confidence"),
+    }
+
+class CaseIndex:
+    """
+    Semantic retrieval over merchant policies and logged investigations.
+
+    Two HashedVectorIndex instances (policies, cases) are filled from Mongo on
+    load(); afterwards every new investigation is indexed as soon as it is
+    logged and persisted through a write-behind AuditWriter. Lookups are
+    in-memory and synchronous.
+    """
+    def __init__(
+        self,
+        policy_repo: PolicyRepo,
+        case_repo: CaseLogRepo,
+        writer: AuditWriter,
+        dim: int = settings.CASE_INDEX_DIM,
+        max_cases: int = settings.CASE_INDEX_MAX_CASES,
+        max_policies: int = settings.CASE_INDEX_MAX_POLICIES
+    ):
+        self.policy_repo = policy_repo
+        self.case_repo = case_repo
+        self.writer = writer
+        self.dim = dim
+        self.policies = HashedVectorIndex(dim, max_docs=max_policies)
+        self.cases = HashedVectorIndex(dim, max_docs=max_cases)
+        self.loaded_at: Optional[datetime] = None
+        self.load_ms = 0.0
+
+        # Metrics
+        self.logged = 0
+        self.lookups = 0
+        self.lookup_ms = 0.0
+
+    async def load(self):
+        start = time.perf_counter()
+        policies, cases = await asyncio.gather(
+            self.policy_repo.find_many({}, limit=self.policies.max_docs),
+            self.case_repo.find_many({}, limit=self.cases.max_docs, sort=[("timestamp", -1)]),
+        )
+
+        def build():
+            p_index = HashedVectorIndex(self.dim, max_docs=self.policies.max_docs)
+            for p in policies:
+                p_index.add(p.merchant_key, _policy_text(p), p)
+            c_index = HashedVectorIndex(self.dim, max_docs=self.cases.max_docs)
+            # Oldest first, so the index evicts in age order once it fills up
+            for c in reversed(cases):
+                c_index.add(self._case_key(c), _case_text(c), _case_summary(c), c.merchant_id)
+            return p_index, c_index
+
+        self.policies, self.cases = await asyncio.to_thread(build)
+        self.loaded_at = datetime.utcnow()
+        self.load_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"Case index loaded: {len(self.policies)} policies, {len(self.cases)} cases in {self.load_ms}ms")
+
+    @staticmethod
+    def _case_key(c: CaseLog) -> str:
+        return f"{c.merchant_id}|{c.timestamp.isoformat()}"
+
+    async def log_case(self, case: CaseLog):
+        """Makes the case searchable right away; the Mongo write happens in the background."""
+        self.cases.add(self._case_key(case), _case_text(case), _case_summary(case), case.merchant_id)
+        self.logged += 1
+        await self.writer.submit(case)
+
+    def match_policy(self, payload: dict, min_score: float = settings.CASE_INDEX_POLICY_MIN_SCORE) -> Optional[MerchantPolicy]:
+        """
+        Closest policy by merchant name (and the company it resembles);
+        decisions and patterns would only add noise. For exploration only: a
+        look-alike resembles the very merchant it imitates, so this is never
+        used as the merchant's own policy.
+        """
+        hits = self._search(self.policies, _name_text(payload), 1, min_score)
+        return hits[0][2] if hits else None
+
+    def similar_cases(
+        self,
+        payload: dict,
+        merchant_id: Optional[str] = None,
+        k: int = settings.CASE_INDEX_TOP_K,
+        min_score: float = settings.CASE_INDEX_MIN_SCORE
+    ) -> List[dict]:
+        """
+        Most similar past cases of *other* merchants. The merchant's own history
+        is already in the evidence, and a repeated investigation shouldn't be
+        fed its own previous answer.
+        """
+        return [
+            {**summary, "similarity": score}
+            for _, score, summary in self._search(self.cases, _query_text(payload), k, min_score, merchant_id)
+        ]
+
+    def _search(self, index: HashedVectorIndex, query: str, k: int, min_score: float, exclude_group: Optional[str] = None):
+        start = time.perf_counter()
+        hits = index.search(query, k, min_score, exclude_group)
+        self.lookups += 1
+        self.lookup_ms += (time.perf_counter() - start) * 1000
+        return hits
+
+    def stats(self) -> dict:
+        return {
+            "policies": self.policies.stats(),
+            "cases": self.cases.stats(),
+            "loaded_at": self.loaded_at,
+            "load_ms": self.load_ms,
+            "logged": self.logged,
+            "lookups": self.lookups,
+            "mean_lookup_ms": round(self.lookup_ms / self.lookups, 3) if self.lookups else None,
+            "writer": self.writer.stats(),
+        }
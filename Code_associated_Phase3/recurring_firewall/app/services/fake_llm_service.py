@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import AsyncIterator
+from ..core.config import settings
+
+# A well-formed investigation in the shape build_investigation_prompt asks for
+_CANNED = {
+    "risk_summary": "Offline fake LLM response. Scores and patterns come from the payload only.",
+    "key_reasons": ["insufficient evidence"],
+    "recommended_bank_action": ["Review the transaction manually."],
+    "customer_guidance": ["Check the merchant on your statement before paying again."],
+    "cancellation_instructions": ["Step 1: Contact the merchant.", "Step 2: Ask your bank to stop the mandate."],
+    "confidence": "LOW",
+}
+
+class FakeLLMService:
+    """
+    Local stand-in for GeminiService (LLM_BACKEND=fake): returns the same
+    canned investigation for every prompt, fenced like Gemini often does, and
+    streams it in small chunks with Gemini-like pacing (FAKE_LLM_* settings;
+    zero delays for tests) so the LLM paths can be exercised without network.
+    """
+    def __init__(
+        self,
+        first_chunk_ms: float = settings.FAKE_LLM_FIRST_CHUNK_MS,
+        chunk_chars: int = settings.FAKE_LLM_CHUNK_CHARS,
+        chunk_delay_ms: float = settings.FAKE_LLM_CHUNK_DELAY_MS
+    ):
+        self.model = "fake"
+        self.first_chunk_ms = first_chunk_ms
+        self.chunk_chars = max(chunk_chars, 1)
+        self.chunk_delay_ms = chunk_delay_ms
+
+    @staticmethod
+    def _text() -> str:
+        return "```json\n" + json.dumps(_CANNED, indent=2) + "\n```"
+
+    async def generate(self, prompt: str) -> str:
+        text = self._text()
+        chunks = -(-len(text) // self.chunk_chars)
+        await asyncio.sleep((self.first_chunk_ms + (chunks - 1) * self.chunk_delay_ms) / 1000)
+        return text
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        text = self._text()
+        await asyncio.sleep(self.first_chunk_ms / 1000)
+        for i in range(0, len(text), self.chunk_chars):
+            if i:
+                await asyncio.sleep(self.chunk_delay_ms / 1000)
+            yield text[i:i + self.chunk_chars]
+
+    def close(self):
+        pass
@@ -1,12 +1,19 @@
 import google.generativeai as genai
+from typing import AsyncIterator
 from ..core.config import settings
 from ..core.logger import logger
 from ..core.exceptions import LLMError
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
 
 class GeminiService:
     def __init__(self):
         self.model = None
+        # Own pool, so blocking SDK calls can't starve the default executor
+        self.executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix="gemini")
         self._init_model()
 
     def _init_model(self):
@@ -27,7 +34,47 @@ class GeminiService:
         
         try:
             # Run blocking call in threadpool
-            resp = await asyncio.to_thread(self.model.generate_content, prompt)
+            loop = asyncio.get_running_loop()
+            resp = await loop.run_in_executor(self.executor, self.model.generate_content, prompt)
             return resp.text
         except Exception as e:
             raise LLMError(f"Gemini Generation Failed: {str(e)}")
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yields the response text chunk by chunk as Gemini produces it."""
+        if not self.model:
+            raise LLMError("Gemini not configured")
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            # The SDK's stream is a blocking iterator, so drain it in a worker thread
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        break
+                    if chunk.text:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                loop.call_soon_threadsafe(queue.put_nowait, _END)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise LLMError(f"Gemini Generation Failed: {str(item)}")
+                yield item
+        finally:
+            # Client went away (or we failed): let the worker stop at the next chunk
+            stop.set()
+            if producer.done():
+                await producer
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,112 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Optional
+from ..core.cache import LRUCache
+from ..core.config import settings
+from ..core.logger import logger
+from ..db.repos.concrete import InvestigationCacheRepo
+from ..domain.entities import CachedInvestigation
+
+# Rough token estimate for the savings report (no tokenizer dependency)
+_CHARS_PER_TOKEN = 4
+
+class InvestigationCache:
+    """
+    Content-addressed cache of parsed investigations. The key is a hash of
+    the model name and the prompt (minus similar past cases, which the routes
+    leave out of the keyed text), so any change to the payload or the
+    merchant's own evidence is a different entry. A bounded in-memory LRU with TTL sits
+    in front of an optional Mongo collection with the same TTL.
+    """
+    def __init__(
+        self,
+        repo: Optional[InvestigationCacheRepo] = None,
+        max_size: int = settings.INVESTIGATION_CACHE_SIZE,
+        ttl_seconds: float = settings.INVESTIGATION_CACHE_TTL_SECONDS,
+        model: str = settings.GEMINI_MODEL
+    ):
+        self.memory = LRUCache(max_size, ttl_seconds)
+        self.repo = repo
+        self.ttl_seconds = ttl_seconds
+        self.model = model
+
+        # Metrics
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.saved_generation_ms = 0.0
+        self.saved_input_tokens = 0
+        self.saved_output_tokens = 0
+        self.hit_ms = 0.0
+
+    def fingerprint(self, prompt: str) -> str:
+        return hashlib.blake2b(f"{self.model}\n{prompt}".encode("utf-8"), digest_size=20).hexdigest()
+
+    async def get(self, key: str) -> Optional[CachedInvestigation]:
+        start = time.perf_counter()
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+        elif self.repo:
+            try:
+                entry = await self.repo.find_one({"_id": key})
+            except Exception as e:
+                # The cache is an optimization; a Mongo hiccup is just a miss
+                logger.error("Investigation cache lookup failed", exc_info=e)
+            remaining = None
+            if entry is not None and self.ttl_seconds:
+                # Mongo's TTL monitor only runs once a minute, so check the age here too
+                remaining = self.ttl_seconds - (datetime.utcnow() - entry.created_at).total_seconds()
+                if remaining <= 0:
+                    entry = None
+            if entry is not None:
+                self.mongo_hits += 1
+                # Expires in memory when it does in Mongo, not a full TTL after this read
+                self.memory.set(key, entry, remaining)
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hit_ms += (time.perf_counter() - start) * 1000
+        self.saved_generation_ms += entry.generation_ms
+        self.saved_input_tokens += entry.prompt_chars // _CHARS_PER_TOKEN
+        self.saved_output_tokens += entry.output_chars // _CHARS_PER_TOKEN
+        return entry
+
+    async def put(self, key: str, investigation: dict, prompt: str, output_text: str, generation_ms: float):
+        entry = CachedInvestigation(
+            fingerprint=key,
+            investigation=investigation,
+            model=self.model,
+            generation_ms=round(generation_ms, 1),
+            prompt_chars=len(prompt),
+            output_chars=len(output_text)
+        )
+        self.memory.set(key, entry)
+        self.stores += 1
+        if self.repo:
+            await self.repo.put(entry)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.mongo_hits
+        lookups = hits + self.misses
+        cost = (
+            self.saved_input_tokens / 1000 * settings.LLM_COST_PER_1K_INPUT_TOKENS
+            + self.saved_output_tokens / 1000 * settings.LLM_COST_PER_1K_OUTPUT_TOKENS
+        )
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.repo is not None,
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "mean_hit_ms": round(self.hit_ms / hits, 3) if hits else None,
+            "saved_generation_ms": round(self.saved_generation_ms, 1),
+            "saved_input_tokens_est": self.saved_input_tokens,
+            "saved_output_tokens_est": self.saved_output_tokens,
+            "saved_cost_est": round(cost, 6),
+        }
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Protocol
+import numpy as np
+from ..core.config import settings
+from ..core.exceptions import LLMError
+from ..core.logger import logger
+
+class LLMBackend(Protocol):
+    """What the gateway needs from a provider (GeminiService, FakeLLMService)."""
+    async def generate(self, prompt: str) -> str: ...
+    def generate_stream(self, prompt: str) -> AsyncIterator[str]: ...
+    def close(self) -> None: ...
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`. After that a single probe is let through (half-open):
+    its success closes the circuit, its failure opens it again. allow()
+    hands each admitted call a token to report back with; only the probe's
+    token can end the half-open probe, so a call admitted before the circuit
+    opened can't free the probe slot when it finishes.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = 0  # Token of the half-open probe in flight; 0 = none
+        self.opens = 0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> Optional[int]:
+        """None if the call is rejected; otherwise its token (0 for an ordinary call)."""
+        state = self.state
+        if state == "closed":
+            return 0
+        if state == "half_open" and not self.probing:
+            self._probes += 1
+            self.probing = self._probes
+            return self.probing
+        return None
+
+    def _is_probe(self, token: int) -> bool:
+        return bool(token) and token == self.probing
+
+    def record_success(self, token: int = 0):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = 0
+
+    def abandon(self, token: int = 0):
+        """The call ended without a verdict (cancelled, or never reached the backend)."""
+        if self._is_probe(token):
+            self.probing = 0
+
+    def record_failure(self, token: int = 0):
+        self.failures += 1
+        probe = self._is_probe(token)
+        if probe or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            if self.opened_at is None or probe:
+                self.opens += 1
+                logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+            self.opened_at = self.clock()
+            if probe:
+                self.probing = 0
+
+def _percentiles(samples: deque) -> dict:
+    if not samples:
+        return {"p50": None, "p99": None}
+    p50, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 99])
+    return {"p50": round(float(p50), 1), "p99": round(float(p99), 1)}
+
+class LLMGateway:
+    """
+    Front door to the LLM backend. Calls are admitted through the circuit
+    breaker and a bounded wait queue, run at most `max_concurrency` at a time,
+    and each has a deadline (queueing included). Identical prompts already in
+    flight share one backend call.
+    """
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        max_queue: int = settings.LLM_MAX_QUEUE,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+        latency_samples: int = 1000
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.calls = 0
+        self.streams = 0
+        self.coalesced = 0
+        self.rejected_open = 0
+        self.rejected_queue = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.active = 0
+        self.latency_ms: deque = deque(maxlen=latency_samples)
+
+    @property
+    def model(self):
+        return getattr(self.backend, "model", None)
+
+    def _admit(self) -> int:
+        token = self.breaker.allow()
+        if token is None:
+            self.rejected_open += 1
+            raise LLMError("LLM circuit open: backend failing, try again shortly")
+        # Calls that will have to wait for a slot, this one included
+        queued = self.waiting + self.active + 1 - self.max_concurrency
+        if self.max_queue and queued > self.max_queue:
+            self.rejected_queue += 1
+            raise LLMError(f"LLM queue full ({self.waiting} waiting)")
+        # Counted from admission, so a burst sees the calls admitted just before it
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        return token
+
+    async def _acquire(self, deadline: float):
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            # Waiting too long says nothing about backend health, so the breaker isn't told
+            self.timeouts += 1
+            raise LLMError(f"LLM call queued past its {self.timeout}s deadline")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def _release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def _failed(self, e: Exception, token: int) -> LLMError:
+        self.breaker.record_failure(token)
+        if isinstance(e, asyncio.TimeoutError):
+            self.timeouts += 1
+            return LLMError(f"LLM call exceeded its {self.timeout}s deadline")
+        self.failures += 1
+        return e if isinstance(e, LLMError) else LLMError(str(e))
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            token = self._admit()
+            task = asyncio.ensure_future(self._generate(prompt, time.monotonic() + self.timeout, token))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # One caller going away must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller gave up
+
+    async def _generate(self, prompt: str, deadline: float, token: int) -> str:
+        try:
+            await self._acquire(deadline)
+            start = time.perf_counter()
+            try:
+                text = await asyncio.wait_for(self.backend.generate(prompt), max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                raise self._failed(e, token)
+            finally:
+                self._release()
+            self.breaker.record_success(token)
+            self.latency_ms.append((time.perf_counter() - start) * 1000)
+            return text
+        finally:
+            self.breaker.abandon(token)
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams are not coalesced. The deadline bounds the time to the first
+        chunk; after that each chunk may take up to `timeout`.
+        """
+        self.streams += 1
+        token = self._admit()
+        try:
+            deadline = time.monotonic() + self.timeout
+            await self._acquire(deadline)
+            start = time.perf_counter()
+            stream = self.backend.generate_stream(prompt)
+            try:
+                budget = max(deadline - time.monotonic(), 0)
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), budget)
+                    except StopAsyncIteration:
+                        break
+                    except Exception as e:
+                        raise self._failed(e, token)
+                    budget = self.timeout
+                    yield chunk
+                self.breaker.record_success(token)
+                self.latency_ms.append((time.perf_counter() - start) * 1000)
+            finally:
+                await stream.aclose()
+                self._release()
+        finally:
+            self.breaker.abandon(token)
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.failures,
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "inflight_prompts": len(self._inflight),
+            "calls": self.calls,
+            "streams": self.streams,
+            "coalesced": self.coalesced,
+            "rejected_open": self.rejected_open,
+            "rejected_queue": self.rejected_queue,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "latency_ms": _percentiles(self.latency_ms),
+        }
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..core.config import settings
+from ..core.logger import logger
+
+_STOP = object()
+
+# Upper edges of amount_bin 1..3; anything above 100 is bin 4 (as in df_scoring.csv)
+_AMOUNT_BIN_EDGES = np.array([5.0, 20.0, 100.0])
+
+def build_features(rows: List[dict]) -> pd.DataFrame:
+    """
+    The BankSim model inputs for a batch of {age, gender, category, amount}
+    rows, derived column-wise the same way df_scoring.csv was.
+    """
+    amount = np.fromiter((float(r.get("amount") or 0.0) for r in rows), dtype=np.float64, count=len(rows))
+    age = pd.to_numeric(pd.Series([r.get("age") for r in rows], dtype=object), errors="coerce")
+    return pd.DataFrame({
+        "age_clean": age.fillna(-1).astype(np.int64).to_numpy(),
+        "gender": [str(r.get("gender") or "U") for r in rows],
+        "category": [str(r.get("category") or "") for r in rows],
+        "amount": amount,
+        "log_amount": np.log1p(amount),
+        "is_micro": (amount <= _AMOUNT_BIN_EDGES[0]).astype(np.int64),
+        "amount_bin": np.searchsorted(_AMOUNT_BIN_EDGES, amount, side="left") + 1,
+    })
+
+class ModelService:
+    """
+    Serves the BankSim fraud model in-process. The preprocessor and
+    classifier are loaded once. Concurrent predict() calls are collected into
+    micro-batches (up to batch_size, or whatever arrives within
+    batch_wait_ms) and scored with one vectorized transform + predict_proba
+    in a worker thread. Decisions use banksim_thresholds.json. A row the
+    model can't score gets None (the caller falls back to the rules) without
+    failing the other rows of its batch.
+
+    Without the model files (or scikit-learn) the service stays disabled,
+    like GeminiService without an API key.
+    """
+    def __init__(
+        self,
+        preprocess_path: str = settings.MODEL_PREPROCESS_PATH,
+        classifier_path: str = settings.MODEL_CLASSIFIER_PATH,
+        thresholds_path: str = settings.MODEL_THRESHOLDS_PATH,
+        batch_size: int = settings.MODEL_BATCH_SIZE,
+        batch_wait_ms: float = settings.MODEL_BATCH_WAIT_MS,
+        latency_samples: int = settings.MODEL_LATENCY_SAMPLES
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.preprocessor = None
+        self.classifier = None
+        self.block_threshold = 0.0
+        self.review_threshold = 0.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+        self.request_ms: deque = deque(maxlen=latency_samples)
+        self.batch_ms: deque = deque(maxlen=latency_samples)
+        self.batch_sizes: deque = deque(maxlen=latency_samples)
+
+        self._load(preprocess_path, classifier_path, thresholds_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.classifier is not None
+
+    def _load(self, preprocess_path: str, classifier_path: str, thresholds_path: str):
+        try:
+            import joblib
+            with open(thresholds_path, encoding="utf-8") as f:
+                thresholds = json.load(f)
+            self.block_threshold = float(thresholds["BLOCK_THRESHOLD"])
+            self.review_threshold = float(thresholds["REVIEW_THRESHOLD"])
+
+            model = joblib.load(classifier_path) if os.path.exists(classifier_path) else None
+            if model is None:
+                logger.warning(f"Fraud model not found at {classifier_path}. Model scoring disabled.")
+                return
+            # A full Pipeline already contains the preprocessing step
+            if not hasattr(model, "steps"):
+                self.preprocessor = joblib.load(preprocess_path)
+            self.classifier = model
+            logger.info(f"Fraud model loaded (BLOCK >= {self.block_threshold}, REVIEW >= {self.review_threshold})")
+        except Exception as e:
+            self.classifier = None
+            logger.error("Failed to load fraud model", exc_info=e)
+
+    def decide(self, prob: float) -> str:
+        if prob >= self.block_threshold:
+            return "BLOCK"
+        if prob >= self.review_threshold:
+            return "REVIEW"
+        return "ALLOW"
+
+    def _predict_sync(self, rows: List[dict]) -> np.ndarray:
+        X = build_features(rows)
+        if self.preprocessor is not None:
+            X = self.preprocessor.transform(X)
+        return self.classifier.predict_proba(X)[:, 1]
+
+    def _predict_rows(self, rows: List[dict]) -> List[Optional[float]]:
+        """_predict_sync, but a failing batch is re-scored row by row so only the bad rows get None."""
+        try:
+            return [float(p) for p in self._predict_sync(rows)]
+        except Exception as e:
+            if len(rows) == 1:
+                self.failures += 1
+                logger.warning(f"Fraud model could not score a row: {e}")
+                return [None]
+        logger.warning(f"Fraud model failed on a batch of {len(rows)}; scoring its rows one at a time")
+        return [p for row in rows for p in self._predict_rows([row])]
+
+    def _result(self, prob: Optional[float]) -> Optional[Tuple[float, str]]:
+        return None if prob is None else (prob, self.decide(prob))
+
+    async def predict_many(self, rows: List[dict]) -> List[Optional[Tuple[float, str]]]:
+        """Scores an already-batched set of rows directly, bypassing the queue; None for rows that failed."""
+        if not rows:
+            return []
+        start = time.perf_counter()
+        probs = await asyncio.to_thread(self._predict_rows, rows)
+        self._record_batch(len(rows), start)
+        return [self._result(p) for p in probs]
+
+    async def predict(self, row: dict) -> Optional[Tuple[float, str]]:
+        """Scores one row as part of the next micro-batch; None if the model can't score it."""
+        if self._task is None:
+            return (await self.predict_many([row]))[0]
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future, time.perf_counter()))
+        return await future
+
+    # --- Micro-batching worker ---
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._score_batch(batch)
+
+    async def _score_batch(self, batch: list):
+        start = time.perf_counter()
+        try:
+            probs = await asyncio.to_thread(self._predict_rows, [row for row, _, _ in batch])
+        except Exception as e:
+            # Only reachable outside the model itself; the waiting requests still get scored without it
+            logger.error(f"Fraud model batch of {len(batch)} failed", exc_info=e)
+            self.failures += len(batch)
+            probs = [None] * len(batch)
+        self._record_batch(len(batch), start)
+        done = time.perf_counter()
+        for (_, future, queued_at), p in zip(batch, probs):
+            self.request_ms.append((done - queued_at) * 1000)
+            if not future.done():
+                future.set_result(self._result(p))
+
+    def _record_batch(self, size: int, start: float):
+        self.requests += size
+        self.batches += 1
+        self.batch_sizes.append(size)
+        self.batch_ms.append((time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _percentiles(samples: deque) -> dict:
+        if not samples:
+            return {"p50": None, "p99": None}
+        p50, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 99])
+        return {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "requests": self.requests,
+            "batches": self.batches,
+            "failures": self.failures,
+            "queued": self.queue.qsize(),
+            "mean_batch_size": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else None,
+            "request_ms": self._percentiles(self.request_ms),
+            "batch_ms": self._percentiles(self.batch_ms),
+            "thresholds": {"BLOCK": self.block_threshold, "REVIEW": self.review_threshold},
+        }
@@ -0,0 +1,156 @@
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from ..core.config import settings
+
+# Rough token estimate (no tokenizer dependency); same ratio as the cache savings report
+CHARS_PER_TOKEN = 4
+
+_INSTRUCTIONS = """
+You are an expert Fraud Analyst Assistant in a bank for "Recurring Payment Firewall".
+
+STRICT:
+- Only use PAYLOAD + EVIDENCE (compact JSON; recent_transactions is a summary of the latest scores,
+  similar_cases are earlier investigations of other merchants that resemble this one).
+- If unknown say "insufficient evidence".
+- Output must be VALID JSON only (no markdown).
+""".strip()
+
+_OUTPUT = """
+OUTPUT JSON:
+{"risk_summary":"2 lines max","key_reasons":["...","..."],"recommended_bank_action":["..."],"customer_guidance":["..."],"cancellation_instructions":["Step 1...","Step 2..."],"confidence":"LOW/MEDIUM/HIGH"}
+""".strip()
+
+# Progressively smaller evidence: (transaction examples, top-N reasons/patterns/similar cases, max chars per string)
+_LEVELS = (
+    (None, None, None),
+    (1, None, 300),
+    (0, 3, 160),
+    (0, 1, 80),
+)
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _ts(value: Any) -> Any:
+    return value.isoformat(timespec="seconds") if isinstance(value, datetime) else value
+
+def _compact(d: Optional[dict], drop: tuple = ()) -> Optional[dict]:
+    """Drops ids, empty values and the given keys; rounds floats."""
+    if not d:
+        return None
+    out = {}
+    for k, v in d.items():
+        if k in drop or k in ("id", "_id") or v is None or v == "" or v == [] or v == {}:
+            continue
+        out[k] = round(v, 4) if isinstance(v, float) else _ts(v)
+    return out
+
+def _clip(obj: Any, limit: Optional[int]) -> Any:
+    if limit is None:
+        return obj
+    if isinstance(obj, str):
+        return obj if len(obj) <= limit else obj[:limit - 1] + "…"
+    if isinstance(obj, list):
+        return [_clip(v, limit) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _clip(v, limit) for k, v in obj.items()}
+    return obj
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 4) if values else None
+
+def summarize_transactions(txs: List[dict], examples: int, top: int) -> Optional[dict]:
+    """
+    Collapses recent TransactionScore dumps into aggregates. Reasons, patterns
+    and guidance repeat across a merchant's transactions, so each distinct
+    string appears once with its count.
+    """
+    if not txs:
+        return None
+    amounts = [t["amount"] for t in txs]
+    times = [t["timestamp"] for t in txs if t.get("timestamp")]
+    summary = {
+        "count": len(txs),
+        "amount": {
+            "min": round(min(amounts), 2),
+            "max": round(max(amounts), 2),
+            "mean": round(sum(amounts) / len(amounts), 2),
+            "sum": round(sum(amounts), 2),
+        },
+        "decisions": dict(Counter(t["decision"] for t in txs).most_common()),
+        "mean_risk_score": _mean([t.get("risk_score") for t in txs]),
+        "mean_fraud_prob": _mean([t.get("fraud_prob") for t in txs]),
+        "patterns": dict(Counter(p for t in txs for p in t.get("patterns_detected") or []).most_common(top)),
+        "reasons": dict(Counter(r for t in txs for r in t.get("reasons") or []).most_common(top)),
+        "guidance": [g for g, _ in Counter(
+            t["user_guidance"] for t in txs if t.get("user_guidance") and t["user_guidance"] != "No guidance available."
+        ).most_common(1)],
+        "subscriptions": len({t["subscription_id"] for t in txs if t.get("subscription_id")}),
+        "first": _ts(min(times)) if times else None,
+        "last": _ts(max(times)) if times else None,
+        "latest": [
+            _compact({
+                "ts": t.get("timestamp"),
+                "amount": t["amount"],
+                "decision": t["decision"],
+                "risk_score": t.get("risk_score"),
+                "fraud_prob": t.get("fraud_prob"),
+                "patterns": t.get("patterns_detected"),
+            })
+            for t in txs[:examples]
+        ],
+    }
+    return _compact(summary)
+
+def build_investigation_prompt(
+    payload: dict,
+    rag: dict,
+    token_budget: int = settings.PROMPT_TOKEN_BUDGET,
+    examples: int = settings.PROMPT_TX_EXAMPLES,
+    top: int = settings.PROMPT_TOP_ITEMS
+) -> Tuple[str, dict]:
+    """
+    Assembles the investigation prompt from compact JSON, shrinking the evidence
+    level by level until it fits token_budget (0 = no budget). The instructions
+    and payload are never cut. Returns the prompt and its size report.
+    """
+    payload = _compact(payload) or {}
+    # Fields already stated in the payload are not repeated in the evidence
+    same = lambda d: tuple(k for k, v in (d or {}).items() if payload.get(k) == v)
+    profile = rag.get("merchant_profile")
+    policy = rag.get("policy")
+    txs = rag.get("recent_transactions") or []
+
+    head = f"{_INSTRUCTIONS}\n\nPAYLOAD:\n{_dumps(payload)}\n\nEVIDENCE:\n"
+    for level, (n_examples, n_top, limit) in enumerate(_LEVELS):
+        evidence = _compact({
+            "merchant_profile": _compact(profile, drop=same(profile)),
+            "policy": _compact(policy, drop=("merchant_key",) + same(policy)),
+            "recent_transactions": summarize_transactions(
+                txs,
+                examples if n_examples is None else min(examples, n_examples),
+                top if n_top is None else min(top, n_top)
+            ),
+            "similar_cases": [
+                # When a past case was logged says nothing about this one, and would change the prompt daily
+                _compact(c, drop=("merchant_id", "timestamp")) for c in (rag.get("similar_cases") or [])[:n_top]
+            ],
+        }) or {}
+        prompt = f"{head}{_dumps(_clip(evidence, limit))}\n\n{_OUTPUT}"
+        tokens = estimate_tokens(prompt)
+        if not token_budget or tokens <= token_budget:
+            break
+
+    return prompt, {
+        "tokens_est": tokens,
+        "budget": token_budget,
+        "over_budget": bool(token_budget) and tokens > token_budget,
+        "level": level,
+        "recent_transactions": len(txs),
+    }
@@ -1,7 +1,27 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Optional, Tuple
 from ..db.repos.concrete import MerchantRepo, TransactionRepo, PolicyRepo
 from ..services.rename_service import RenameService
 from ..core.csv_loader import CSVLoader
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.normalize import normalize_name
 from ..domain.entities import MerchantProfile
+from .case_index import CaseIndex
+
+async def _timed(name: str, aw: Awaitable, timeout: float) -> Tuple[Any, dict]:
+    """Awaits one source under its own timeout; failures degrade to None instead of raising."""
+    start = time.perf_counter()
+    try:
+        value, status = await asyncio.wait_for(aw, timeout), "ok"
+    except asyncio.TimeoutError:
+        value, status = None, "timeout"
+        logger.warning(f"RAG source '{name}' timed out after {timeout}s")
+    except Exception as e:
+        value, status = None, "error"
+        logger.error(f"RAG source '{name}' failed", exc_info=e)
+    return value, {"status": status, "ms": round((time.perf_counter() - start) * 1000, 1)}
 
 class RAGService:
     def __init__(
@@ -9,37 +29,55 @@ class RAGService:
         merchant_repo: MerchantRepo,
         tx_repo: TransactionRepo,
         policy_repo: PolicyRepo,
-        csv_loader: CSVLoader
+        csv_loader: CSVLoader,
+        case_index: Optional[CaseIndex] = None
     ):
         self.merchant_repo = merchant_repo
         self.tx_repo = tx_repo
         self.policy_repo = policy_repo
         self.csv_loader = csv_loader
+        self.case_index = case_index
 
-    async def build_context(self, merchant_id: str, merchant_name: str) -> dict:
-        # 1. Fetch Profile (DB or CSV)
-        profile = None
-        if merchant_id:
-            profile = await self.merchant_repo.find_one({"merchant_id": merchant_id})
-        
-        if not profile and merchant_id:
-             # Try CSV if not in DB (unlikely if they are investigating a tx, but good fallback)
-             csv_p = self.csv_loader.get_merchant(merchant_id)
-             if csv_p: profile = csv_p
+    async def _profile(self, merchant_id: str):
+        return await self.merchant_repo.find_one({"merchant_id": merchant_id}) if merchant_id else None
 
-        # 2. Fetch Recent Transactions
-        recent_tx = await self.tx_repo.find_many(
-            {"merchant_id": merchant_id}, 
-            limit=10, 
-            sort=[("timestamp", -1)]
+    async def build_context(self, merchant_id: str, merchant_name: str, payload: Optional[dict] = None) -> dict:
+        # Profile, recent transactions and policy are independent: fetch them together
+        merchant_key = normalize_name(merchant_name).split(" ")[0] if merchant_name else ""
+        (profile, profile_meta), (recent_tx, tx_meta), (policy, policy_meta) = await asyncio.gather(
+            _timed("merchant_profile", self._profile(merchant_id), settings.RAG_PROFILE_TIMEOUT_SECONDS),
+            _timed(
+                "recent_transactions",
+                self.tx_repo.find_many({"merchant_id": merchant_id}, limit=10, sort=[("timestamp", -1)]),
+                settings.RAG_TRANSACTIONS_TIMEOUT_SECONDS
+            ),
+            _timed("policy", self.policy_repo.find_one({"merchant_key": merchant_key}), settings.RAG_POLICY_TIMEOUT_SECONDS),
         )
 
-        # 3. Fetch Policy
-        merchant_key = self.csv_loader._normalize_name(merchant_name).split(" ")[0] if merchant_name else ""
-        policy = await self.policy_repo.find_one({"merchant_key": merchant_key})
+        if not profile and merchant_id:
+             # Try CSV if not in DB (or the DB didn't answer in time); it's in memory, so no timeout
+             csv_p = self.csv_loader.get_merchant(merchant_id)
+             if csv_p:
+                 profile = csv_p
+                 profile_meta["fallback"] = "csv"
+
+        sources = {
+            "merchant_profile": profile_meta,
+            "recent_transactions": tx_meta,
+            "policy": policy_meta,
+        }
+        similar = []
+        if self.case_index:
+            # In memory as well, so no timeout
+            start = time.perf_counter()
+            payload = {**(payload or {}), "merchant_name": merchant_name}
+            similar = self.case_index.similar_cases(payload, merchant_id)
+            sources["similar_cases"] = {"status": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
 
         return {
             "merchant_profile": profile.model_dump() if profile else None,
-            "recent_transactions": [t.model_dump() for t in recent_tx],
-            "policy": policy.model_dump() if policy else None
+            "recent_transactions": [t.model_dump() for t in recent_tx or []],
+            "policy": policy.model_dump() if policy else None,
+            "similar_cases": similar,
+            "sources": sources
         }
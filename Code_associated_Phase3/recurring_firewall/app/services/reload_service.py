@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from ..core.csv_loader import CSVLoader
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.exceptions import ConfigurationError
+from ..domain.similarity_engine import SimilarityEngine
+
+class DataReloadService:
+    """
+    Hot reload of the merchant master and company registry. A fresh CSVLoader
+    and similarity index are built in a worker thread, then published to the
+    live loader as one ReferenceData; requests already running keep the
+    generation they captured.
+    """
+    def __init__(self, csv_loader: CSVLoader, similarity_engine: SimilarityEngine):
+        self.csv_loader = csv_loader
+        self.similarity_engine = similarity_engine
+        self.last_report: Optional[dict] = None
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._fingerprint = self._source_fingerprint()
+
+    async def reload(self, reason: str = "manual") -> dict:
+        async with self._lock:
+            started = time.perf_counter()
+            fingerprint = self._source_fingerprint()
+
+            fresh = CSVLoader()
+            await asyncio.to_thread(fresh.load_data)
+            if fresh.load_errors:
+                # Never swap a half-loaded dataset in over a good one
+                raise ConfigurationError("Reload aborted: " + "; ".join(fresh.load_errors))
+            loaded = time.perf_counter()
+
+            index = await asyncio.to_thread(self.similarity_engine.build_index, fresh.company_list)
+            indexed = time.perf_counter()
+
+            merchants = await asyncio.to_thread(self._diff, self.csv_loader.merchant_lookup.merchant_ids.tolist(), fresh.merchant_lookup.merchant_ids.tolist())
+            companies = await asyncio.to_thread(self._diff, self.csv_loader.company_list, fresh.company_list)
+
+            # One assignment publishes profiles, companies and index together
+            self.csv_loader.publish(fresh.data.replace(index=index, version=self.csv_loader.version + 1))
+            self._fingerprint = fingerprint
+
+            report = {
+                "ok": True,
+                "reason": reason,
+                "version": self.csv_loader.version,
+                "timing_ms": {
+                    "load": round((loaded - started) * 1000, 1),
+                    "index": round((indexed - loaded) * 1000, 1),
+                    "total": round((time.perf_counter() - started) * 1000, 1),
+                },
+                "merchants": merchants,
+                "companies": companies,
+            }
+            self.last_report = report
+            logger.info("Data reloaded", extra={"props": report})
+            return report
+
+    @staticmethod
+    def _diff(before: list, after: list) -> dict:
+        old, new = set(before), set(after)
+        return {"before": len(old), "after": len(new), "added": len(new - old), "removed": len(old - new)}
+
+    # --- File watcher ---
+    def start_watching(self, interval: float):
+        if interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(interval))
+
+    async def stop_watching(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            fingerprint = self._source_fingerprint()
+            if fingerprint == self._fingerprint:
+                continue
+            try:
+                await self.reload(reason="file_changed")
+            except Exception as e:
+                # Don't retry until the files change again
+                self._fingerprint = fingerprint
+                logger.error("Hot reload failed; keeping current data", exc_info=e)
+
+    @staticmethod
+    def _source_fingerprint() -> tuple:
+        fp = []
+        for path in (settings.MASTER_CSV_PATH, settings.COMPANY_CSV_PATH):
+            try:
+                st = os.stat(path)
+                fp.append((st.st_size, st.st_mtime_ns))
+            except OSError:
+                fp.append(None)
+        return tuple(fp)
@@ -1,16 +1,60 @@
-from typing import Tuple
+from typing import List, Optional, Tuple
 from ..domain.similarity_engine import SimilarityEngine
+from ..core.cache import LRUCache
+from ..core.csv_loader import ReferenceData
+from ..core.config import settings
+from ..core.normalize import normalize_name
 from ..core.logger import logger
 
 class RenameService:
-    def __init__(self, similarity_engine: SimilarityEngine):
+    def __init__(self, similarity_engine: SimilarityEngine, cache: Optional[LRUCache] = None):
         self.engine = similarity_engine
+        self.cache = cache if cache is not None else LRUCache(settings.MATCH_CACHE_SIZE, settings.MATCH_CACHE_TTL_SECONDS)
+        self._cached_version: Optional[int] = None
 
-    def check_similarity(self, merchant_name: str) -> Tuple[str, int]:
+    def check_similarity(self, merchant_name: str, data: Optional[ReferenceData] = None) -> Tuple[str, int]:
         """
-        Returns (best_match_name, similarity_score)
+        Returns (best_match_name, similarity_score) against `data` (default:
+        the current generation).
         """
-        name, score = self.engine.find_best_match(merchant_name)
+        data = self.engine.snapshot(data)
+        self._check_cache_validity(data)
+
+        key = normalize_name(merchant_name)
+        result = self.cache.get((data.version, key))
+        if result is None:
+            result = self.engine.match_normalized(key, data)
+            self.cache.set((data.version, key), result)
+
+        name, score = result
         if score > 80:
             logger.info(f"High similarity detected: '{merchant_name}' ~= '{name}' ({score}%)")
         return name, score
+
+    def check_similarity_many(self, merchant_names: List[str], data: Optional[ReferenceData] = None) -> List[Tuple[str, int]]:
+        """
+        Batch variant of check_similarity; cache misses are matched in one bulk call.
+        """
+        data = self.engine.snapshot(data)
+        self._check_cache_validity(data)
+
+        keys = [normalize_name(n) for n in merchant_names]
+        found = {}
+        for key in set(keys):
+            result = self.cache.get((data.version, key))
+            if result is not None:
+                found[key] = result
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        for key, result in zip(missing, self.engine.match_many(missing, data)):
+            self.cache.set((data.version, key), result)
+            found[key] = result
+
+        return [found[k] for k in keys]
+
+    def _check_cache_validity(self, data: ReferenceData):
+        # Results are keyed by data version; drop older ones once a newer generation shows up.
+        # A request still holding an older generation just misses and adds a few stale keys.
+        if self._cached_version is None or data.version > self._cached_version:
+            self.cache.clear()
+            self._cached_version = data.version
@@ -1,81 +1,233 @@
+import asyncio
 from datetime import datetime
+from typing import List, Optional, Tuple
 from ..db.repos.concrete import MerchantRepo, TransactionRepo
 from ..services.rename_service import RenameService
-from ..core.csv_loader import CSVLoader
-from ..domain.entities import TransactionScore
+from ..services.audit_writer import AuditWriter
+from ..services.model_service import ModelService
+from ..core.csv_loader import CSVLoader, ReferenceData
+from ..domain.entities import MerchantProfile, TransactionScore
+from ..domain.subscription_features import SubscriptionFeatureStore
+from ..domain.velocity import VelocityTracker
+from ..core.config import settings
 from ..core.logger import logger
 
+_SEVERITY = {"ALLOW": 0, "REVIEW": 1, "BLOCK": 2}
+
+def _worst(a: str, b: str) -> str:
+    return a if _SEVERITY.get(a, 1) >= _SEVERITY.get(b, 1) else b
+
 class ScoringService:
     def __init__(
         self, 
         csv_loader: CSVLoader,
         rename_service: RenameService,
         tx_repo: TransactionRepo,
-        merchant_repo: MerchantRepo
+        merchant_repo: MerchantRepo,
+        audit_writer: Optional[AuditWriter] = None,
+        subscription_store: Optional[SubscriptionFeatureStore] = None,
+        velocity: Optional[VelocityTracker] = None,
+        model_service: Optional[ModelService] = None
     ):
         self.csv_loader = csv_loader
         self.rename_service = rename_service
         self.tx_repo = tx_repo
         self.merchant_repo = merchant_repo
+        self.audit_writer = audit_writer
+        self.subscription_store = subscription_store
+        self.velocity = velocity
+        self.model_service = model_service
 
-    async def score_transaction(self, merchant_id: str, merchant_name: str, amount: float) -> TransactionScore:
-        # 1. Lookup ID in CSV
-        profile = self.csv_loader.get_merchant(merchant_id)
-        
-        # 2. Fallback: Lookup Name in CSV
-        if not profile and merchant_name:
-            profile = self.csv_loader.get_merchant_by_name(merchant_name)
+    async def score_transaction(
+        self, merchant_id: str, merchant_name: str, amount: float,
+        subscription_id: Optional[str] = None, model_features: Optional[dict] = None
+    ) -> TransactionScore:
+        # One reference-data generation for the whole request, even across a reload
+        data = self.csv_loader.data
+        # 1. Lookup ID in CSV, 2. Fallback: Lookup Name in CSV
+        profile = self._lookup_profile(data, merchant_id, merchant_name)
+
+        # Fraud model, micro-batched with concurrent requests
+        fraud = None
+        if model_features and self.model_service and self.model_service.enabled:
+            try:
+                fraud = await self.model_service.predict(model_features)
+            except Exception as e:
+                # No model score: the rules and fixed fallback trust still apply
+                logger.error(f"Fraud model failed for '{merchant_id}'", exc_info=e)
         
         # 3. Existing Profile Found
         if profile:
-            score = TransactionScore(
-                merchant_id=profile.merchant_id,
-                merchant_name=profile.merchant_name,
-                amount=amount,
-                decision=profile.final_decision,
-                merchant_trust_score=profile.merchant_trust_score,
-                risk_score=profile.risk_score,
-                rename_similarity_score=profile.rename_similarity_score,
-                closest_company_match=profile.closest_company_match,
-                patterns_detected=profile.patterns_detected,
-                reasons=self._build_reasons(profile.merchant_trust_score, profile.patterns_detected, profile.rename_similarity_score),
-                user_guidance=self._guidance(profile.final_decision)
-            )
+            score = self._score_known(profile, amount, self._record_velocity(profile.merchant_id, amount), fraud)
         else:
             # 4. Unknown -> Fuzzy Match
-            best_match, rename_score = self.rename_service.check_similarity(merchant_name)
-            
-            # Logic from original
-            if rename_score >= 90:
-                decision, trust = "BLOCK", 25.0
-            elif rename_score >= 80:
-                decision, trust = "REVIEW", 40.0
-            else:
-                decision, trust = "REVIEW", 50.0
-
-            patterns = ["NEW_MERCHANT"]
-            if rename_score >= 80:
-                patterns.append("MERCHANT_REBRAND_PATTERN")
-
-            score = TransactionScore(
-                merchant_id=merchant_id,
-                merchant_name=merchant_name,
-                amount=amount,
-                decision=decision,
-                merchant_trust_score=trust,
-                rename_similarity_score=rename_score,
-                closest_company_match=best_match,
-                patterns_detected=patterns,
-                reasons=self._build_reasons(trust, patterns, rename_score),
-                user_guidance=self._guidance(decision)
-            )
-
-        # 5. Async Log to DB
-        await self.tx_repo.insert(score)
+            best_match, rename_score = self.rename_service.check_similarity(merchant_name, data)
+            velocity = self._record_velocity(merchant_id, amount)
+            score = self._score_unknown(merchant_id, merchant_name, amount, best_match, rename_score, velocity, fraud)
+
+        self._apply_subscription(score, subscription_id)
+
+        # 5. Async Log to DB (write-behind when the audit writer is running)
+        await self._log([score])
         
         return score
 
-    def _build_reasons(self, trust, patterns, rename_score):
+    async def score_batch(self, items: List[Tuple]) -> List[TransactionScore]:
+        """
+        Scores many (merchant_id, merchant_name, amount[, subscription_id[, model_features]])
+        rows at once. Output per row is identical to score_transaction.
+        """
+        # One reference-data generation for the whole batch, even across a reload
+        data = self.csv_loader.data
+        profiles = [self._lookup_profile(data, item[0], item[1]) for item in items]
+        unknown = [i for i, p in enumerate(profiles) if p is None]
+
+        # All unknown names go through one bulk fuzzy match, off the event loop
+        matches = await asyncio.to_thread(
+            self.rename_service.check_similarity_many, [items[i][1] for i in unknown], data
+        )
+        match_by_row = dict(zip(unknown, matches))
+
+        # The batch is already a batch: one model call for every row that has features
+        fraud_by_row = {}
+        if self.model_service and self.model_service.enabled:
+            modelled = [i for i, item in enumerate(items) if len(item) > 4 and item[4]]
+            try:
+                results = await self.model_service.predict_many([items[i][4] for i in modelled])
+            except Exception as e:
+                logger.error(f"Fraud model failed for a batch of {len(modelled)}", exc_info=e)
+                results = []
+            fraud_by_row = dict(zip(modelled, results))
+
+        scores = []
+        for i, (item, profile) in enumerate(zip(items, profiles)):
+            mid, name, amount = item[:3]
+            fraud = fraud_by_row.get(i)
+            if profile:
+                score = self._score_known(profile, amount, self._record_velocity(profile.merchant_id, amount), fraud)
+            else:
+                best_match, rename_score = match_by_row[i]
+                velocity = self._record_velocity(mid, amount)
+                score = self._score_unknown(mid, name, amount, best_match, rename_score, velocity, fraud)
+            # In row order, so a subscription's features see its earlier rows in the batch
+            self._apply_subscription(score, item[3] if len(item) > 3 else None)
+            scores.append(score)
+
+        await self._log(scores)
+        return scores
+
+    async def _log(self, scores: List[TransactionScore]):
+        if self.audit_writer:
+            await self.audit_writer.submit_many(scores)
+        else:
+            await self.tx_repo.insert_many(scores)
+
+    def _apply_subscription(self, score: TransactionScore, subscription_id: Optional[str]):
+        """Folds the transaction into its subscription's running features and applies the abuse rules."""
+        if not subscription_id or not self.subscription_store:
+            return
+        features = self.subscription_store.update(subscription_id, score.amount, score.timestamp)
+        score.subscription_id = subscription_id
+        score.subscription_features = features
+
+        patterns = features["patterns_detected"]
+        if not patterns:
+            return
+        score.patterns_detected = score.patterns_detected + [p for p in patterns if p not in score.patterns_detected]
+        score.reasons = [r for r in score.reasons if r != "No high-risk signals detected."]
+        score.reasons.append(
+            f"Subscription behaviour: {', '.join(patterns)} "
+            f"({features['tx_in_window_max']} tx in {self.subscription_store.window_steps} steps, "
+            f"{features['tx_count']} total)"
+        )
+        if score.decision == "ALLOW" and features["rule_abuse_score"] >= settings.SUBSCRIPTION_REVIEW_SCORE:
+            score.decision = "REVIEW"
+            score.user_guidance = self._guidance(score.decision)
+
+    def _record_velocity(self, merchant_id: str, amount: float) -> Optional[dict]:
+        if not self.velocity or not merchant_id:
+            return None
+        return self.velocity.record(merchant_id, amount)
+
+    def _velocity_patterns(self, velocity: Optional[dict]) -> List[str]:
+        if not velocity:
+            return []
+        patterns = []
+        if velocity["spike_ratio"] is not None and velocity["spike_ratio"] > settings.VELOCITY_SPIKE_RATIO:
+            patterns.append("SPIKE_PATTERN")
+        if velocity["microcharge_rate"] is not None and velocity["microcharge_rate"] > settings.VELOCITY_MICROCHARGE_RATE:
+            patterns.append("MICROCHARGE_PATTERN")
+        return patterns
+
+    @staticmethod
+    def _lookup_profile(data: ReferenceData, merchant_id: str, merchant_name: str) -> Optional[MerchantProfile]:
+        profile = data.get_merchant(merchant_id)
+        if not profile and merchant_name:
+            profile = data.get_merchant_by_name(merchant_name)
+        return profile
+
+    def _score_known(
+        self, profile: MerchantProfile, amount: float,
+        velocity: Optional[dict] = None, fraud: Optional[Tuple[float, str]] = None
+    ) -> TransactionScore:
+        live = [p for p in self._velocity_patterns(velocity) if p not in profile.patterns_detected]
+        patterns = profile.patterns_detected + live
+        # A live spike/microcharge burst overrides a stale offline ALLOW
+        decision = "REVIEW" if live and profile.final_decision == "ALLOW" else profile.final_decision
+        if fraud:
+            decision = _worst(decision, fraud[1])
+        return TransactionScore(
+            merchant_id=profile.merchant_id,
+            merchant_name=profile.merchant_name,
+            amount=amount,
+            decision=decision,
+            merchant_trust_score=profile.merchant_trust_score,
+            risk_score=profile.risk_score,
+            rename_similarity_score=profile.rename_similarity_score,
+            closest_company_match=profile.closest_company_match,
+            patterns_detected=patterns,
+            reasons=self._build_reasons(profile.merchant_trust_score, patterns, profile.rename_similarity_score, velocity, fraud),
+            user_guidance=self._guidance(decision),
+            fraud_prob=fraud[0] if fraud else None
+        )
+
+    def _score_unknown(
+        self, merchant_id: str, merchant_name: str, amount: float, best_match: str, rename_score: int,
+        velocity: Optional[dict] = None, fraud: Optional[Tuple[float, str]] = None
+    ) -> TransactionScore:
+        # Logic from original
+        if rename_score >= 90:
+            decision, trust = "BLOCK", 25.0
+        elif rename_score >= 80:
+            decision, trust = "REVIEW", 40.0
+        else:
+            decision, trust = "REVIEW", 50.0
+        if fraud:
+            # The model replaces the fixed fallback trust, but never softens a rename hit
+            trust = min(trust, round(100 * (1 - fraud[0]), 1))
+            decision = _worst(decision, fraud[1]) if rename_score >= 80 else fraud[1]
+
+        patterns = ["NEW_MERCHANT"]
+        if rename_score >= 80:
+            patterns.append("MERCHANT_REBRAND_PATTERN")
+        patterns += self._velocity_patterns(velocity)
+
+        return TransactionScore(
+            merchant_id=merchant_id,
+            merchant_name=merchant_name,
+            amount=amount,
+            decision=decision,
+            merchant_trust_score=trust,
+            risk_score=fraud[0] if fraud else None,
+            rename_similarity_score=rename_score,
+            closest_company_match=best_match,
+            patterns_detected=patterns,
+            reasons=self._build_reasons(trust, patterns, rename_score, velocity, fraud),
+            user_guidance=self._guidance(decision),
+            fraud_prob=fraud[0] if fraud else None
+        )
+
+    def _build_reasons(self, trust, patterns, rename_score, velocity=None, fraud=None):
         reasons = []
         if trust < 55:
             reasons.append(f"Low merchant trust score: {trust:.1f}/100")
@@ -83,6 +235,14 @@ class ScoringService:
             reasons.append("Patterns detected: " + ", ".join(patterns))
         if rename_score >= 80:
             reasons.append(f"Merchant name similar to existing company ({rename_score}%)")
+        if velocity:
+            micro, spike = velocity["microcharge_rate"], velocity["spike_ratio"]
+            if micro is not None and micro > settings.VELOCITY_MICROCHARGE_RATE:
+                reasons.append(f"High microcharge rate: {micro:.2f}")
+            if spike is not None and spike > settings.VELOCITY_SPIKE_RATIO:
+                reasons.append(f"Abnormal transaction spike ratio: {spike:.2f}")
+        if fraud and fraud[1] != "ALLOW":
+            reasons.append(f"Fraud model probability: {fraud[0]:.3f} ({fraud[1]} threshold)")
         if not reasons:
             reasons.append("No high-risk signals detected.")
         return reasons
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from ..db.repos.concrete import TransactionRepo, RollupRepo, hour_bucket
+from ..domain.entities import TransactionRollup
+
+class TransactionStatsService:
+    """
+    Merchant history and dashboard figures from hourly rollups. Bucketed
+    storage reads the stored rollups; raw storage aggregates transactions.
+    """
+    def __init__(self, tx_repo: TransactionRepo, rollup_repo: Optional[RollupRepo] = None):
+        self.tx_repo = tx_repo
+        self.rollup_repo = rollup_repo
+
+    def _window(self, hours: int, merchant_id: Optional[str] = None) -> dict:
+        since = hour_bucket(datetime.utcnow() - timedelta(hours=hours - 1))
+        query = {"bucket" if self.rollup_repo else "timestamp": {"$gte": since}}
+        if merchant_id:
+            query["merchant_id"] = merchant_id
+        return query
+
+    async def _rollups(self, hours: int, merchant_id: Optional[str] = None) -> List[TransactionRollup]:
+        query = self._window(hours, merchant_id)
+        if self.rollup_repo:
+            # One document per merchant-hour, so the window bounds the result size
+            limit = hours if merchant_id else 0
+            return await self.rollup_repo.find_many(query, limit=limit, sort=[("bucket", -1)])
+        return await self.tx_repo.hourly_rollups(query)
+
+    async def merchant_history(self, merchant_id: str, hours: int) -> List[dict]:
+        return [r.model_dump() for r in await self._rollups(hours, merchant_id)]
+
+    async def summary(self, hours: int, top: int = 10) -> dict:
+        # Aggregated in Mongo: the window can hold every merchant-hour of 90 days
+        repo = self.rollup_repo or self.tx_repo
+        out = await repo.summary(self._window(hours), top)
+        return {"hours": hours, **out, "amount_sum": round(out["amount_sum"], 2)}
@@ -0,0 +1,111 @@
+"""
+Startup-time benchmark for CSVLoader master CSV loading.
+
+Generates a synthetic merged_master_firewall_output.csv per size and times the
+legacy per-row iterrows() loader, the current columnar loader (cold start,
+including writing the binary snapshot) and a warm start from that snapshot.
+
+Run from recurring_firewall/:
+    python -m benchmarks.bench_csv_load --sizes 100000 1000000 5000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import pandas as pd
+from app.core.config import settings
+from app.core.csv_loader import CSVLoader
+from app.core.normalize import normalize_name
+from app.domain.entities import MerchantProfile
+
+PATTERNS = ["NEW_MERCHANT", "MICROCHARGE_PATTERN", "SPIKE_PATTERN", "MERCHANT_REBRAND_PATTERN", "FORCED_TRIAL"]
+NAMES = ["Netflix", "Spotify", "Adobe", "Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne"]
+SUFFIXES = ["Inc", "Ltd", "Pvt Ltd", "Online Store", "Services", "", "Co"]
+
+
+def make_master_csv(path: str, rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunk = 250_000
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        pd.DataFrame({
+            "merchant_id": [f"m_{i}" for i in range(start, start + n)],
+            "merchant_name": [f"{rng.choice(NAMES)} {i} {rng.choice(SUFFIXES)}" for i in range(start, start + n)],
+            "merchant_trust_score": [round(rng.uniform(0, 100), 2) for _ in range(n)],
+            "risk_score": [round(rng.random(), 4) for _ in range(n)],
+            "rename_similarity_score": [rng.randint(0, 100) for _ in range(n)],
+            "patterns_detected": [str(rng.sample(PATTERNS, rng.randint(0, 3))) for _ in range(n)],
+            "final_decision": [rng.choice(["ALLOW", "REVIEW", "BLOCK"]) for _ in range(n)],
+        }).to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def legacy_load(loader: CSVLoader):
+    """The original iterrows() implementation, kept here for comparison."""
+    df = pd.read_csv(settings.MASTER_CSV_PATH)
+    df["merchant_id"] = df["merchant_id"].astype(str).str.strip()
+    lookup, name_map = {}, {}
+    for _, row in df.iterrows():
+        mid = row["merchant_id"]
+        name = row.get("merchant_name", "Unknown")
+        try:
+            lookup[mid] = MerchantProfile(
+                merchant_id=mid,
+                merchant_name=name,
+                merchant_trust_score=float(row.get("merchant_trust_score", 50)),
+                risk_score=float(row.get("risk_score", 0.5)),
+                rename_similarity_score=int(row.get("rename_similarity_score", 0)),
+                patterns_detected=loader._safe_parse_patterns(row.get("patterns_detected")),
+                final_decision=row.get("final_decision", "REVIEW")
+            )
+            clean_name = normalize_name(name)
+            if clean_name:
+                name_map[clean_name] = mid
+        except Exception:
+            pass
+    return lookup, name_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=None, help="Skip the legacy loader above this size")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy_s':>10} {'columnar_s':>11} {'speedup':>8} {'snapshot_s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.SNAPSHOT_DIR = os.path.join(tmp, "snapshots")
+        for rows in args.sizes:
+            path = os.path.join(tmp, f"master_{rows}.csv")
+            make_master_csv(path, rows)
+            settings.MASTER_CSV_PATH = path
+
+            loader = CSVLoader()
+            start = time.perf_counter()
+            _, columnar_lookup, columnar_names = loader._load_master_csv()
+            columnar = time.perf_counter() - start
+
+            start = time.perf_counter()
+            warm = CSVLoader()
+            restored = warm._restore_master_snapshot()
+            assert restored
+            snapshot_s = time.perf_counter() - start
+
+            legacy = None
+            if args.legacy_max_rows is None or rows <= args.legacy_max_rows:
+                start = time.perf_counter()
+                lookup, name_map = legacy_load(loader)
+                legacy = time.perf_counter() - start
+                # Sanity check: same merchants, same name map, same sampled profiles
+                assert len(lookup) == len(columnar_lookup)
+                assert name_map == columnar_names
+                for mid in random.Random(1).sample(list(lookup), min(1000, len(lookup))):
+                    assert lookup[mid] == columnar_lookup[mid] == restored[1][mid], mid
+
+            legacy_s = f"{legacy:10.2f}" if legacy is not None else f"{'skipped':>10}"
+            speedup = f"{legacy / columnar:7.1f}x" if legacy is not None else f"{'-':>8}"
+            print(f"{rows:>10} {legacy_s} {columnar:11.2f} {speedup} {snapshot_s:11.4f}")
+
+
+if __name__ == "__main__":
+    main()
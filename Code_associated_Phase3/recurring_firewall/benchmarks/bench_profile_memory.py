@@ -0,0 +1,97 @@
+"""
+Memory benchmark for the columnar merchant store.
+
+Builds a ProfileStore + NameIndex with synthetic merchants per size and
+reports the bytes held by their arrays and the process RSS once the input
+lists are freed. For comparison it measures a dict of MerchantProfile
+models (the pre-columnar merchant_lookup) on a sample and extrapolates.
+
+Run from recurring_firewall/:
+    python -m benchmarks.bench_profile_memory --sizes 1000000 10000000
+"""
+import argparse
+import gc
+import os
+import random
+import tracemalloc
+import numpy as np
+from app.core.normalize import normalize_many
+from app.core.profile_store import ProfileStore, NameIndex
+from app.domain.entities import MerchantProfile
+from benchmarks.bench_csv_load import PATTERNS, NAMES, SUFFIXES
+
+MB = 1 << 20
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_rows(rows: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    nprng = np.random.default_rng(seed)
+    return {
+        "merchant_ids": [f"m_{i}" for i in range(rows)],
+        "merchant_names": [f"{rng.choice(NAMES)} {i} {rng.choice(SUFFIXES)}".strip() for i in range(rows)],
+        "trust_scores": nprng.uniform(0, 100, rows).round(2),
+        "risk_scores": nprng.random(rows).round(4),
+        "rename_scores": nprng.integers(0, 101, rows),
+        "patterns": [rng.sample(PATTERNS, rng.randint(0, 3)) for _ in range(rows)],
+        "decisions": [rng.choice(["ALLOW", "REVIEW", "BLOCK"]) for _ in range(rows)],
+    }
+
+
+def legacy_bytes_per_merchant(sample: int) -> float:
+    """Bytes per merchant of a dict of MerchantProfile models, as loaded before the ProfileStore."""
+    # The id/name strings are allocated before tracing starts, so this undercounts the old layout
+    data = make_rows(sample, seed=1)
+    gc.collect()
+    tracemalloc.start()
+    lookup = {
+        mid: MerchantProfile(
+            merchant_id=mid, merchant_name=name, merchant_trust_score=float(trust),
+            risk_score=float(risk), rename_similarity_score=int(rename),
+            patterns_detected=list(patterns), final_decision=decision
+        )
+        for mid, name, trust, risk, rename, patterns, decision in zip(
+            data["merchant_ids"], data["merchant_names"], data["trust_scores"], data["risk_scores"],
+            data["rename_scores"], data["patterns"], data["decisions"]
+        )
+    }
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del lookup
+    return used / sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--legacy-sample", type=int, default=100_000)
+    args = parser.parse_args()
+
+    legacy = legacy_bytes_per_merchant(args.legacy_sample)
+    print(f"dict of MerchantProfile: ~{legacy:.0f} B/merchant (sampled over {args.legacy_sample} merchants)")
+    print(f"{'rows':>10} {'store_MB':>9} {'B/merchant':>11} {'rss_MB':>8} {'legacy_MB':>10} {'ratio':>7}")
+
+    for rows in args.sizes:
+        data = make_rows(rows)
+        store = ProfileStore.from_rows(**data)
+        names = NameIndex.build(normalize_many(data["merchant_names"]), store.merchant_ids)
+        assert store[f"m_{rows - 1}"].merchant_name == data["merchant_names"][-1]
+        del data
+        gc.collect()
+
+        held = store.nbytes + names.nbytes
+        legacy_total = legacy * rows
+        print(
+            f"{rows:>10} {held / MB:9.1f} {held / rows:11.1f} {current_rss() / MB:8.1f} "
+            f"{legacy_total / MB:10.1f} {legacy_total / held:6.1f}x"
+        )
+        del store, names
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
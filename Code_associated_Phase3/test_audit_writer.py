@@ -0,0 +1,169 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+from pymongo.errors import BulkWriteError
+from app.db.repos.concrete import RollupRepo, TransactionRepo
+from app.domain.entities import TransactionScore
+from app.services.audit_writer import AuditWriter
+
+
+def _scores(n, start=0):
+    return [TransactionScore(merchant_id=f"m{i}", merchant_name="Acme", amount=float(i), decision="ALLOW") for i in range(start, start + n)]
+
+
+class FakeCollection:
+    """insert_many / bulk_write stand-in; `reject` holds the batch positions to fail."""
+    name = "fake"
+
+    def __init__(self):
+        self.docs = []
+        self.bulk_ops = []
+        self.reject = set()
+        self.down = False
+
+    async def insert_many(self, docs, ordered=True):
+        if self.down:
+            raise ConnectionError("mongo unavailable")
+        kept = [d for i, d in enumerate(docs) if i not in self.reject]
+        self.docs += kept
+        if self.reject:
+            raise BulkWriteError({
+                "nInserted": len(kept),
+                "writeErrors": [{"index": i, "code": 121, "errmsg": "validation"} for i in sorted(self.reject)],
+            })
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_ops += ops
+
+
+class FakeRepo:
+    """What AuditWriter needs from a repository, with a switchable failure mode."""
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.reject = set()
+
+    async def insert_many_failed(self, batch):
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(batch))
+        return [e for e in batch if e.merchant_id in self.reject]
+
+
+def _spilled(path):
+    return [json.loads(line)["merchant_id"] for line in path.read_text().splitlines()]
+
+
+def test_batches_by_size_and_drains_on_close(tmp_path):
+    async def run():
+        repo = FakeRepo()
+        writer = AuditWriter(repo, max_queue=100, batch_size=4, flush_interval=60, spill_path=str(tmp_path / "s.jsonl"))
+        writer.start()
+        await writer.submit_many(_scores(10))
+        await writer.close()
+        assert [len(b) for b in repo.batches] == [4, 4, 2]
+        assert writer.written == 10 and writer.failed == 0
+        assert [e.merchant_id for b in repo.batches for e in b] == [f"m{i}" for i in range(10)]
+    asyncio.run(run())
+
+
+def test_flush_interval_bounds_the_wait(tmp_path):
+    async def run():
+        repo = FakeRepo()
+        writer = AuditWriter(repo, max_queue=100, batch_size=100, flush_interval=0.02, spill_path=str(tmp_path / "s.jsonl"))
+        writer.start()
+        await writer.submit(_scores(1)[0])
+        await asyncio.sleep(0.1)
+        assert writer.written == 1
+        await writer.close()
+    asyncio.run(run())
+
+
+def test_not_started_writes_directly(tmp_path):
+    async def run():
+        repo = FakeRepo()
+        writer = AuditWriter(repo, spill_path=str(tmp_path / "s.jsonl"))
+        await writer.submit_many(_scores(2))
+        assert writer.written == 2 and len(repo.batches) == 2
+    asyncio.run(run())
+
+
+def test_partial_failure_spills_only_the_rejected_records(tmp_path):
+    async def run():
+        repo = FakeRepo()
+        repo.reject = {"m1", "m3"}
+        spill = tmp_path / "s.jsonl"
+        writer = AuditWriter(repo, batch_size=10, flush_interval=60, overflow_policy="spill", spill_path=str(spill))
+        writer.start()
+        await writer.submit_many(_scores(5))
+        await writer.close()
+        assert writer.written == 3 and writer.failed == 2 and writer.spilled == 2
+        assert _spilled(spill) == ["m1", "m3"]
+    asyncio.run(run())
+
+
+def test_overflow_drop(tmp_path):
+    async def run():
+        repo = FakeRepo(delay=0.05)
+        writer = AuditWriter(repo, max_queue=2, batch_size=10, flush_interval=0, overflow_policy="drop", spill_path=str(tmp_path / "s.jsonl"))
+        writer.start()
+        await writer.submit_many(_scores(5))
+        await writer.close()
+        assert writer.enqueued == 2 and writer.dropped == 3
+        assert writer.written == 2
+    asyncio.run(run())
+
+
+def test_overflow_spill_appends_in_one_write(tmp_path):
+    async def run():
+        repo = FakeRepo(delay=0.05)
+        spill = tmp_path / "s.jsonl"
+        writer = AuditWriter(repo, max_queue=2, batch_size=10, flush_interval=0, overflow_policy="spill", spill_path=str(spill))
+        writer.start()
+        await writer.submit_many(_scores(5))
+        await writer.close()
+        assert writer.enqueued == 2 and writer.spilled == 3
+        assert _spilled(spill) == ["m2", "m3", "m4"]
+        assert writer.written == 2
+    asyncio.run(run())
+
+
+def test_overflow_block_waits_for_room(tmp_path):
+    async def run():
+        repo = FakeRepo(delay=0.01)
+        writer = AuditWriter(repo, max_queue=2, batch_size=2, flush_interval=0, overflow_policy="block", spill_path=str(tmp_path / "s.jsonl"))
+        writer.start()
+        await writer.submit_many(_scores(8))
+        await writer.close()
+        assert writer.blocked > 0 and writer.dropped == 0
+        assert writer.written == 8
+    asyncio.run(run())
+
+
+def test_bulk_write_error_reports_only_failed_documents():
+    async def run():
+        tx = FakeCollection()
+        tx.reject = {1, 3}
+        rollups = FakeCollection()
+        repo = TransactionRepo({"tx": tx}, "tx", TransactionScore, rollups=RollupRepo({"r": rollups}, "r", object))
+        batch = _scores(5)
+        failed = await repo.insert_many_failed(batch)
+        assert failed == [batch[1], batch[3]]
+        assert [d["merchant_id"] for d in tx.docs] == ["m0", "m2", "m4"]
+        # Rollups count the stored transactions only
+        assert sorted(op._filter["_id"].split("|")[0] for op in rollups.bulk_ops) == ["m0", "m2", "m4"]
+        tx.reject = {0}
+        assert await repo.insert_many(_scores(1)) is False
+    asyncio.run(run())
+
+
+def test_connection_failure_fails_the_whole_batch():
+    async def run():
+        tx = FakeCollection()
+        tx.down = True
+        repo = TransactionRepo({"tx": tx}, "tx", TransactionScore)
+        batch = _scores(3)
+        assert await repo.insert_many_failed(batch) == batch
+    asyncio.run(run())
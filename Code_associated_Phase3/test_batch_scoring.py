@@ -0,0 +1,61 @@
+import asyncio
+import random
+import pytest
+
+pytest.importorskip("rapidfuzz")
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.normalize import normalize_name
+from app.domain.similarity_engine import SimilarityEngine
+from app.services.rename_service import RenameService
+from app.services.scoring_service import ScoringService
+from conftest import mutate
+
+EXTRA = ["netfl1x", "amaz0n", "bank", "data", "quick shop", "zz", "", "qqqxxxjjj", "Spotify Premium Ltd"]
+
+
+@pytest.fixture(scope="module")
+def names(company_list):
+    rng = random.Random(1)
+    return [mutate(rng, rng.choice(company_list)) for _ in range(300)] + EXTRA
+
+
+class _Repo:
+    def __init__(self):
+        self.rows = []
+
+    async def insert_many(self, scores):
+        self.rows += scores
+        return True
+
+
+@pytest.mark.parametrize("max_cells", [16_000_000, 50_000])
+def test_match_many_equals_single_lookups(company_loader, names, monkeypatch, max_cells):
+    # A small cell budget forces many cdist blocks
+    monkeypatch.setattr(settings, "SIMILARITY_CDIST_MAX_CELLS", max_cells)
+    engine = SimilarityEngine(company_loader)
+    clean = [normalize_name(n) for n in names]
+    assert engine.match_many(clean) == [engine.match_normalized(q) for q in clean]
+
+
+def test_bounded_index_keeps_per_name_parity(company_loader, names, monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_EXHAUSTIVE", False)
+    engine = SimilarityEngine(company_loader)
+    clean = [normalize_name(n) for n in names]
+    assert engine.match_many(clean) == [engine.match_normalized(q) for q in clean]
+
+
+def test_score_batch_equals_score_transaction(company_loader, names):
+    async def run():
+        engine = SimilarityEngine(company_loader)
+        # Separate caches, so the batch can't just replay the single path's results
+        single = ScoringService(company_loader, RenameService(engine, LRUCache(0)), _Repo(), None)
+        batch = ScoringService(company_loader, RenameService(engine, LRUCache(0)), _Repo(), None)
+        items = [(f"m{i}", name, 10.0 + i) for i, name in enumerate(names)]
+
+        want = [await single.score_transaction(*item) for item in items]
+        got = await batch.score_batch(items)
+        drop = {"timestamp"}
+        assert [s.model_dump(exclude=drop) for s in got] == [s.model_dump(exclude=drop) for s in want]
+        assert len(batch.tx_repo.rows) == len(items)
+    asyncio.run(run())
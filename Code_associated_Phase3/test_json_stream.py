@@ -0,0 +1,73 @@
+import json
+import random
+from app.core.json_stream import JSONFieldStream
+
+DOC = {
+    "risk_summary": "Looks like a \"rebrand\" of {netflix}, charged 3x, then 9x",
+    "key_reasons": ["NEW_MERCHANT", "a, b", "]} inside a string"],
+    "recommended_bank_action": [],
+    "nested": {"a": [1, {"b": "c,}"}], "d": None},
+    "escaped": "back\\slash \\\" quote",
+    "unicode": "café – €",
+    "confidence": "LOW",
+    "score": 0.73,
+    "flag": True,
+}
+
+
+def _stream(chunks):
+    parser, fields = JSONFieldStream(), []
+    for chunk in chunks:
+        fields += parser.feed(chunk)
+    return fields
+
+
+def _split(text: str, cuts):
+    bounds = [0, *sorted(cuts), len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _texts():
+    yield json.dumps(DOC)
+    yield json.dumps(DOC, indent=2, ensure_ascii=False)
+    # Fenced, the way Gemini often answers
+    yield "```json\n" + json.dumps(DOC, indent=2) + "\n```"
+
+
+def test_whole_document():
+    for text in _texts():
+        assert _stream([text]) == list(DOC.items())
+
+
+def test_every_two_way_split():
+    for text in _texts():
+        for cut in range(len(text) + 1):
+            assert _stream(_split(text, [cut])) == list(DOC.items()), cut
+
+
+def test_single_characters():
+    for text in _texts():
+        assert _stream(list(text)) == list(DOC.items())
+
+
+def test_random_splits():
+    rng = random.Random(0)
+    for text in _texts():
+        for _ in range(200):
+            cuts = rng.sample(range(len(text) + 1), rng.randint(1, 30))
+            assert _stream(_split(text, cuts)) == list(DOC.items())
+
+
+def test_fields_surface_before_the_object_closes():
+    text = json.dumps(DOC)
+    cut = text.index('"recommended_bank_action"')
+    parser = JSONFieldStream()
+    early = parser.feed(text[:cut])
+    assert early == list(DOC.items())[:2]
+    assert early + parser.feed(text[cut:]) == list(DOC.items())
+
+
+def test_truncated_output_yields_only_complete_fields():
+    text = json.dumps(DOC)
+    cut = text.index('"confidence"') + len('"confidence": "LO')
+    assert _stream([text[:cut]]) == list(DOC.items())[:6]
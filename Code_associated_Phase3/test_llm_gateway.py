@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+from app.core.exceptions import LLMError
+from app.services.fake_llm_service import FakeLLMService
+from app.services.llm_gateway import CircuitBreaker, LLMGateway
+
+
+class CountingLLM(FakeLLMService):
+    """FakeLLMService that counts backend calls and can be switched to failing."""
+    def __init__(self, delay_ms: float = 0, fail: bool = False):
+        super().__init__(first_chunk_ms=delay_ms, chunk_chars=24, chunk_delay_ms=0)
+        self.calls = 0
+        self.fail = fail
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("backend down")
+        return await super().generate(prompt)
+
+    async def generate_stream(self, prompt: str):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("backend down")
+        async for chunk in super().generate_stream(prompt):
+            yield chunk
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _gateway(backend, clock=None, failures=2, **kwargs) -> LLMGateway:
+    breaker = CircuitBreaker(failures, 30, clock=clock or Clock())
+    return LLMGateway(backend, breaker=breaker, **{"max_concurrency": 4, "max_queue": 10, "timeout": 5, **kwargs})
+
+
+def test_identical_prompts_share_one_backend_call():
+    async def run():
+        backend = CountingLLM(delay_ms=50)
+        gw = _gateway(backend)
+        texts = await asyncio.gather(*(gw.generate("same prompt") for _ in range(5)))
+        assert len(set(texts)) == 1
+        assert backend.calls == 1
+        assert gw.coalesced == 4
+        # Finished calls leave the in-flight table: the next one reaches the backend again
+        await gw.generate("same prompt")
+        assert backend.calls == 2
+        assert gw.stats()["inflight_prompts"] == 0
+    asyncio.run(run())
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        backend = CountingLLM(delay_ms=50)
+        gw = _gateway(backend)
+        first = asyncio.create_task(gw.generate("p"))
+        second = asyncio.create_task(gw.generate("p"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert (await second).startswith("```json")
+        assert backend.calls == 1
+    asyncio.run(run())
+
+
+def test_queue_full_rejects_without_reaching_the_backend():
+    async def run():
+        backend = CountingLLM(delay_ms=50)
+        gw = _gateway(backend, max_concurrency=1, max_queue=1)
+        results = await asyncio.gather(*(gw.generate(f"prompt {i}") for i in range(3)), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        assert len(errors) == 1 and isinstance(errors[0], LLMError) and "queue full" in str(errors[0])
+        assert backend.calls == 2
+        assert gw.rejected_queue == 1
+        assert gw.max_waiting == 2
+        assert gw.waiting == 0 and gw.active == 0
+    asyncio.run(run())
+
+
+def test_deadline_fails_the_call_and_counts_against_the_breaker():
+    async def run():
+        gw = _gateway(CountingLLM(delay_ms=200), timeout=0.05)
+        with pytest.raises(LLMError, match="deadline"):
+            await gw.generate("slow")
+        assert gw.timeouts == 1
+        assert gw.breaker.failures == 1
+    asyncio.run(run())
+
+
+def test_breaker_opens_then_a_single_probe_closes_it():
+    async def run():
+        clock = Clock()
+        backend = CountingLLM(delay_ms=20, fail=True)
+        gw = _gateway(backend, clock)
+        for i in range(2):
+            with pytest.raises(LLMError, match="backend down"):
+                await gw.generate(f"prompt {i}")
+        assert gw.breaker.state == "open"
+        with pytest.raises(LLMError, match="circuit open"):
+            await gw.generate("rejected")
+        assert backend.calls == 2
+        assert gw.rejected_open == 1
+
+        clock.now += 31
+        backend.fail = False
+        probe = asyncio.create_task(gw.generate("probe"))
+        other = asyncio.create_task(gw.generate("other"))
+        results = await asyncio.gather(probe, other, return_exceptions=True)
+        assert isinstance(results[0], str)
+        assert isinstance(results[1], LLMError) and "circuit open" in str(results[1])
+        assert gw.breaker.state == "closed"
+        assert backend.calls == 3
+    asyncio.run(run())
+
+
+def test_failed_probe_reopens_the_circuit():
+    async def run():
+        clock = Clock()
+        backend = CountingLLM(fail=True)
+        gw = _gateway(backend, clock)
+        for i in range(2):
+            with pytest.raises(LLMError):
+                await gw.generate(f"prompt {i}")
+        clock.now += 31
+        with pytest.raises(LLMError, match="backend down"):
+            await gw.generate("probe")
+        assert gw.breaker.state == "open"
+        assert gw.breaker.opens == 2
+        assert not gw.breaker.probing
+    asyncio.run(run())
+
+
+def test_only_the_probe_releases_the_probe_slot():
+    clock = Clock()
+    breaker = CircuitBreaker(2, 30, clock=clock)
+    early = breaker.allow()
+    assert early == 0
+    breaker.record_failure(breaker.allow())
+    breaker.record_failure(breaker.allow())
+    clock.now += 31
+    probe = breaker.allow()
+    assert probe and breaker.allow() is None
+    # A call admitted before the circuit opened ends while the probe is in flight
+    breaker.abandon(early)
+    assert breaker.allow() is None
+    breaker.abandon(probe)
+    assert breaker.allow()
+
+
+def test_stream_yields_the_full_text_and_reports_failures():
+    async def run():
+        clock = Clock()
+        backend = CountingLLM()
+        gw = _gateway(backend, clock, failures=1)
+        chunks = [c async for c in gw.generate_stream("p")]
+        assert "".join(chunks) == await backend.generate("p")
+        assert gw.breaker.state == "closed"
+
+        backend.fail = True
+        with pytest.raises(LLMError, match="backend down"):
+            async for _ in gw.generate_stream("p"):
+                pass
+        assert gw.breaker.state == "open"
+        assert gw.active == 0 and gw.waiting == 0
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("pydantic_settings")
+from app.core.csv_loader import CSVLoader
+from app.services.model_service import ModelService
+from app.services.scoring_service import ScoringService
+
+
+class FakeClassifier:
+    """predict_proba over the built features; a 'bad' category makes the whole call raise."""
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        if (X["category"] == "bad").any():
+            raise ValueError("unknown category")
+        p = (X["amount"].to_numpy() / 100.0).clip(0, 1)
+        return np.column_stack((1 - p, p))
+
+
+def _service(tmp_path, batch_wait_ms=20):
+    svc = ModelService(
+        preprocess_path=str(tmp_path / "none.pkl"), classifier_path=str(tmp_path / "none.pkl"),
+        thresholds_path=str(tmp_path / "none.json"), batch_size=64, batch_wait_ms=batch_wait_ms
+    )
+    svc.classifier = FakeClassifier()
+    svc.block_threshold, svc.review_threshold = 0.9, 0.5
+    return svc
+
+
+def _row(amount, category="es_transportation"):
+    return {"age": 30, "gender": "F", "category": category, "amount": amount}
+
+
+def test_a_bad_row_does_not_fail_its_micro_batch(tmp_path):
+    async def run():
+        svc = _service(tmp_path)
+        svc.start()
+        results = await asyncio.gather(
+            svc.predict(_row(10)), svc.predict(_row(60, "bad")), svc.predict(_row(95)), svc.predict(_row(70))
+        )
+        await svc.close()
+        assert results == [(0.1, "ALLOW"), None, (0.95, "BLOCK"), (0.7, "REVIEW")]
+        # One batched attempt, then each row on its own
+        assert svc.classifier.calls == [4, 1, 1, 1, 1]
+        assert svc.failures == 1 and svc.batches == 1
+    asyncio.run(run())
+
+
+def test_predict_many_isolates_bad_rows(tmp_path):
+    async def run():
+        svc = _service(tmp_path)
+        assert await svc.predict_many([_row(10), _row(1, "bad")]) == [(0.1, "ALLOW"), None]
+        assert await svc.predict_many([_row(20), _row(30)]) == [(0.2, "ALLOW"), (0.3, "ALLOW")]
+    asyncio.run(run())
+
+
+class _NoMatch:
+    def check_similarity(self, name, data=None):
+        return "", 0
+
+
+class _Repo:
+    async def insert_many(self, scores):
+        return True
+
+
+class _Broken:
+    enabled = True
+
+    async def predict(self, row):
+        raise RuntimeError("model crashed")
+
+
+def test_model_failure_falls_back_to_the_rules():
+    async def run():
+        service = ScoringService(CSVLoader(), _NoMatch(), _Repo(), None, model_service=_Broken())
+        score = await service.score_transaction("m1", "Brand New Shop", 12.0, model_features=_row(12))
+        assert (score.decision, score.merchant_trust_score, score.fraud_prob) == ("REVIEW", 50.0, None)
+    asyncio.run(run())
+
+
+def test_unscorable_row_falls_back_to_the_rules(tmp_path):
+    async def run():
+        svc = _service(tmp_path)
+        service = ScoringService(CSVLoader(), _NoMatch(), _Repo(), None, model_service=svc)
+        score = await service.score_transaction("m1", "Brand New Shop", 12.0, model_features=_row(12, "bad"))
+        assert (score.decision, score.merchant_trust_score, score.fraud_prob) == ("REVIEW", 50.0, None)
+        scored = await service.score_transaction("m1", "Brand New Shop", 95.0, model_features=_row(95))
+        assert (scored.decision, scored.fraud_prob) == ("BLOCK", 0.95)
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import random
+import pytest
+
+pytest.importorskip("rapidfuzz")
+from rapidfuzz import fuzz, process
+from app.core.config import settings
+from app.domain.ngram_index import NGramIndex
+from app.domain.similarity_engine import SimilarityEngine
+from conftest import mutate
+
+
+def _extract_one(query, companies):
+    """The original full-scan SimilarityEngine.find_best_match, on a normalized query."""
+    if not query or len(query) < 3 or not companies:
+        return "", 0
+    best = process.extractOne(query, companies, scorer=fuzz.token_sort_ratio)
+    return (best[0], int(best[1])) if best else ("", 0)
+
+
+@pytest.fixture(scope="module")
+def queries(company_list):
+    rng = random.Random(0)
+    return [mutate(rng, rng.choice(company_list)) for _ in range(400)]
+
+
+def test_index_search_matches_extract_one(company_list, queries):
+    index = NGramIndex(company_list)
+    for q in queries:
+        if len(q) < 3:
+            continue
+        want = process.extractOne(q, company_list, scorer=fuzz.token_sort_ratio)
+        got = index.search(q)
+        assert (got[0], got[1], got[2]) == (want[0], want[1], want[2]), q
+
+
+def test_engine_matches_the_original_lookup(company_loader, company_list, queries, monkeypatch):
+    monkeypatch.setattr(settings, "RENAME_PIPELINE_ENABLED", False)
+    engine = SimilarityEngine(company_loader)
+    for q in queries + ["emzmi", "hyion"]:
+        assert engine.match_normalized(q) == _extract_one(q, company_list), q
+
+
+@pytest.mark.parametrize("query, match", [("emzmi", "emami"), ("hyion", "hykon")])
+def test_best_match_sharing_no_ngram_is_found(company_list, query, match):
+    assert NGramIndex(company_list).search(query)[:2] == (match, 80)
+
+
+def test_bounded_mode_only_scores_ngram_candidates(company_list):
+    # The opt-out trades these matches for a bounded scan
+    assert NGramIndex(company_list, exhaustive=False).search("emzmi") is None
@@ -0,0 +1,112 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pydantic_settings")
+from app.core.config import settings
+from app.core.csv_loader import CSVLoader
+from app.core.profile_store import NameIndex, ProfileStore
+from app.domain.entities import MerchantProfile
+
+DECISIONS = ["ALLOW", "REVIEW", "BLOCK"]
+PATTERNS = [[], ["MICROCHARGE_PATTERN"], ["MERCHANT_REBRAND_PATTERN", "MICROCHARGE_PATTERN"]]
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "merchant_id": [f"m{i}" for i in range(n)],
+        "merchant_name": [f"Shop {i % 97} Ltd" if i % 13 else "" for i in range(n)],
+        "merchant_trust_score": rng.uniform(0, 100, n).round(2),
+        "risk_score": rng.random(n).round(3),
+        "rename_similarity_score": rng.integers(0, 101, n),
+        "patterns_detected": [PATTERNS[i % 3] for i in range(n)],
+        "final_decision": [DECISIONS[i % 3] for i in range(n)],
+    }
+
+
+def _store(rows) -> ProfileStore:
+    return ProfileStore.from_rows(
+        merchant_ids=rows["merchant_id"],
+        merchant_names=rows["merchant_name"],
+        trust_scores=rows["merchant_trust_score"],
+        risk_scores=rows["risk_score"],
+        rename_scores=rows["rename_similarity_score"],
+        patterns=rows["patterns_detected"],
+        decisions=rows["final_decision"],
+    )
+
+
+def _profiles(rows) -> dict:
+    # What the per-row dict of MerchantProfile models held
+    return {
+        mid: MerchantProfile(
+            merchant_id=mid, merchant_name=name, merchant_trust_score=float(trust), risk_score=float(risk),
+            rename_similarity_score=int(rename), patterns_detected=list(patterns), final_decision=decision,
+        )
+        for mid, name, trust, risk, rename, patterns, decision in zip(*rows.values())
+    }
+
+
+def test_lookups_match_the_profiles_they_replace():
+    rows = _rows(500)
+    store = _store(rows)
+    want = _profiles(rows)
+    assert len(store) == len(want) and list(store) == list(want)
+    for mid, profile in want.items():
+        assert store[mid] == profile
+    assert "missing" not in store and store.get("missing") is None
+
+
+def test_columns_use_the_narrowest_dtypes():
+    store = _store(_rows(1000))
+    assert store.rename_scores.dtype == np.int8
+    assert store.decision_codes.dtype == np.int8
+    assert store.pattern_codes.dtype == np.int8
+    assert store.id_index.rows.dtype == np.int16
+    # Two float64 scores, a 64-bit id hash and the id/name strings make up the rest
+    assert store.nbytes < 1000 * 64
+
+
+def test_duplicate_ids_keep_the_last_row_like_a_dict():
+    rows = _rows(10)
+    rows = {k: list(v) + [v[3]] for k, v in rows.items()}
+    rows["merchant_id"][-1] = "m0"
+    store = _store(rows)
+    assert len(store) == 10
+    assert store["m0"] == _profiles(rows)["m0"]
+    assert list(store).count("m0") == 1
+
+
+def test_arrays_round_trip():
+    rows = _rows(300)
+    store = _store(rows)
+    clean = [n.lower().replace(" ltd", "") for n in rows["merchant_name"]]
+    names = NameIndex.build(clean, store.merchant_ids)
+
+    restored = ProfileStore.from_arrays(store.to_arrays(), store.meta())
+    restored_names = NameIndex.from_arrays(names.to_arrays(), restored.merchant_ids, len(names))
+    assert dict(restored) == dict(store)
+    assert dict(restored_names) == dict(names)
+    # Empty names are not indexed; repeated names map to their last merchant
+    assert "" not in restored_names
+    assert restored_names["shop 5"] == max((m for m, c in zip(rows["merchant_id"], clean) if c == "shop 5"), key=lambda m: int(m[1:]))
+
+
+def test_master_snapshot_restores_the_same_lookups(tmp_path, monkeypatch):
+    rows = _rows(400, seed=3)
+    csv = tmp_path / "master.csv"
+    pd.DataFrame({**rows, "patterns_detected": [str(p) for p in rows["patterns_detected"]]}).to_csv(csv, index=False)
+    monkeypatch.setattr(settings, "MASTER_CSV_PATH", str(csv))
+    monkeypatch.setattr(settings, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(settings, "SNAPSHOT_ENABLED", True)
+
+    fresh = CSVLoader()._load_master_csv()
+    assert not fresh[0].empty
+    assert (tmp_path / "snapshots" / "master.snap").exists()
+    restored = CSVLoader()._load_master_csv()
+    # Only the snapshot can answer without the raw DataFrame
+    assert restored[0].empty
+    assert dict(restored[1]) == dict(fresh[1])
+    assert dict(restored[2]) == dict(fresh[2])
+    assert restored[1]["m7"] == _profiles(rows)["m7"]
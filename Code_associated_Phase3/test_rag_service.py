@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("motor")
+from app.core.csv_loader import CSVLoader
+from app.domain.entities import MerchantPolicy
+from app.services.case_index import CaseIndex, _policy_text
+from app.services.rag_service import RAGService
+
+NETFLIX = MerchantPolicy(merchant_key="netflix", merchant_name="Netflix", cancellation_steps=["Account > Cancel membership"])
+
+
+class _Repo:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    async def find_one(self, query):
+        return next((d for d in self.docs if all(getattr(d, k, None) == v for k, v in query.items())), None)
+
+    async def find_many(self, query, limit=10, sort=None):
+        return []
+
+
+def _rag():
+    cases = CaseIndex(_Repo(), _Repo(), writer=None)
+    cases.policies.add(NETFLIX.merchant_key, _policy_text(NETFLIX), NETFLIX)
+    return RAGService(_Repo(), _Repo(), _Repo([NETFLIX]), CSVLoader(), cases), cases
+
+
+def test_lookalike_does_not_get_the_imitated_merchants_policy():
+    async def run():
+        rag, cases = _rag()
+        payload = {"merchant_name": "netfl1x billing", "closest_company_match": "netflix"}
+        # Close enough to Netflix for the index, but not Netflix's merchant_key
+        assert cases.match_policy(payload) == NETFLIX
+        ctx = await rag.build_context("m_fake", payload["merchant_name"], payload)
+        assert ctx["policy"] is None
+        assert "fallback" not in ctx["sources"]["policy"]
+    asyncio.run(run())
+
+
+def test_exact_merchant_key_still_finds_the_policy():
+    async def run():
+        rag, _ = _rag()
+        ctx = await rag.build_context("m_netflix", "Netflix Inc", {})
+        assert ctx["policy"]["merchant_name"] == "Netflix"
+    asyncio.run(run())
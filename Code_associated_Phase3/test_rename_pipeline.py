@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("rapidfuzz")
+from app.core.config import settings
+from app.domain.similarity_engine import SimilarityEngine
+
+BLOCK = 90
+
+# Generic words that are substrings / token subsets of registry names
+# ("yes bank", "lt foods", "kasmo cloud", "datapro", "markets and markets", "quick heal")
+GENERIC = ["bank", "foo", "cloud", "data", "market", "quick shop"]
+LOOKALIKES = {"netfl1x": "netflix", "amaz0n": "amazon", "spotlfy": "spotify"}
+
+
+@pytest.fixture
+def engine(company_loader):
+    return SimilarityEngine(company_loader)
+
+
+@pytest.mark.parametrize("query, company", LOOKALIKES.items())
+def test_homoglyph_lookalikes_are_blocked(engine, query, company):
+    assert engine.find_best_match(query) == (company, 100)
+
+
+@pytest.mark.parametrize("query", GENERIC)
+def test_generic_words_are_not_blocked(engine, query):
+    assert engine.find_best_match(query)[1] < BLOCK
+
+
+@pytest.mark.parametrize("query", GENERIC + list(LOOKALIKES))
+def test_pipeline_only_raises_token_sort_ratio(engine, monkeypatch, query):
+    with_pipeline = engine.find_best_match(query)
+    monkeypatch.setattr(settings, "RENAME_PIPELINE_ENABLED", False)
+    plain = engine.find_best_match(query)
+    assert with_pipeline[1] >= plain[1]
+    if with_pipeline[1] > plain[1]:
+        # Only a folded look-alike can lift a score, and only to a near-exact match
+        assert with_pipeline[1] >= settings.RENAME_SCORE_CUTOFF
+
+
+@pytest.mark.parametrize("query", GENERIC)
+def test_partial_scorers_stay_below_block_when_enabled(company_loader, monkeypatch, query):
+    monkeypatch.setattr(settings, "RENAME_SCORERS", "token_set_ratio,partial_ratio,homoglyph")
+    engine = SimilarityEngine(company_loader)
+    assert engine.find_best_match(query)[1] < BLOCK
+    assert engine.find_best_match("netfl1x") == ("netflix", 100)
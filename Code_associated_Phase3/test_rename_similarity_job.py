@@ -0,0 +1,38 @@
+import pytest
+from conftest import load_module
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("rapidfuzz")
+from rapidfuzz import fuzz, process
+job = load_module("rename_similarity_job", "ML/Online retial II/MERGED MASTER NOTEBOOK/rename_similarity_job.py")
+REBRAND = job.REBRAND
+
+
+def test_refresh_keeps_every_pattern_format():
+    master = pd.DataFrame({
+        "rename_similarity_score": [95, 10, 50, 92, 10],
+        "patterns_detected": [f"['A', '{REBRAND}']", "A, B", "MICRO", None, REBRAND],
+    })
+    out = job.refresh_decisions(master)["patterns_detected"].tolist()
+    assert out == [str(["A", REBRAND]), str(["A", "B"]), str(["MICRO"]), str([REBRAND]), str([])]
+
+
+def test_short_company_names_are_kept(tmp_path):
+    path = tmp_path / "companies.csv"
+    pd.DataFrame({"Company Name": ["HP", "3M Co", "Netflix Inc", "HP"]}).to_csv(path, index=False)
+    assert job.load_companies(str(path)) == ["hp", "3m", "netflix"]
+
+
+def test_matches_equal_extract_one(tmp_path, company_list):
+    companies = company_list[:3000]
+    queries = ["netfl1x", "amazon prime video", "xy", "spotlfy premium", "zzzzqqq", companies[17] + " x"]
+    ckpt = str(tmp_path / "out.ckpt.csv")
+    got = job.match_names(queries, companies, ckpt, max_cells=4 * len(companies), workers=1)
+    for q in queries:
+        if len(q) < 3:
+            assert got[q] == ("", 0.0)
+            continue
+        name, score, _ = process.extractOne(q, companies, scorer=fuzz.token_sort_ratio)
+        assert got[q][0] == name and got[q][1] == pytest.approx(score, abs=1e-4)
+    # Resuming from the checkpoint scores nothing again
+    assert job.match_names(queries, [], ckpt, 1, 1) == got
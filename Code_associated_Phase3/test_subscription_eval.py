@@ -0,0 +1,55 @@
+import os
+import pytest
+from conftest import load_module
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+for _dep in ("fastapi", "rapidfuzz", "sklearn"):
+    pytest.importorskip(_dep)
+from fastapi import HTTPException
+merchant_app = load_module("merchant_score_app_eval", "ML/Merchant_score_app/app.py")
+
+
+@pytest.fixture
+def eval_files(tmp_path, monkeypatch):
+    scoring, sub = tmp_path / "df_scoring.csv", tmp_path / "sub.csv"
+    pd.DataFrame({"subscription_id": ["a", "a", "b", "c"], "fraud": [0, 1, 0, None]}).to_csv(scoring, index=False)
+    pd.DataFrame({
+        "subscription_id": ["a", "b", "c", "d"],
+        "decision": ["BLOCK", "ALLOW", "REVIEW", "ALLOW"],
+        "max_fraud_prob": [0.9, 0.1, 0.6, 0.2],
+    }).to_csv(sub, index=False)
+    monkeypatch.setattr(merchant_app, "DF_SCORING_PATH", str(scoring))
+    monkeypatch.setattr(merchant_app, "SUB_PATH", str(sub))
+    monkeypatch.setattr(merchant_app, "SUB_EVAL", None)
+    monkeypatch.setattr(merchant_app, "DATA_VERSION", None)
+    return scoring, sub
+
+
+def test_ground_truth_is_joined_once_and_reloaded_on_change(eval_files):
+    scoring, _ = eval_files
+    first = merchant_app.get_subscription_eval()
+    np.testing.assert_array_equal(first["fraud"], [1, 0, 0, 0])
+    np.testing.assert_array_equal(first["flagged"], [1, 0, 1, 0])
+    assert merchant_app.get_subscription_eval() is first
+
+    pd.DataFrame({"subscription_id": ["b"], "fraud": [1]}).to_csv(scoring, index=False)
+    stat = os.stat(scoring)
+    os.utime(scoring, (stat.st_atime, stat.st_mtime + 10))
+    second = merchant_app.get_subscription_eval()
+    assert second is not first
+    np.testing.assert_array_equal(second["fraud"], [0, 1, 0, 0])
+
+
+def test_missing_file_keeps_the_loaded_version(eval_files):
+    scoring, _ = eval_files
+    loaded = merchant_app.get_subscription_eval()
+    scoring.unlink()
+    assert merchant_app.get_subscription_eval() is loaded
+
+
+def test_missing_file_before_any_load_is_a_503(eval_files):
+    eval_files[1].unlink()
+    with pytest.raises(HTTPException) as e:
+        merchant_app.get_subscription_eval()
+    assert e.value.status_code == 503
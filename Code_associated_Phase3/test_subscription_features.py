@@ -0,0 +1,85 @@
+import ast
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pydantic_settings")
+from app.domain.subscription_features import SubscriptionFeatureStore
+
+ML = Path(__file__).resolve().parent / "ML"
+STEP = 86400
+# median_amount and the IsolationForest columns need the full history; micro_streak_max
+# differs where the offline run ordered same-step transactions differently
+ORDER_SENSITIVE = {"micro_streak_max"}
+SKIPPED = {"median_amount", "anomaly_raw", "subscription_anomaly_score", "final_abuse_score", "decision"}
+
+
+def _ts(step: int) -> datetime:
+    return datetime.fromtimestamp(step * STEP, tz=timezone.utc)
+
+
+def _store(**kwargs) -> SubscriptionFeatureStore:
+    return SubscriptionFeatureStore(**{"max_subscriptions": 1000, "step_seconds": STEP, **kwargs})
+
+
+def test_replay_reproduces_the_offline_features():
+    scoring, offline = ML / "df_scoring.csv", ML / "banksim_subscription_abuse_features.csv"
+    if not (scoring.exists() and offline.exists()):
+        pytest.skip("BankSim feature files not available")
+    tx = pd.read_csv(scoring, usecols=["subscription_id", "step", "amount"]).sort_values("step", kind="stable")
+    store = _store()
+    for sid, step, amount in tx[["subscription_id", "step", "amount"]].itertuples(index=False):
+        store.update(sid, float(amount), _ts(int(step)))
+
+    want = pd.read_csv(offline).set_index("subscription_id")
+    mismatched = 0
+    for sid, row in want.iterrows():
+        got = store.get(sid)
+        for col, value in row.items():
+            if col in SKIPPED or col in ORDER_SENSITIVE:
+                continue
+            if col == "patterns_detected":
+                assert got[col] == ast.literal_eval(value), sid
+            else:
+                assert got[col] == pytest.approx(value, rel=1e-9, abs=1e-9), (sid, col)
+        mismatched += got["micro_streak_max"] != row["micro_streak_max"]
+    assert mismatched <= 6
+
+
+def test_window_gaps_and_rules():
+    store = _store(window_steps=7, micro_threshold=5.0)
+    steps = [0, 1, 1, 2, 3, 30, 31, 80]
+    amounts = [1.0, 2.0, 50.0, 3.0, 4.0, 1.5, 2.5, 100.0]
+    for step, amount in zip(steps, amounts):
+        f = store.update("s", amount, _ts(step))
+    gaps = pd.Series(steps).diff().dropna()
+    assert f["tx_count"] == 8
+    assert f["tx_in_window_max"] == 5
+    assert f["micro_count"] == 6 and f["micro_streak_max"] == 4
+    assert f["std_amount"] == pytest.approx(pd.Series(amounts).std())
+    assert f["mean_gap_steps"] == pytest.approx(gaps.mean())
+    assert f["std_gap_steps"] == pytest.approx(gaps.std(ddof=0))
+    assert f["max_gap_steps"] == 49 and f["active_steps"] == 80
+    assert f["patterns_detected"] == ["VELOCITY_SPIKE", "IRREGULAR_RECURRING"]
+    assert f["rule_abuse_score"] == pytest.approx(0.7)
+
+
+def test_out_of_order_transactions_count_as_a_zero_gap():
+    store = _store()
+    for step in (10, 5, 12):
+        f = store.update("s", 20.0, _ts(step))
+    assert f["max_gap_steps"] == 2
+    assert f["mean_gap_steps"] == pytest.approx(1.0)
+    assert (f["first_step"], f["last_step"]) == (10, 12)
+
+
+def test_store_is_bounded_by_lru():
+    store = _store(max_subscriptions=2)
+    store.update("a", 10.0, _ts(0))
+    store.update("b", 10.0, _ts(0))
+    store.update("a", 10.0, _ts(1))
+    store.update("c", 10.0, _ts(1))
+    assert store.get("b") is None
+    assert store.get("a")["tx_count"] == 2
+    assert store.get("c")["tx_count"] == 1
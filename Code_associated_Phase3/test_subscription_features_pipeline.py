@@ -0,0 +1,75 @@
+import pytest
+from conftest import load_module
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pipeline = load_module("subscription_features_pipeline", "ML/subscription_features_pipeline.py")
+
+WINDOW = pipeline.WINDOW_STEPS
+MICRO = pipeline.MICRO_THRESHOLD
+SAMPLE = 10_000  # Larger than any run here, so the median is exact and merge order can't change it
+
+
+def _subscription(rng, n):
+    # Step-ordered, with repeated steps, bursts and long pauses
+    steps = np.cumsum(rng.choice([0, 0, 1, 2, 3, 15, 40], size=n))
+    amounts = np.where(rng.random(n) < 0.5, rng.uniform(0.5, MICRO, n), rng.uniform(MICRO + 0.01, 200, n)).round(2)
+    return amounts, steps
+
+
+def _fold(amounts, steps, cuts):
+    bounds = [0, *sorted(cuts), len(amounts)]
+    runs = [
+        pipeline.Partial.from_run(amounts[a:b], steps[a:b], WINDOW, MICRO, SAMPLE)
+        for a, b in zip(bounds, bounds[1:])
+    ]
+    rng = np.random.default_rng(0)
+    out = runs[0]
+    for p in runs[1:]:
+        out = out.merge(p, WINDOW, SAMPLE, rng)
+    return out.features()
+
+
+def _assert_same(got, want):
+    assert got.keys() == want.keys()
+    for k, v in want.items():
+        if isinstance(v, float):
+            assert got[k] == pytest.approx(v, rel=1e-9, abs=1e-9), k
+        else:
+            assert got[k] == v, k
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_merged_chunks_match_a_single_pass(seed):
+    rng = np.random.default_rng(seed)
+    amounts, steps = _subscription(rng, int(rng.integers(2, 120)))
+    whole = pipeline.Partial.from_run(amounts, steps, WINDOW, MICRO, SAMPLE).features()
+    for _ in range(25):
+        n_cuts = int(rng.integers(1, min(len(amounts) - 1, 12) + 1))
+        cuts = rng.choice(np.arange(1, len(amounts)), size=n_cuts, replace=False)
+        _assert_same(_fold(amounts, steps, cuts), whole)
+
+
+def test_single_transaction_runs():
+    rng = np.random.default_rng(1)
+    amounts, steps = _subscription(rng, 40)
+    whole = pipeline.Partial.from_run(amounts, steps, WINDOW, MICRO, SAMPLE).features()
+    _assert_same(_fold(amounts, steps, range(1, len(amounts))), whole)
+
+
+def test_streaks_and_windows_spanning_many_chunks():
+    # One micro-charge streak and one velocity burst, each cut into several chunks
+    amounts = np.array([50.0] + [1.0] * 12 + [50.0] * 3)
+    steps = np.array([0, 10, 10, 10, 11, 11, 12, 12, 13, 13, 14, 14, 15, 40, 41, 90])
+    whole = pipeline.Partial.from_run(amounts, steps, WINDOW, MICRO, SAMPLE).features()
+    assert whole["micro_streak_max"] == 12
+    assert whole["tx_in_window_max"] == 12
+    _assert_same(_fold(amounts, steps, [2, 4, 5, 9, 12]), whole)
+
+
+def test_all_micro_subscription():
+    amounts = np.full(9, 2.5)
+    steps = np.arange(9) * 3
+    whole = pipeline.Partial.from_run(amounts, steps, WINDOW, MICRO, SAMPLE).features()
+    assert whole["micro_streak_max"] == 9
+    _assert_same(_fold(amounts, steps, [3, 6]), whole)
@@ -0,0 +1,77 @@
+import pytest
+from conftest import load_module
+
+np = pytest.importorskip("numpy")
+for _dep in ("pandas", "fastapi", "rapidfuzz", "sklearn"):
+    pytest.importorskip(_dep)
+# The data files are machine-specific; the app logs the failed load and still imports
+merchant_app = load_module("merchant_score_app", "ML/Merchant_score_app/app.py")
+
+
+def _loop_curve(scores, y_true, thresholds):
+    """The per-threshold loop threshold_curve replaced."""
+    rows = []
+    for t in thresholds:
+        m = merchant_app.compute_metrics(y_true, (scores >= t).astype(int))
+        rows.append((m["confusion"], m["fpr"], m["recall"], m["precision"]))
+    return rows
+
+
+def _data(seed, n=2_000):
+    rng = np.random.default_rng(seed)
+    # Rounded so many scores tie, including at 0 and 1
+    scores = rng.beta(0.6, 2.0, n).round(2)
+    y = (rng.random(n) < scores * 0.6).astype(np.int8)
+    return scores, y
+
+
+def _assert_matches(curve, scores, y):
+    want = _loop_curve(scores, y, curve["threshold"])
+    for i, (confusion, fpr, recall, precision) in enumerate(want):
+        for k in ("tp", "fp", "fn", "tn"):
+            assert curve[k][i] == confusion[k], (k, curve["threshold"][i])
+        assert curve["fpr"][i] == pytest.approx(fpr)
+        assert curve["recall"][i] == pytest.approx(recall)
+        assert curve["precision"][i] == pytest.approx(precision)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("points", [2, 11, 101, 1000])
+def test_grid_matches_the_loop(seed, points):
+    scores, y = _data(seed)
+    curve = merchant_app.threshold_curve(scores, y, points)
+    np.testing.assert_allclose(curve["threshold"], np.linspace(0.0, 1.0, points))
+    _assert_matches(curve, scores, y)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_exact_curve_covers_every_distinct_score(seed):
+    scores, y = _data(seed)
+    curve = merchant_app.threshold_curve(scores, y, 0)
+    np.testing.assert_array_equal(curve["threshold"], np.unique(scores))
+    _assert_matches(curve, scores, y)
+
+
+def test_best_for_fpr_matches_a_scan():
+    scores, y = _data(7)
+    curve = merchant_app.threshold_curve(scores, y, 101)
+    for target in (0.0, 0.01, 0.05, 0.2, 1.0):
+        rows = _loop_curve(scores, y, curve["threshold"])
+        ok = [(r[2], -t) for t, r in zip(curve["threshold"], rows) if r[1] <= target]
+        best = merchant_app.best_for_fpr(curve, target)
+        if not ok:
+            assert best is None
+            continue
+        recall, neg_t = max(ok)
+        assert best["recall"] == pytest.approx(recall)
+        assert best["threshold"] == pytest.approx(-neg_t)
+
+
+def test_curve_cache_is_bounded_and_drops_stale_versions():
+    scores, y = _data(0, n=200)
+    merchant_app._curve_cache.clear()
+    for points in range(2, 2 + 3 * merchant_app.CURVE_CACHE_SIZE):
+        merchant_app.get_subscription_curve({"version": 1, "max_fraud_prob": scores, "fraud": y}, points)
+        assert len(merchant_app._curve_cache) <= merchant_app.CURVE_CACHE_SIZE
+    merchant_app.get_subscription_curve({"version": 2, "max_fraud_prob": scores, "fraud": y}, 11)
+    assert list(merchant_app._curve_cache) == [(2, 11)]
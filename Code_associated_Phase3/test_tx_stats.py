@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+from app.db.repos.concrete import RollupRepo, TransactionRepo
+from app.domain.entities import TransactionRollup, TransactionScore
+from app.services.tx_stats_service import TransactionStatsService
+
+
+class FakeCollection:
+    """Records bulk writes and aggregation pipelines; aggregate() answers with `result`."""
+    name = "fake"
+
+    def __init__(self, result=()):
+        self.result = list(result)
+        self.ops = []
+        self.pipelines = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops += ops
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+
+        async def docs():
+            for doc in self.result:
+                yield doc
+        return docs()
+
+
+def _score(mid, amount, decision, hour, minute=0):
+    return TransactionScore(
+        merchant_id=mid, merchant_name=mid.upper(), amount=amount, decision=decision,
+        timestamp=datetime(2026, 1, 1, hour, minute),
+    )
+
+
+def test_record_sends_one_upsert_per_merchant_hour():
+    col = FakeCollection()
+    repo = RollupRepo({"r": col}, "r", TransactionRollup)
+    scores = [
+        _score("m1", 10.0, "ALLOW", 9, 5), _score("m1", 30.0, "BLOCK", 9, 50),
+        _score("m1", 5.0, "ALLOW", 10), _score("m2", 7.5, "ALLOW", 9),
+    ]
+    assert asyncio.run(repo.record(scores))
+    ops = {op._filter["_id"]: op._doc for op in col.ops}
+    assert sorted(ops) == ["m1|2026-01-01T09", "m1|2026-01-01T10", "m2|2026-01-01T09"]
+    m1 = ops["m1|2026-01-01T09"]
+    assert m1["$inc"] == {"count": 2, "amount_sum": 40.0, "decisions.ALLOW": 1, "decisions.BLOCK": 1}
+    assert m1["$max"] == {"amount_max": 30.0}
+    assert m1["$setOnInsert"] == {"merchant_id": "m1", "bucket": datetime(2026, 1, 1, 9)}
+
+
+def _facets():
+    return [{
+        "totals": [{"_id": None, "transactions": 42, "amount_sum": 1234.5678}],
+        "decisions": [{"_id": "ALLOW", "n": 40}, {"_id": "BLOCK", "n": 2}],
+        "merchants": [{"n": 7}],
+        "top_merchants": [{"_id": "m1", "count": 30}, {"_id": "m2", "count": 12}],
+    }]
+
+
+def _stages(pipeline):
+    return [next(iter(stage)) for stage in pipeline]
+
+
+def test_summary_is_aggregated_on_the_server_from_rollups():
+    col = FakeCollection(_facets())
+    service = TransactionStatsService(
+        TransactionRepo({"tx": FakeCollection()}, "tx", TransactionScore),
+        RollupRepo({"r": col}, "r", TransactionRollup),
+    )
+    out = asyncio.run(service.summary(24, top=2))
+    assert out == {
+        "hours": 24,
+        "transactions": 42,
+        "amount_sum": 1234.57,
+        "merchants": 7,
+        "decisions": {"ALLOW": 40, "BLOCK": 2},
+        "top_merchants": [{"merchant_id": "m1", "count": 30}, {"merchant_id": "m2", "count": 12}],
+    }
+    (pipeline,) = col.pipelines
+    assert _stages(pipeline) == ["$match", "$facet"]
+    assert set(pipeline[0]["$match"]) == {"bucket"}
+    top = pipeline[1]["$facet"]["top_merchants"]
+    assert top[-2:] == [{"$sort": {"count": -1, "_id": 1}}, {"$limit": 2}]
+    # Rollups keep decisions as a sub-document: the counts are summed per key
+    assert _stages(pipeline[1]["$facet"]["decisions"]) == ["$project", "$unwind", "$group"]
+
+
+def test_summary_reads_raw_transactions_without_rollups():
+    tx = FakeCollection()
+    service = TransactionStatsService(TransactionRepo({"tx": tx}, "tx", TransactionScore))
+    out = asyncio.run(service.summary(6))
+    # An empty window comes back as a single document of empty facets, or none at all
+    assert out == {"hours": 6, "transactions": 0, "amount_sum": 0.0, "merchants": 0, "decisions": {}, "top_merchants": []}
+    (pipeline,) = tx.pipelines
+    assert set(pipeline[0]["$match"]) == {"timestamp"}
+    assert pipeline[1]["$facet"]["decisions"] == [{"$group": {"_id": "$decision", "n": {"$sum": 1}}}]
+
+    tx.result = [{"totals": [], "decisions": [], "merchants": [], "top_merchants": []}]
+    assert asyncio.run(service.summary(6))["transactions"] == 0